@@ -7,15 +7,18 @@ from datetime import date
 
 from slack_sdk import WebClient
 from openai import OpenAI
-from docx import Document
 
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Google Docs–based PDF exporter
-from google_pdf import convert_docx_to_pdf_google as convert_docx_to_pdf
+# Local LibreOffice pool, Google Docs as fallback
+from pdf_converter import convert_docx_to_pdf
+from numeric_parsing import parse_amount, amount_to_str
+from utils import format_currency, new_job_id, document_filename
+from docx_template import get_template
+from artifact_cache import artifact_cache
 
 # load your environment variables (ensure .env is loaded in orchestrator)
 SLACK_TOKEN      = os.getenv("SLACK_BOT_TOKEN")
@@ -101,7 +104,7 @@ def get_openai_client():
                 for pattern in deposit_patterns:
                     deposit_match = re.search(pattern, user_message, re.IGNORECASE)
                     if deposit_match:
-                        deposit = deposit_match.group(1).replace(',', '')
+                        deposit = amount_to_str(deposit_match.group(1))
                         print(f"🔍 DEBUG: Mock client found deposit: '{deposit}'")
                         break
                 
@@ -117,7 +120,7 @@ def get_openai_client():
                 for i, pattern in enumerate(fee_patterns):
                     fee_match = re.search(pattern, user_message, re.IGNORECASE)
                     if fee_match:
-                        potential_fee = fee_match.group(1).replace(',', '')
+                        potential_fee = amount_to_str(fee_match.group(1))
                         # Double-check this isn't the same as the deposit amount
                         if potential_fee != deposit:
                             flat_fee = potential_fee
@@ -193,19 +196,10 @@ def clean_text(text: str) -> str:
     return re.sub(r"<@[\w]+>", "", text).strip()
 
 
-def format_currency(value: str) -> str:
-    """Format an integer/float string as Indian-rupee currency."""
-    try:
-        num = float(value)
-        return f"₹{num:,.0f}".replace(",", ",")
-    except:
-        return value
-
-
 def convert_number_to_words(number_str: str) -> str:
     """Convert a number string to words (Indian numbering system)."""
     try:
-        num = int(float(number_str))
+        num = int(parse_amount(number_str))
         
         # Handle common amounts
         if num == 0:
@@ -414,7 +408,7 @@ def extract_agreement_fields(message_text: str):
         for pattern in deposit_patterns:
             deposit_match = re.search(pattern, message_text, re.IGNORECASE)
             if deposit_match:
-                data["deposit"] = deposit_match.group(1).replace(',', '')
+                data["deposit"] = amount_to_str(deposit_match.group(1))
                 print(f"🔍 DEBUG: Manual extraction found deposit: '{data['deposit']}'")
                 break
         
@@ -430,7 +424,7 @@ def extract_agreement_fields(message_text: str):
         for i, pattern in enumerate(fee_patterns):
             fee_match = re.search(pattern, message_text, re.IGNORECASE)
             if fee_match:
-                potential_fee = fee_match.group(1).replace(',', '')
+                potential_fee = amount_to_str(fee_match.group(1))
                 # Double-check this isn't the same as the deposit amount
                 if potential_fee != data["deposit"]:
                     data["flat_fee"] = potential_fee
@@ -485,22 +479,15 @@ def extract_agreement_fields(message_text: str):
     return data, missing
 
 
-def fill_docx_template(values: dict, output_path: str):
+def fill_docx_template(values: dict) -> bytes:
     """
-    Open the .docx template, replace placeholders like {{brand_name}},
-    and save to output_path.
+    Fill placeholders like {{brand_name}} in the compiled agreement template
+    and return the .docx bytes.
     """
-    import html
-    
-    doc = Document(TEMPLATE_PATH)
-    for p in doc.paragraphs:
-        for key, val in values.items():
-            placeholder = f"{{{{{key}}}}}"
-            if placeholder in p.text:
-                # Decode HTML entities like &amp; to &
-                decoded_val = html.unescape(str(val))
-                p.text = p.text.replace(placeholder, decoded_val)
-    doc.save(output_path)
+    buffer, result = get_template(TEMPLATE_PATH).render_to_buffer(values)
+    if result['unreplaced']:
+        print(f"⚠️  Agreement placeholders left unfilled: {result['unreplaced']}")
+    return buffer.getvalue()
 
 
 def handle_agreement(event, say):
@@ -529,32 +516,39 @@ def handle_agreement(event, say):
     values["flat_fee"]    = format_currency(values["flat_fee"])
     values["deposit"]     = format_currency(values["deposit"])
 
-    # safe filename
-    brand_slug = re.sub(r"\W+", "_", values["brand_name"].lower())
-    docx_path = f"{brand_slug}_agreement.docx"
-    pdf_path  = f"{brand_slug}_agreement.pdf"
+    # per-job names, so concurrent requests for the same brand never collide
+    job_id = new_job_id()
 
-    # fill and save docx
-    fill_docx_template(values, docx_path)
+    # fill docx in memory
+    docx_data = fill_docx_template(values)
 
-    # attempt PDF via Google Docs API
-    pdf_ok = convert_docx_to_pdf(docx_path, pdf_path)
+    # reuse the PDF of an identical earlier agreement, else convert
+    # (local office workers, then Google Docs API)
+    cache_key = get_template(TEMPLATE_PATH).cache_key(values)
+    pdf_data = artifact_cache.get(cache_key, "pdf")
+    if pdf_data:
+        print(f"♻️  Reusing cached agreement PDF {cache_key[:12]}")
+    else:
+        pdf_data = convert_docx_to_pdf(docx_data, f"Sara_Agreement_{job_id}")
+        if pdf_data:
+            artifact_cache.put(cache_key, "pdf", pdf_data)
 
     # decide which to upload
-    if pdf_ok:
-        upload_path = pdf_path
+    if pdf_data:
+        upload_data = pdf_data
+        filename = document_filename(values["brand_name"], "agreement", "pdf", job_id)
         title = f"{values['brand_name']} Agreement (PDF)"
     else:
-        upload_path = docx_path
+        upload_data = docx_data
+        filename = document_filename(values["brand_name"], "agreement", "docx", job_id)
         title = f"{values['brand_name']} Agreement (Word)"
 
-    # upload to Slack thread
-    with open(upload_path, "rb") as f:
-        slack_client.files_upload_v2(
-            channel=channel,
-            thread_ts=thread_ts,
-            file=f,
-            filename=os.path.basename(upload_path),
-            title=title,
-            initial_comment=f"📎 Here’s your *{title}*"
-        )
+    # upload to Slack thread straight from memory
+    slack_client.files_upload_v2(
+        channel=channel,
+        thread_ts=thread_ts,
+        content=upload_data,
+        filename=filename,
+        title=title,
+        initial_comment=f"📎 Here’s your *{title}*"
+    )
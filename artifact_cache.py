@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for generated documents (PDFs keyed by DocxTemplate.cache_key)
+"""
+
+import os
+import time
+import tempfile
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction is only serialised within a process
+    fcntl = None
+
+# Load environment variables
+load_dotenv()
+
+ARTIFACT_CACHE_DIR = os.getenv('ARTIFACT_CACHE_DIR', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'artifact_cache'
+))
+
+# Least recently used artifacts are deleted once the directory grows past this (shared by all processes)
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv('ARTIFACT_CACHE_MAX_MB', '200')) * 1024 * 1024
+
+# Temp files older than this belong to a writer that died and are removed on the next scan
+STALE_TEMP_SECONDS = 3600
+
+# Set to false to always render and convert
+ARTIFACT_CACHE_ENABLED = os.getenv('ARTIFACT_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+
+class ArtifactCache:
+    """
+    Size-bounded LRU of artifacts on disk, one file per (content hash, kind).
+
+    The directory is shared by every process using it (the socket-mode and
+    HTTP orchestrators), so the directory itself is the index: a hit touches
+    the file's mtime, and after each write the directory is re-scanned and the
+    least recently used files are deleted until the total is under max_bytes.
+    Eviction holds an exclusive lock on a lock file in the directory, so two
+    processes never evict at once. Writes go through a temp file and
+    ``os.replace``, so readers never see a partial artifact.
+    """
+
+    LOCK_FILE = '.lock'
+
+    def __init__(self, directory: str = ARTIFACT_CACHE_DIR, max_bytes: int = ARTIFACT_CACHE_MAX_BYTES,
+                 enabled: bool = ARTIFACT_CACHE_ENABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._artifacts = None  # count and size as of the last scan
+        self._size = 0
+        self._lock = threading.Lock()
+        self._metrics = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self.last_error = None
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """(mtime, name, size) of every artifact, least recently used first"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # evicted by another process meanwhile
+            if entry.name.startswith('.tmp-') and time.time() - stat.st_mtime > STALE_TEMP_SECONDS:
+                try:
+                    os.remove(entry.path)  # left behind by a writer that died
+                except OSError:
+                    pass  # already removed by another process's scan
+            elif not entry.name.startswith('.') and entry.is_file():
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        entries.sort()
+        return entries
+
+    def _evict(self):
+        """Delete least recently used artifacts until the directory fits in max_bytes"""
+        with self._lock, open(os.path.join(self.directory, self.LOCK_FILE), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            entries = self._scan()
+            size = sum(entry[2] for entry in entries)
+            while size > self.max_bytes and len(entries) > 1:
+                _, name, file_size = entries.pop(0)
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                size -= file_size
+                self._metrics['evictions'] += 1
+            self._artifacts, self._size = len(entries), size
+
+    @staticmethod
+    def _file_name(key: str, kind: str) -> str:
+        return f"{key}.{kind}"
+
+    def get(self, key: str, kind: str) -> Optional[bytes]:
+        """Cached artifact bytes, or None"""
+        if not self.enabled:
+            return None
+        path = os.path.join(self.directory, self._file_name(key, kind))
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            if not isinstance(e, FileNotFoundError):
+                self.last_error = str(e)
+            self._metrics['misses'] += 1
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass  # evicted by another process since the read
+        self._metrics['hits'] += 1
+        return data
+
+    def put(self, key: str, kind: str, data: bytes):
+        """Store an artifact, evicting least recently used ones to stay under max_bytes"""
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, os.path.join(self.directory, self._file_name(key, kind)))
+            self._metrics['stores'] += 1
+            self._evict()
+        except OSError as e:
+            self.last_error = str(e)
+            print(f"⚠️  Couldn't store {kind} in the artifact cache: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'directory': self.directory,
+                'artifacts': self._artifacts,
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                **self._metrics,
+                'last_error': self.last_error
+            }
+
+
+# Global cache shared by the agreement and invoice services
+artifact_cache = ArtifactCache()
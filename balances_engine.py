@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Precomputed payment status for the Brand Balances sheet
+"""
+
+import time
+import threading
+from bisect import bisect_left, insort
+from typing import Optional, Dict, Any, List
+
+import numpy as np
+
+from sheet_table import SheetTable
+
+# Summary/total rows that aren't brands
+EXCLUDED_BALANCE_ROWS = [
+    'grand total', 'total', 'sum', 'subtotal', 'summary',
+    'overall total', 'net total', 'final total'
+]
+
+
+def format_unpaid_report(unpaid_brands: List[Dict[str, Any]], total_outstanding: float) -> str:
+    """Slack message listing unpaid brands, most owed first"""
+    if not unpaid_brands:
+        return "🎉 Great news! All brands have paid their balances. No outstanding payments found."
+
+    response = f"💸 **Brands that haven't paid** ({len(unpaid_brands)} total):\n\n"
+
+    for brand in unpaid_brands:
+        response += f"• **{brand['brand']}**: ₹{brand['amount_due']:,.2f} due\n"
+
+    response += f"\n💰 **Total outstanding**: ₹{total_outstanding:,.2f}"
+
+    return response
+
+
+class BalancesEngine:
+    """
+    Keeps the unpaid-brands answer ready between snapshots.
+
+    A snapshot is parsed once into arrays (brand, balance text, balance). The
+    unpaid rows live in a list sorted by (balance, row) so the most-owed brand
+    is first, alongside a running count and total. A new snapshot is diffed
+    against the previous arrays and only rows whose brand or balance changed
+    are moved in or out of the sorted index; the formatted report is rebuilt
+    only when something changed.
+    """
+
+    def __init__(self):
+        self.revision = None
+        self.updated_at = None
+
+        self._brands = np.array([], dtype=str)
+        self._balance_texts = np.array([], dtype=str)
+        self._balances = np.array([], dtype=float)
+
+        self._unpaid = []  # sorted [(balance, row_index)]
+        self._total_outstanding = 0.0
+        self._report = None
+        self._lock = threading.RLock()
+
+    # ─── Snapshots ───────────────────────────────────────────────────────
+    def apply_snapshot(self, table: SheetTable) -> int:
+        """Bring the engine up to date with a Brand Balances snapshot; returns rows changed"""
+        if table.num_columns < 2:
+            raise ValueError("The Brand Balances sheet needs at least 2 columns")
+
+        with self._lock:
+            self.updated_at = time.time()
+            if table.revision == self.revision:
+                return 0
+
+            brands = table.stripped(0)
+            texts = table.stripped(1)
+            balances = table.numeric(1)
+            excluded = np.isin(table.normalized(0), EXCLUDED_BALANCE_ROWS)
+
+            old_count, new_count = len(self._brands), table.num_rows
+            common = min(old_count, new_count)
+            changed = np.flatnonzero(
+                (self._brands[:common] != brands[:common]) | (self._balance_texts[:common] != texts[:common])
+            ).tolist()
+            changed += range(common, max(old_count, new_count))
+
+            for row_idx in changed:
+                if row_idx < old_count:
+                    self._remove(row_idx)
+            for row_idx in changed:
+                if row_idx < new_count and brands[row_idx] != '' and texts[row_idx] != '' \
+                        and not excluded[row_idx] and balances[row_idx] < 0:
+                    self._add(row_idx, float(balances[row_idx]))
+
+            self._brands, self._balance_texts, self._balances = brands, texts, balances
+            self.revision = table.revision
+            if changed:
+                self._report = None
+            return len(changed)
+
+    def _add(self, row_idx: int, balance: float):
+        insort(self._unpaid, (balance, row_idx))
+        self._total_outstanding -= balance
+
+    def _remove(self, row_idx: int):
+        balance = self._balances[row_idx]
+        if not balance < 0:
+            return
+        key = (float(balance), row_idx)
+        pos = bisect_left(self._unpaid, key)
+        if pos < len(self._unpaid) and self._unpaid[pos] == key:
+            del self._unpaid[pos]
+            self._total_outstanding += balance
+
+    # ─── Reads ───────────────────────────────────────────────────────────
+    def is_fresh(self, max_age_seconds: float) -> bool:
+        """Whether a snapshot was applied within ``max_age_seconds``"""
+        return self.updated_at is not None and time.time() - self.updated_at <= max_age_seconds
+
+    def get_unpaid(self, top_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Unpaid brands, most owed first"""
+        with self._lock:
+            entries = self._unpaid if top_n is None else self._unpaid[:top_n]
+            return [
+                {
+                    'brand': str(self._brands[row_idx]),
+                    'amount_due': -balance,
+                    'original_balance': str(self._balance_texts[row_idx])
+                }
+                for balance, row_idx in entries
+            ]
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Unpaid count, total outstanding and the largest balance due"""
+        with self._lock:
+            return {
+                'unpaid_count': len(self._unpaid),
+                'total_outstanding': self._total_outstanding if self._unpaid else 0.0,
+                'largest': self.get_unpaid(1)[0] if self._unpaid else None,
+                'revision': self.revision,
+                'updated_at': self.updated_at
+            }
+
+    def get_report(self) -> str:
+        """The unpaid-brands Slack message for the current snapshot"""
+        with self._lock:
+            if self._report is None:
+                total = self._total_outstanding if self._unpaid else 0.0
+                self._report = format_unpaid_report(self.get_unpaid(), total)
+            return self._report
+
+
+# Global engine shared by the sheets service and the brand mirror
+balances_engine = BalancesEngine()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark FuzzyBrandIndex against the original find_similar_brand scan.
+
+Usage: python bench_brand_matching.py [brands] [queries]
+"""
+
+import sys
+import time
+import random
+import string
+from difflib import SequenceMatcher
+
+from brand_matcher import FuzzyBrandIndex
+
+# BrandInfoService's "couldn't find a brand" threshold
+MIN_RATIO = 0.6
+
+
+def old_find_similar_brand(brand_name, company_names):
+    """The original BrandInfoService.find_similar_brand (full scan)"""
+    if not brand_name or not company_names:
+        return None, 0.0
+
+    best_match = None
+    best_ratio = 0.0
+
+    brand_name_lower = brand_name.lower().strip()
+
+    for company_name in company_names:
+        if not company_name:
+            continue
+
+        company_name_lower = company_name.lower().strip()
+
+        if brand_name_lower == company_name_lower:
+            return company_name, 1.0
+
+        if brand_name_lower in company_name_lower or company_name_lower in brand_name_lower:
+            ratio = max(len(brand_name_lower) / len(company_name_lower),
+                        len(company_name_lower) / len(brand_name_lower))
+            if ratio > best_ratio:
+                best_match = company_name
+                best_ratio = ratio
+
+        ratio = SequenceMatcher(None, brand_name_lower, company_name_lower).ratio()
+        if ratio > best_ratio:
+            best_match = company_name
+            best_ratio = ratio
+
+    return best_match, best_ratio
+
+
+WORDS = ['yama', 'yoga', 'fae', 'freakins', 'inde', 'wild', 'urban', 'monkey', 'blue', 'tokai', 'the', 'label',
+         'house', 'of', 'chikankari', 'bombay', 'shirt', 'company', 'snitch', 'bewakoof', 'souled', 'store',
+         'minimalist', 'plum', 'mcaffeine', 'sugar', 'cosmetics', 'nykaa', 'boat', 'noise', 'wakefit', 'sleepy',
+         'owl', 'rage', 'coffee', 'third', 'wave', 'chai', 'point', 'organic', 'tattva', 'rare', 'rabbit']
+
+
+def make_names(count: int, rng: random.Random) -> list:
+    names = set()
+    while len(names) < count:
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        if rng.random() < 0.5:
+            words.append(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 7))))
+        names.add(' '.join(w.capitalize() for w in words))
+    return sorted(names, key=lambda _: rng.random())
+
+
+def make_queries(names: list, count: int, rng: random.Random) -> list:
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names)
+        kind = rng.random()
+        if kind < 0.2:
+            queries.append(name.upper())                                  # exact, different case
+        elif kind < 0.4:
+            queries.append(rng.choice(name.split()))                      # one word (containment)
+        elif kind < 0.8:
+            chars = list(name.lower())                                    # typo
+            i = rng.randrange(len(chars))
+            chars[i] = rng.choice(string.ascii_lowercase)
+            if rng.random() < 0.5:
+                del chars[rng.randrange(len(chars))]
+            queries.append(''.join(chars))
+        else:
+            queries.append(''.join(rng.choices(string.ascii_lowercase + ' ', k=rng.randint(4, 14))))  # noise
+    return queries
+
+
+def main():
+    brands = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(7)
+    names = make_names(brands, rng)
+    queries = make_queries(names, query_count, rng)
+
+    print(f"🧪 Matching {query_count} queries against {brands:,} brands")
+
+    start = time.perf_counter()
+    old_results = [old_find_similar_brand(q, names) for q in queries]
+    old_time = (time.perf_counter() - start) / query_count
+
+    # Normalised-key matches deliberately differ from the old scan, so compare without them
+    start = time.perf_counter()
+    index = FuzzyBrandIndex(names, name_keys=False)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new_results = [index.find(q) for q in queries]
+    new_time = (time.perf_counter() - start) / query_count
+
+    start = time.perf_counter()
+    threshold_results = [index.find(q, min_ratio=MIN_RATIO) for q in queries]
+    threshold_time = (time.perf_counter() - start) / query_count
+
+    start = time.perf_counter()
+    keyed_index = FuzzyBrandIndex(names)
+    keyed_build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    keyed_results = [keyed_index.find(q, min_ratio=MIN_RATIO) for q in queries]
+    keyed_time = (time.perf_counter() - start) / query_count
+    key_hits = sum(1 for o, n in zip(old_results, keyed_results) if n[0] is not None and n[0] != o[0])
+
+    print(f"  old full scan            {old_time * 1000:9.3f} ms / query")
+    print(f"  FuzzyBrandIndex.find     {new_time * 1000:9.3f} ms / query  (build {build_time * 1000:.1f} ms once per snapshot)")
+    print(f"  {f'find(min_ratio={MIN_RATIO})':<24} {threshold_time * 1000:9.3f} ms / query  (what BrandInfoService uses)")
+    print(f"  {'with name keys':<24} {keyed_time * 1000:9.3f} ms / query  (build {keyed_build_time * 1000:.1f} ms; "
+          f"{key_hits} queries resolved differently by a key match)")
+    print(f"  speedup                  {old_time / new_time:9.1f}x  ({old_time / threshold_time:.1f}x with min_ratio)")
+
+    mismatches = [(q, o, n) for q, o, n in zip(queries, old_results, new_results) if o != n]
+    for q, o, n in mismatches[:10]:
+        print(f"  ❌ {q!r}: old {o} new {n}")
+    assert not mismatches, f"{len(mismatches)} results differ from the original scan"
+
+    # With a threshold, results at or above it are unchanged and the rest are "no match"
+    expected = [o if o[1] >= MIN_RATIO else (None, 0.0) for o in old_results]
+    assert threshold_results == expected, "min_ratio results differ from the thresholded original scan"
+    print("  ✅ same best match and ratio for every query")
+
+
+if __name__ == "__main__":
+    main()
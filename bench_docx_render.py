@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark the zip-level DocxTemplate renderer against the original python-docx fill.
+
+Usage: python bench_docx_render.py [renders]
+"""
+
+import os
+import re
+import sys
+import time
+import tempfile
+import tracemalloc
+
+from docx import Document
+
+from docx_template import DocxTemplate
+
+INVOICE_TEMPLATE = "Advance Deposit Invoice Template.docx"
+AGREEMENT_TEMPLATE = "Partnership Agreement Template.docx"
+
+INVOICE_VALUES = {
+    "Invoice_Number": "SB/DP/042", "Brand_Name": "Plum & Co", "Brand_Address_Line_1": "12, Linking Road",
+    "Brand_Address_Line_2": "Bandra West", "City": "Mumbai", "State": "Maharashtra", "Pin_Code": "400050",
+    "Phone": "+91 98765 43210", "Email": "accounts@plum.example", "Invoice_Date": "19/10/2026",
+    "Due_Date": "03/11/2026", "Amount_Due": "₹2,00,000", "Deposit_Amount": "₹2,00,000", "Sub_Total": "₹2,00,000",
+}
+
+AGREEMENT_VALUES = {
+    "brand_name": "Plum", "company_name": "PLUM GOODNESS PRIVATE LIMITED", "company_address": "12, Linking Road, Mumbai",
+    "industry": "Beauty", "flat_fee": "₹25,000", "deposit": "₹2,00,000",
+    "deposit_in_words": "two lakh", "start_date": "2026-10-19",
+}
+
+
+def _paragraph_texts(doc):
+    """The original validate_template_placeholders scan: body paragraphs, then table cells"""
+    texts = [p.text for p in doc.paragraphs]
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                texts.extend(p.text for p in cell.paragraphs)
+    return texts
+
+
+def _old_replace_text_in_paragraph(paragraph, search, replace):
+    if search not in paragraph.text:
+        return False
+    new_text = paragraph.text.replace(search, replace)
+    while len(paragraph.runs) > 1:
+        paragraph._element.remove(paragraph.runs[-1]._element)
+    if len(paragraph.runs) > 0:
+        paragraph.runs[0].text = new_text
+    else:
+        paragraph.add_run(new_text)
+    return True
+
+
+def old_fill_invoice_template(values, output_path):
+    """The original deposit_invoice_service_v2.fill_invoice_template (logging dropped)"""
+    import html
+    doc = Document(INVOICE_TEMPLATE)
+    placeholders = {m for text in _paragraph_texts(doc) for m in re.findall(r'{{([^}]+)}}', text)}
+
+    paragraphs = list(doc.paragraphs)
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                paragraphs.extend(cell.paragraphs)
+    for p in paragraphs:
+        if "#{{Invoice_Number}}" in p.text:
+            _old_replace_text_in_paragraph(p, "#{{Invoice_Number}}", html.unescape(str(values.get("Invoice_Number", ""))))
+        for key, val in values.items():
+            placeholder = f"{{{{{key}}}}}"
+            if placeholder in p.text:
+                _old_replace_text_in_paragraph(p, placeholder, html.unescape(str(val)))
+    doc.save(output_path)
+
+    remaining = {m for text in _paragraph_texts(Document(output_path)) for m in re.findall(r'{{([^}]+)}}', text)}
+    return placeholders, remaining
+
+
+def old_fill_agreement_template(values, output_path):
+    """The original agreement_service.fill_docx_template"""
+    import html
+    doc = Document(AGREEMENT_TEMPLATE)
+    for p in doc.paragraphs:
+        for key, val in values.items():
+            placeholder = f"{{{{{key}}}}}"
+            if placeholder in p.text:
+                p.text = p.text.replace(placeholder, html.unescape(str(val)))
+    doc.save(output_path)
+
+
+def measure(fn, renders):
+    """(seconds per call, peak traced bytes of one call)"""
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(renders):
+        fn()
+    elapsed = (time.perf_counter() - start) / renders
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    workdir = tempfile.mkdtemp()
+    old_path = os.path.join(workdir, "old.docx")
+
+    start = time.perf_counter()
+    invoice = DocxTemplate(INVOICE_TEMPLATE, hash_prefixed=["Invoice_Number"])
+    agreement = DocxTemplate(AGREEMENT_TEMPLATE)
+    compile_time = time.perf_counter() - start
+
+    cases = [
+        ("invoice", lambda: old_fill_invoice_template(INVOICE_VALUES, old_path),
+         lambda: invoice.render_to_buffer(INVOICE_VALUES)),
+        ("agreement", lambda: old_fill_agreement_template(AGREEMENT_VALUES, old_path),
+         lambda: agreement.render_to_buffer(AGREEMENT_VALUES)),
+    ]
+
+    print(f"🧪 Rendering each template {renders} times (compile {compile_time * 1000:.1f} ms once for both)")
+    for name, old, new in cases:
+        old_time, old_peak = measure(old, renders)
+        new_time, new_peak = measure(new, renders)
+        print(f"  {name:<10} python-docx  {old_time * 1000:8.2f} ms  peak {old_peak / 1024:8.0f} KiB")
+        print(f"  {'':<10} zip-level    {new_time * 1000:8.2f} ms  peak {new_peak / 1024:8.0f} KiB"
+              f"  ({old_time / new_time:.1f}x faster, {old_peak / new_peak:.1f}x less memory)")
+
+        # Same visible text as the original fill
+        old()
+        buffer, stats = new()
+        old_texts = _paragraph_texts(Document(old_path))
+        new_texts = _paragraph_texts(Document(buffer))
+        assert old_texts == new_texts, f"{name}: rendered text differs from the original fill"
+        assert not stats['unreplaced'], f"{name}: unreplaced {stats['unreplaced']}"
+
+    os.remove(old_path)
+    os.rmdir(workdir)
+    print("  ✅ same document text as the original fill")
+
+
+if __name__ == "__main__":
+    main()
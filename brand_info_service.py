@@ -6,15 +6,25 @@ Brand Information Service for fetching data from Brand Information Master table
 import os
 import json
 import re
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, List
 from dotenv import load_dotenv
 import openai
-from difflib import SequenceMatcher
-from direct_sheets_service import DirectSheetsService
+from direct_sheets_service import DirectSheetsService, BRAND_MASTER_SHEET_ID, BRAND_MASTER_SHEET_NAME
+from brand_matcher import QUERY_WORDS, AUTO_ACCEPT_RATIO, gazetteer_tokens
+from brand_master import brand_master_cache, BrandMasterSnapshot
 
 # Load environment variables
 load_dotenv()
 
+# Below this similarity a brand is reported as not found
+MIN_BRAND_SIMILARITY = 0.6
+
+# Numbered choices offered when there's no confident match
+MAX_BRAND_CHOICES = 3
+
+# Separators between brands in "fetch info for Freakins, FAE and Yama Yoga"
+BRAND_LIST_SEPARATOR = re.compile(r'[,;&\n]|\band\b|\bplus\b', re.IGNORECASE)
+
 class BrandInfoService:
     """Service for handling brand information queries"""
     
@@ -23,19 +33,20 @@ class BrandInfoService:
         self.openai_client = None
         
         # Brand Information Master sheet details
-        self.brand_master_sheet_id = "1wkKXtgGLevFpbIaEWWrJ7Lw8iCUEjHT_Am-78PcJn80"
-        self.brand_master_sheet_name = "Brand Information Master"
-        # Use single quotes for sheet names with spaces
-        self.brand_master_range = f"'{self.brand_master_sheet_name}'!A1:Z1000"
+        self.brand_master_sheet_id = BRAND_MASTER_SHEET_ID
+        self.brand_master_sheet_name = BRAND_MASTER_SHEET_NAME
         
         # Column mapping - no columns excluded (GST Number is in column M)
         self.excluded_columns = []  # Include all columns including GST Number
         
+        # Shared Brand Master snapshot (lookup maps built once per sheet revision)
+        self.brand_master = brand_master_cache
+        
         # State management for pending confirmations
-        self.pending_confirmations = {}  # thread_id -> brand_name
+        self.pending_confirmations = {}  # thread_id -> [brand choices, best first]
         
         # State management for brand data (used for post-lookup actions)
-        self.brand_data_cache = {}  # thread_id -> {brand_name, headers, row_data}
+        self.brand_data_cache = {}  # thread_id -> BrandRecord (row values + schema)
         
         # State management for pending agreement generation
         self.pending_agreement = {}  # thread_id -> True (waiting for confirmation)
@@ -67,7 +78,14 @@ class BrandInfoService:
         return self.openai_client
     
     def extract_brand_name(self, query: str) -> Optional[str]:
-        """Extract brand name from user query using OpenAI"""
+        """Extract brand name from user query: known Brand Master names first, then OpenAI"""
+        snapshot = self.get_brand_master()
+        if snapshot is not None:
+            known_brand = snapshot.extract_brand_name(query)
+            if known_brand:
+                print(f"📖 Found known brand in query: {known_brand}")
+                return known_brand
+        
         try:
             client = self._get_openai_client()
             
@@ -85,8 +103,10 @@ Examples:
 - "What is Theater's brand ID" → Theater
 - "fetch Serenade info" → Serenade
 - "get info for BELLAVITA" → BELLAVITA
+- "fetch info for Freakins, FAE and Yama Yoga" → Freakins, FAE, Yama Yoga
 
 Important: Extract single-word brand names correctly. The brand name can be a single word or multiple words.
+If several brands are named, return all of them separated by commas.
 
 If no clear brand name is found, return "UNCLEAR".
 """
@@ -116,6 +136,50 @@ If no clear brand name is found, return "UNCLEAR".
             # Fallback: try simple pattern matching
             return self._extract_brand_name_fallback(query)
     
+    def extract_brand_names(self, query: str) -> List[str]:
+        """
+        Every brand mentioned in the query, in order. Known Brand Master names are
+        found locally; in a list of brands, an item without a known name is kept
+        for fuzzy matching when it resembles one (a typo). Only when no known
+        name is mentioned does this fall back to extract_brand_name (and the LLM).
+        """
+        snapshot = self.get_brand_master()
+        mentions = snapshot.extract_brand_mentions(query) if snapshot is not None else []
+        
+        if not mentions:
+            extracted = self.extract_brand_name(query)
+            return [name.strip() for name in extracted.split(',') if name.strip()] if extracted else []
+        
+        found = [(start, name) for name, start, _ in mentions]
+        if BRAND_LIST_SEPARATOR.search(query):
+            # Look at the separator-delimited items that don't name a known brand
+            item_start = 0
+            for sep in list(BRAND_LIST_SEPARATOR.finditer(query)) + [None]:
+                item_end = sep.start() if sep else len(query)
+                # Words next to a known name describe it ("Freakins phone numbers")
+                if not any(start < item_end and end > item_start for _, start, end in mentions):
+                    words = [w for w in gazetteer_tokens(query[item_start:item_end]) if w not in QUERY_WORDS]
+                    if words and self._is_brand_like(snapshot, ' '.join(words)):
+                        found.append((item_start, ' '.join(words)))
+                item_start = sep.end() if sep else item_end
+        
+        names = [name for _, name in sorted(found)]
+        print(f"📖 Found brands in query: {names}")
+        return names
+    
+    def _is_brand_like(self, snapshot: BrandMasterSnapshot, item: str) -> bool:
+        """
+        Whether a leftover list item looks like a (misspelt) company name: it
+        has to match one at MIN_BRAND_SIMILARITY, and a containment match only
+        counts for whole words of the name ("Yama" for "Yama Yoga", not "co")
+        """
+        best_match, similarity_ratio = snapshot.find_similar(item, MIN_BRAND_SIMILARITY)
+        if not best_match:
+            return False
+        if similarity_ratio <= 1.0:
+            return True
+        return set(gazetteer_tokens(item)) <= set(gazetteer_tokens(best_match))
+    
     def _extract_brand_name_fallback(self, query: str) -> Optional[str]:
         """Fallback method to extract brand name using pattern matching"""
         # Common patterns for brand queries - order matters, more specific first
@@ -145,74 +209,20 @@ If no clear brand name is found, return "UNCLEAR".
         
         return None
     
-    def find_similar_brand(self, brand_name: str, company_names: List[str]) -> Tuple[Optional[str], float]:
-        """Find the most similar brand name using fuzzy matching"""
-        if not brand_name or not company_names:
-            return None, 0.0
-        
-        best_match = None
-        best_ratio = 0.0
-        
-        brand_name_lower = brand_name.lower().strip()
-        
-        for company_name in company_names:
-            if not company_name:
-                continue
-                
-            company_name_lower = company_name.lower().strip()
-            
-            # Exact match
-            if brand_name_lower == company_name_lower:
-                return company_name, 1.0
-            
-            # Check if brand name is contained in company name or vice versa
-            if brand_name_lower in company_name_lower or company_name_lower in brand_name_lower:
-                ratio = max(len(brand_name_lower) / len(company_name_lower), 
-                           len(company_name_lower) / len(brand_name_lower))
-                if ratio > best_ratio:
-                    best_match = company_name
-                    best_ratio = ratio
-            
-            # Use sequence matcher for fuzzy matching
-            ratio = SequenceMatcher(None, brand_name_lower, company_name_lower).ratio()
-            if ratio > best_ratio:
-                best_match = company_name
-                best_ratio = ratio
-        
-        return best_match, best_ratio
-    
-    def get_brand_sheet_data(self) -> Optional[Dict[str, Any]]:
-        """Get data from the Brand Information Master sheet"""
+    def get_brand_master(self) -> Optional[BrandMasterSnapshot]:
+        """The shared Brand Master snapshot (refreshed in the background once it ages)"""
         try:
-            # Try OAuth first (for private sheets)
-            sheet_data = None
-            if self.sheets_service.oauth_credentials:
-                print("🔐 Trying OAuth access for Brand Master sheet...")
-                sheet_data = self.sheets_service.read_private_sheet_oauth(
-                    self.brand_master_sheet_id, 
-                    self.brand_master_range
-                )
-            
-            # Fallback to API key (for public sheets)
-            if not sheet_data and self.sheets_service.api_key:
-                print("🔑 Trying API key access for Brand Master sheet...")
-                sheet_data = self.sheets_service.read_public_sheet(
-                    self.brand_master_sheet_id, 
-                    self.brand_master_range
-                )
-            
-            return sheet_data
-            
+            return self.brand_master.get()
         except Exception as e:
             print(f"Error accessing Brand Master sheet: {e}")
             return None
     
-    def format_brand_info(self, headers: List[str], brand_row: List[str]) -> str:
+    def format_brand_info(self, headers: List[str], brand_row: List[str], title: str = "Brand Information") -> str:
         """Format brand information in a readable format"""
         if not headers or not brand_row:
             return "No brand information found."
         
-        response = "📋 **Brand Information:**\n\n"
+        response = f"📋 **{title}:**\n\n"
         
         # Convert column letters to indices for exclusion
         excluded_indices = []
@@ -246,52 +256,45 @@ If no clear brand name is found, return "UNCLEAR".
         text_lower = text.lower().strip()
         return text_lower in confirmation_words
     
+    def resolve_pending_choice(self, thread_id: str, text: str) -> Optional[str]:
+        """
+        The brand a reply picks from the thread's pending choices: 'yes' takes
+        the first, '2' / '#2' the second, or the brand's name itself.
+        """
+        choices = self.pending_confirmations.get(thread_id)
+        if not choices:
+            return None
+        text_lower = text.lower().strip()
+        if self.is_confirmation(text_lower):
+            return choices[0]
+        number = re.fullmatch(r'#?\s*(\d+)\.?', text_lower)
+        if number and 1 <= int(number.group(1)) <= len(choices):
+            return choices[int(number.group(1)) - 1]
+        for choice in choices:
+            if choice.lower() == text_lower:
+                return choice
+        return None
+    
+    def has_pending_choice(self, thread_id: str, text: str) -> bool:
+        """Whether ``text`` answers a pending "did you mean" question in this thread"""
+        return self.resolve_pending_choice(thread_id, text) is not None
+    
     def get_brand_data_for_agreement(self, thread_id: str) -> Optional[Dict[str, str]]:
         """
         Extract and format brand data for agreement generation
         Returns dict with company_name, registered_company_name, and address
         """
-        if thread_id not in self.brand_data_cache:
+        record = self.brand_data_cache.get(thread_id)
+        if record is None:
             return None
         
-        cached_data = self.brand_data_cache[thread_id]
-        headers = cached_data['headers']
-        row_data = cached_data['row_data']
-        
-        # Create a mapping of header names to values
-        data_map = {}
-        for i, (header, value) in enumerate(zip(headers, row_data)):
-            if header and len(row_data) > i:
-                data_map[header.strip().lower()] = value.strip() if value else ""
-        
-        # Extract required fields
-        company_name = data_map.get('company name', '')
-        registered_company_name = data_map.get('registered company name', '')
-        
         # Combine address fields
-        address_parts = []
-        address_line1 = data_map.get('address line 1', '')
-        address_line2 = data_map.get('address line 2', '')
-        city = data_map.get('city', '')
-        state = data_map.get('state', '')
-        pin_code = data_map.get('pin code', '')
-        
-        if address_line1:
-            address_parts.append(address_line1)
-        if address_line2:
-            address_parts.append(address_line2)
-        if city:
-            address_parts.append(city)
-        if state:
-            address_parts.append(state)
-        if pin_code:
-            address_parts.append(pin_code)
-        
-        full_address = ", ".join(address_parts) if address_parts else ""
+        address_parts = [record.get(role) for role in ('address_line1', 'address_line2', 'city', 'state', 'pin_code')]
+        full_address = ", ".join(part for part in address_parts if part)
         
         return {
-            'company_name': company_name,
-            'registered_company_name': registered_company_name,
+            'company_name': record.get('company_name'),
+            'registered_company_name': record.get('registered_company_name'),
             'address': full_address
         }
     
@@ -300,172 +303,167 @@ If no clear brand name is found, return "UNCLEAR".
         Extract and format brand data for invoice generation
         Returns dict with company_name, separate address components, phone, and email
         """
-        if thread_id not in self.brand_data_cache:
+        record = self.brand_data_cache.get(thread_id)
+        if record is None:
             return None
         
-        cached_data = self.brand_data_cache[thread_id]
-        headers = cached_data['headers']
-        row_data = cached_data['row_data']
-        
-        # Create a mapping of header names to values
-        data_map = {}
-        for i, (header, value) in enumerate(zip(headers, row_data)):
-            if header and len(row_data) > i:
-                data_map[header.strip().lower()] = value.strip() if value else ""
-        
-        # Extract required fields - keep address components separate
-        company_name = data_map.get('company name', '')
-        address_line1 = data_map.get('address line 1', '')
-        address_line2 = data_map.get('address line 2', '')
-        city = data_map.get('city', '')
-        state = data_map.get('state', '')
-        pin_code = data_map.get('pin code', '')
-        
-        # Extract phone and email - try multiple possible column names
-        phone = data_map.get('phone', data_map.get('phone number', data_map.get('contact number', '')))
-        email = data_map.get('email', data_map.get('emailid', data_map.get('email id', data_map.get('email address', ''))))
-        
+        # Keep address components separate
         return {
-            'company_name': company_name,
-            'address_line1': address_line1,
-            'address_line2': address_line2,
-            'city': city,
-            'state': state,
-            'pin_code': pin_code,
-            'phone': phone,
-            'email': email
+            role: record.get(role)
+            for role in ('company_name', 'address_line1', 'address_line2', 'city', 'state', 'pin_code', 'phone', 'email')
         }
     
-    def fetch_brand_info_by_name(self, brand_name: str) -> str:
+    def fetch_brand_info_by_name(self, brand_name: str, thread_id: str = None) -> str:
         """Fetch brand information for a specific brand name without fuzzy matching"""
         try:
-            # Get sheet data
-            sheet_data = self.get_brand_sheet_data()
+            snapshot = self.get_brand_master()
             
-            if not sheet_data:
+            if snapshot is None:
                 return "I couldn't access the Brand Information Master sheet."
             
-            headers = sheet_data.get('headers', [])
-            rows = sheet_data.get('rows', [])
+            if snapshot.name_column is None:
+                return "I couldn't find the Company Name column in the Brand Master sheet."
             
-            if not headers or not rows:
+            if not snapshot.num_rows:
                 return "The Brand Information Master sheet appears to be empty."
             
-            # Find Company Name column (Column B)
-            company_name_col_index = None
-            for i, header in enumerate(headers):
-                if header.lower().strip() in ['company name', 'brand name', 'name'] or i == 1:
-                    company_name_col_index = i
-                    break
-            
-            if company_name_col_index is None:
-                return "I couldn't find the Company Name column in the Brand Master sheet."
-            
-            # Find the row with the matching brand (case-insensitive)
-            brand_row = None
-            for row in rows:
-                if (len(row) > company_name_col_index and 
-                    row[company_name_col_index].strip().lower() == brand_name.lower()):
-                    brand_row = row
-                    break
+            # Find the row with the matching brand (case-insensitive name -> row map)
+            record = snapshot.find_record(brand_name)
             
-            if not brand_row:
+            if record is None:
                 return f"I couldn't find information for '{brand_name}' in the Brand Master sheet."
             
+            # Cache brand data for post-lookup actions
+            if thread_id:
+                self.brand_data_cache[thread_id] = record
+            
             # Format and return the brand information
-            formatted_info = self.format_brand_info(headers, brand_row)
+            formatted_info = self.format_brand_info(record.headers, record.row)
             
             return f"✅ Found information for **{brand_name}**:\n\n{formatted_info}"
             
         except Exception as e:
             return f"Sorry, I encountered an error: {e}"
     
+    def _process_multi_brand_query(self, snapshot: BrandMasterSnapshot, brand_names: List[str], thread_id: str = None) -> str:
+        """Combined response for a query naming several brands"""
+        records, unsure, missing = [], [], []
+        for brand_name in brand_names:
+            best_match, similarity_ratio = snapshot.find_similar(brand_name, MIN_BRAND_SIMILARITY)
+            if not best_match:
+                missing.append(brand_name)
+            elif similarity_ratio < AUTO_ACCEPT_RATIO:
+                if all(match != best_match for _, match, _ in unsure):
+                    unsure.append((brand_name, best_match, similarity_ratio))
+            else:
+                record = snapshot.find_record(best_match)
+                if record is not None and all(r.row_index != record.row_index for r in records):
+                    records.append(record)
+        
+        # Post-lookup actions (agreement/invoice) need a single brand
+        if thread_id and len(records) == 1:
+            self.brand_data_cache[thread_id] = records[0]
+        
+        sections = []
+        if records:
+            sections.append(f"✅ Found information for {len(records)} brand{'s' if len(records) != 1 else ''}:")
+            for record in records:
+                sections.append(self.format_brand_info(record.headers, record.row, title=record.brand_name).rstrip())
+        if missing:
+            sections.append("❌ Couldn't find: " + ", ".join(f"'{name}'" for name in missing))
+        if unsure:
+            # Numbered choices the thread's reply can pick from, as in the single-brand case
+            if len(unsure) == 1:
+                name = unsure[0][0]
+                choices = snapshot.top_matches(name, MAX_BRAND_CHOICES, MIN_BRAND_SIMILARITY)
+                lines = [f"{number}. **{match}** (similarity: {min(ratio, 1.0):.0%})"
+                         for number, (match, ratio) in enumerate(choices, 1)]
+                sections.append(f"🤔 Not sure about '{name}'. Did you mean:\n" + "\n".join(lines))
+            else:
+                choices = [(match, ratio) for _, match, ratio in unsure]
+                lines = [f"{number}. '{name}' → **{match}**? (similarity: {ratio:.0%})"
+                         for number, (name, match, ratio) in enumerate(unsure, 1)]
+                sections.append("🤔 Not sure about:\n" + "\n".join(lines))
+            sections[-1] += "\n\nReply with a number (or 'yes' for the first) and I'll fetch the information."
+            if thread_id:
+                self.pending_confirmations[thread_id] = [match for match, _ in choices]
+                print(f"💾 Stored pending confirmation for thread {thread_id}: {self.pending_confirmations[thread_id]}")
+        return "\n\n".join(sections)
+    
     def process_brand_query(self, query: str, thread_id: str = None) -> str:
         """Main method to process brand information queries"""
         try:
-            # Check if this is a confirmation response
+            # Check if this answers a pending "did you mean" question
             if thread_id and thread_id in self.pending_confirmations:
-                if self.is_confirmation(query):
-                    brand_name = self.pending_confirmations[thread_id]
+                brand_name = self.resolve_pending_choice(thread_id, query)
+                if brand_name:
                     del self.pending_confirmations[thread_id]  # Clear the pending confirmation
                     print(f"✅ Confirmation received for: {brand_name}")
-                    return self.fetch_brand_info_by_name(brand_name)
+                    return self.fetch_brand_info_by_name(brand_name, thread_id)
                 else:
                     # Not a confirmation, clear pending and continue with normal processing
                     del self.pending_confirmations[thread_id]
             
-            # Step 1: Extract brand name from query
-            brand_name = self.extract_brand_name(query)
+            # Step 1: Extract brand name(s) from query
+            brand_names = self.extract_brand_names(query)
+            brand_name = brand_names[0] if brand_names else None
             
             if not brand_name:
                 return "I couldn't identify a clear brand name from your query. Could you please specify which brand you're asking about?\n\nFor example:\n• 'fetch Freakins info'\n• 'Show me info for Yama Yoga'\n• 'What's FAE's GST number'"
             
             print(f"🔍 Extracted brand name: {brand_name}")
             
-            # Step 2: Get sheet data
-            sheet_data = self.get_brand_sheet_data()
+            # Step 2: Get the shared Brand Master snapshot
+            snapshot = self.get_brand_master()
             
-            if not sheet_data:
+            if snapshot is None:
                 return "I couldn't access the Brand Information Master sheet. Please make sure I have permission to access it or that it's publicly viewable."
             
-            headers = sheet_data.get('headers', [])
-            rows = sheet_data.get('rows', [])
+            if snapshot.name_column is None:
+                return "I couldn't find the Company Name column in the Brand Master sheet."
             
-            if not headers or not rows:
+            if not snapshot.num_rows:
                 return "The Brand Information Master sheet appears to be empty or has no data."
             
-            # Step 3: Find Company Name column (Column B)
-            company_name_col_index = None
-            for i, header in enumerate(headers):
-                if header.lower().strip() in ['company name', 'brand name', 'name'] or i == 1:  # Column B is index 1
-                    company_name_col_index = i
-                    break
-            
-            if company_name_col_index is None:
-                return "I couldn't find the Company Name column in the Brand Master sheet."
+            # Several brands: resolve them all against the snapshot and answer together
+            if len(brand_names) > 1:
+                return self._process_multi_brand_query(snapshot, brand_names, thread_id)
             
-            # Step 4: Extract all company names for fuzzy matching
-            company_names = []
-            for row in rows:
-                if len(row) > company_name_col_index and row[company_name_col_index].strip():
-                    company_names.append(row[company_name_col_index].strip())
+            # Step 3: Find the best matching brand in the snapshot's company name index
+            best_match, similarity_ratio = snapshot.find_similar(brand_name, MIN_BRAND_SIMILARITY)
             
-            # Step 5: Find the best matching brand
-            best_match, similarity_ratio = self.find_similar_brand(brand_name, company_names)
-            
-            if not best_match or similarity_ratio < 0.6:  # Threshold for similarity
+            if not best_match or similarity_ratio < MIN_BRAND_SIMILARITY:  # Threshold for similarity
                 return f"I couldn't find a brand matching '{brand_name}' in the Brand Master sheet.\n\nPlease check the spelling or try a different variation of the brand name."
             
-            # Step 6: If similarity is not perfect, ask for confirmation
-            if similarity_ratio < 0.9:
+            # Step 6: If similarity is not perfect, offer the closest brands as numbered choices
+            if similarity_ratio < AUTO_ACCEPT_RATIO:
+                choices = snapshot.top_matches(brand_name, MAX_BRAND_CHOICES, MIN_BRAND_SIMILARITY)
                 # Store pending confirmation
                 if thread_id:
-                    self.pending_confirmations[thread_id] = best_match
-                    print(f"💾 Stored pending confirmation for thread {thread_id}: {best_match}")
-                return f"I found a similar brand: **{best_match}** (similarity: {similarity_ratio:.0%})\n\nDid you mean '{best_match}'? Please confirm and I'll fetch the information."
+                    self.pending_confirmations[thread_id] = [name for name, _ in choices]
+                    print(f"💾 Stored pending confirmation for thread {thread_id}: {[name for name, _ in choices]}")
+                if len(choices) == 1:
+                    return f"I found a similar brand: **{best_match}** (similarity: {similarity_ratio:.0%})\n\nDid you mean '{best_match}'? Please confirm and I'll fetch the information."
+                
+                response = f"I couldn't find an exact match for '{brand_name}'. Did you mean:\n\n"
+                for number, (name, ratio) in enumerate(choices, 1):
+                    response += f"{number}. **{name}** (similarity: {min(ratio, 1.0):.0%})\n"
+                response += "\nReply with a number (or 'yes' for the first) and I'll fetch the information."
+                return response
             
             # Step 7: Find the row with the matching brand
-            brand_row = None
-            for row in rows:
-                if (len(row) > company_name_col_index and 
-                    row[company_name_col_index].strip().lower() == best_match.lower()):
-                    brand_row = row
-                    break
-            
-            if not brand_row:
+            record = snapshot.find_record(best_match)
+            
+            if record is None:
                 return f"Found the brand '{best_match}' but couldn't retrieve its information."
             
             # Step 8: Cache brand data for post-lookup actions
             if thread_id:
-                self.brand_data_cache[thread_id] = {
-                    'brand_name': best_match,
-                    'headers': headers,
-                    'row_data': brand_row
-                }
+                self.brand_data_cache[thread_id] = record
                 print(f"💾 Cached brand data for thread {thread_id}: {best_match}")
             
             # Step 9: Format and return the brand information (without post-lookup prompt)
-            formatted_info = self.format_brand_info(headers, brand_row)
+            formatted_info = self.format_brand_info(record.headers, record.row)
             
             response = f"✅ Found information for **{best_match}**:\n\n{formatted_info}"
             
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Shared in-memory snapshot of the Brand Information Master sheet
+"""
+
+import os
+import time
+import threading
+from typing import Optional, Dict, List, Tuple
+from dotenv import load_dotenv
+
+from direct_sheets_service import BRAND_MASTER_SHEET_ID, BRAND_MASTER_SHEET_NAME
+from sheet_table import SheetTable
+from sheet_schema import SheetSchema, brand_master_schema
+from brand_matcher import FuzzyBrandIndex, BrandGazetteer
+from brand_mirror import brand_mirror
+
+# Load environment variables
+load_dotenv()
+
+# A snapshot older than this is still served while a fresh copy loads in the background
+BRAND_MASTER_REFRESH_SECONDS = int(os.getenv('BRAND_MASTER_REFRESH_SECONDS', '300'))
+
+
+class BrandRecord:
+    """
+    A brand remembered for a thread: its row's cells and the sheet's schema.
+
+    Only the row is copied out of the snapshot (the schema and its headers
+    are shared), so a thread's record doesn't keep a replaced snapshot, with
+    its table and lookup indexes, alive.
+    """
+
+    __slots__ = ('schema', 'row_index', 'row')
+
+    def __init__(self, schema: SheetSchema, row_index: int, row: List[str]):
+        self.schema = schema
+        self.row_index = row_index
+        self.row = row
+
+    @property
+    def brand_name(self) -> str:
+        return self.get('company_name')
+
+    @property
+    def headers(self) -> List[str]:
+        return self.schema.headers
+
+    def get(self, role: str) -> str:
+        """Stripped cell for a schema field ('' when the sheet has no such column)"""
+        col = self.schema.get(role)
+        return self.row[col].strip() if col is not None and col < len(self.row) else ''
+
+
+class BrandMasterSnapshot:
+    """
+    One read of the Brand Information Master with its lookup structures.
+
+    Built once per sheet revision: the header schema (see sheet_schema), a
+    lowercased company name -> row index map for exact lookups, the
+    fuzzy-match index and the gazetteer used to spot company names in queries.
+    """
+
+    def __init__(self, table: SheetTable):
+        self.table = table
+        self.headers = table.headers
+        self.revision = table.revision
+        self.loaded_at = time.time()
+
+        self.schema = brand_master_schema(self.headers)
+        self.name_column = self.schema['company_name']
+        if self.schema.missing:
+            print(f"⚠️  Brand Master has no column for: {', '.join(self.schema.missing)}")
+
+        self._rows_by_name = {}  # lowercased company name -> first row index
+        self.brand_index = FuzzyBrandIndex([])
+        self.gazetteer = BrandGazetteer([])
+        if self.name_column is not None:
+            for row_idx, key in enumerate(table.normalized(self.name_column).tolist()):
+                if key and key not in self._rows_by_name:
+                    self._rows_by_name[key] = row_idx
+            names = table.stripped(self.name_column)
+            self.brand_index = FuzzyBrandIndex(names[names != ''].tolist())
+            self.gazetteer = BrandGazetteer(names[names != ''].tolist())
+
+    @property
+    def num_rows(self) -> int:
+        return self.table.num_rows
+
+    def find_row_index(self, brand_name: str) -> Optional[int]:
+        """Row index of the first brand whose company name matches case-insensitively"""
+        return self._rows_by_name.get(brand_name.strip().lower())
+
+    def find_row(self, brand_name: str) -> Optional[List[str]]:
+        row_idx = self.find_row_index(brand_name)
+        return self.table.row(row_idx) if row_idx is not None else None
+
+    def find_record(self, brand_name: str) -> Optional[BrandRecord]:
+        """BrandRecord for an exact (case-insensitive) company name"""
+        row_idx = self.find_row_index(brand_name)
+        return BrandRecord(self.schema, row_idx, self.table.row(row_idx)) if row_idx is not None else None
+
+    def find_similar(self, brand_name: str, min_ratio: float = 0.0) -> Tuple[Optional[str], float]:
+        """Best fuzzy company-name match (see FuzzyBrandIndex.find)"""
+        return self.brand_index.find(brand_name, min_ratio)
+
+    def top_matches(self, brand_name: str, k: int, min_ratio: float = 0.0) -> List[Tuple[str, float]]:
+        """The k best company-name matches, best first (see FuzzyBrandIndex.top_k)"""
+        return self.brand_index.top_k(brand_name, k, min_ratio)
+
+    def extract_brand_name(self, text: str) -> Optional[str]:
+        """Longest known company name mentioned in ``text`` (see BrandGazetteer)"""
+        return self.gazetteer.extract(text)
+
+    def extract_brand_mentions(self, text: str) -> List[Tuple[str, int, int]]:
+        """Every known company name mentioned in ``text`` as (name, start, end), in order"""
+        return self.gazetteer.extract_all(text)
+
+    def value(self, row_idx: int, role: str) -> str:
+        """Stripped cell for a schema field ('' when the sheet has no such column)"""
+        col = self.schema.get(role)
+        return str(self.table.stripped(col)[row_idx]) if col is not None else ''
+
+
+class BrandMasterCache:
+    """
+    Keeps one BrandMasterSnapshot shared by every brand lookup.
+
+    The first caller loads it synchronously; after BRAND_MASTER_REFRESH_SECONDS
+    callers keep getting the current snapshot while a daemon thread reloads the
+    sheet (from the brand mirror when it's fresh). Lookup maps are only rebuilt
+    when the sheet's revision actually changed.
+    """
+
+    def __init__(self, refresh_seconds: int = BRAND_MASTER_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.sheets_service = None
+        self._snapshot = None
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # guards _refreshing only, never held during a read
+        self._refreshing = False
+        self.last_error = None
+
+    def _get_sheets_service(self):
+        if self.sheets_service is None:
+            from direct_sheets_service import DirectSheetsService
+            self.sheets_service = DirectSheetsService()
+        return self.sheets_service
+
+    def _read_table(self) -> Optional[SheetTable]:
+        try:
+            if brand_mirror.is_fresh('brand_master'):
+                table = brand_mirror.get_master_table()
+                if table is not None:
+                    return table
+        except Exception as e:
+            print(f"⚠️  Brand mirror unavailable, reading the Brand Master live: {e}")
+        return self._get_sheets_service().read_sheet(BRAND_MASTER_SHEET_ID, BRAND_MASTER_SHEET_NAME)
+
+    def get(self) -> Optional[BrandMasterSnapshot]:
+        """The current snapshot (loading it on first use); None if the sheet can't be read"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+        if time.time() - snapshot.loaded_at > self.refresh_seconds:
+            self._refresh_in_background()
+        return snapshot
+
+    def refresh(self) -> Optional[BrandMasterSnapshot]:
+        """Reload the sheet now; keeps the previous snapshot if the read fails"""
+        with self._load_lock:
+            start = time.perf_counter()
+            try:
+                table = self._read_table()
+            except Exception as e:
+                table = None
+                self.last_error = str(e)
+            if table is None:
+                print("⚠️  Couldn't read the Brand Master sheet (OAuth and API key)")
+                return self._snapshot
+
+            if self._snapshot is not None and self._snapshot.revision == table.revision:
+                self._snapshot.loaded_at = time.time()
+            else:
+                self._snapshot = BrandMasterSnapshot(table)
+                print(f"📇 Loaded Brand Master snapshot ({table.num_rows} brands) in {time.perf_counter() - start:.2f}s")
+            return self._snapshot
+
+    def _refresh_in_background(self):
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='brand-master-refresh', daemon=True).start()
+
+    def get_status(self) -> Dict[str, object]:
+        snapshot = self._snapshot
+        return {
+            'loaded': snapshot is not None,
+            'rows': snapshot.num_rows if snapshot else 0,
+            'age_seconds': round(time.time() - snapshot.loaded_at) if snapshot else None,
+            'last_error': self.last_error
+        }
+
+
+# Global snapshot shared by all BrandInfoService instances
+brand_master_cache = BrandMasterCache()
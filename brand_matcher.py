@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Brand-name matching over a Brand Master snapshot (fuzzy lookup and mention extraction)
+"""
+
+import re
+import heapq
+from bisect import bisect_right
+from difflib import SequenceMatcher
+from typing import Optional, List, Tuple
+
+import numpy as np
+
+# Trigram-ranked names scored first; their best ratio bounds which other names need scoring
+NGRAM_SIZE = 3
+SEED_CANDIDATES = 4
+
+# Keys shorter than this match too many unrelated names to be trusted
+MIN_SOUND_KEY_LENGTH = 3
+
+# Ratio reported for a normalised-key match (the real ratio is used when higher). Sound keys
+# drop vowels ("Palm" ~ "Plum"), so they stay below AUTO_ACCEPT_RATIO and the user confirms
+KEY_MATCH_RATIOS = {'collapsed': 1.0, 'phonetic': 0.85, 'skeleton': 0.8}
+
+# Matches at or above this are taken without asking the user (BrandInfoService)
+AUTO_ACCEPT_RATIO = 0.9
+
+# A key shared by several names ("Kapda" and "Kupid" are both "kpd") picks none of them:
+# their ratios are capped here, below AUTO_ACCEPT_RATIO, so they are offered as choices
+SHARED_KEY_MAX_RATIO = 0.85
+
+# Sound rules for phonetic_key, applied in order (Double-Metaphone-style, tuned for Indian brand spellings)
+_PHONETIC_RULES = [
+    (r'ch', '%'),            # keep "ch" apart from the hard c/k rules below
+    (r'c(?=[eiy])', 's'),
+    (r'ck|c|q', 'k'),
+    (r'ph', 'f'),
+    (r'([bdgkt])h', r'\1'),  # aspirated consonants: bh, dh, gh, kh, th
+    (r'sh', 's'),
+    (r'x', 'ks'),
+    (r'z', 's'),
+    (r'w', 'v'),
+    (r'%', 'c'),
+]
+
+
+def _ngrams(text: str) -> set:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def collapsed_key(name: str) -> str:
+    """Lowercase letters and digits only ("Inde-Wild" and "inde wild" -> "indewild")"""
+    return re.sub(r'[\W_]+', '', name.lower())
+
+
+def _skeleton(key: str) -> str:
+    """Repeated letters collapsed and vowels after the first letter dropped"""
+    key = re.sub(r'(.)\1+', r'\1', key)
+    return key[:1] + re.sub(r'[aeiouy]', '', key[1:])
+
+
+def skeleton_key(name: str) -> str:
+    """Consonant skeleton of the collapsed name ("Bewakoof" -> "bwkf")"""
+    return _skeleton(collapsed_key(name))
+
+
+def phonetic_key(name: str) -> str:
+    """Sound-alike key: the skeleton after spelling variants are folded ("Chikankari" ~ "Chickenkaari")"""
+    key = collapsed_key(name)
+    for pattern, replacement in _PHONETIC_RULES:
+        key = re.sub(pattern, replacement, key)
+    return _skeleton(key)
+
+
+NAME_KEYS = {'collapsed': collapsed_key, 'phonetic': phonetic_key, 'skeleton': skeleton_key}
+
+
+class FuzzyBrandIndex:
+    """
+    Index of company names answering ``find_similar_brand`` without scanning every name.
+
+    ``find`` keeps the original matching rules: an exact (case-insensitive)
+    match scores 1.0; a name containing the query, or contained in it, scores
+    max(len ratio) (> 1.0, so it beats any fuzzy score); otherwise the
+    SequenceMatcher ratio. The first name in sheet order wins ties.
+
+    With ``name_keys`` (the default) a name whose collapsed, phonetic or
+    skeleton key equals the query's also matches before any fuzzy scoring,
+    at KEY_MATCH_RATIOS. A collapsed-key match ranks just below exact, the
+    sound keys just below containment. Names sharing a key are ranked by
+    their real SequenceMatcher ratio and capped at SHARED_KEY_MAX_RATIO.
+
+    Exact matches are a dict lookup, containment uses substring search over
+    the joined names, and fuzzy matching scores a few trigram candidates
+    first. Every other name is only scored if its character-overlap upper
+    bound on the SequenceMatcher ratio can still beat the best found.
+    """
+
+    def __init__(self, names: List[str], name_keys: bool = True):
+        self.names = list(names)
+        self._lower = [name.lower().strip() if name else '' for name in self.names]
+
+        self._exact = {}  # lowercased name -> first position
+        for pos, key in enumerate(self._lower):
+            if key and key not in self._exact:
+                self._exact[key] = pos
+        # Later duplicates (and blanks) never rank, so only first occurrences are candidates
+        self._first = np.array([bool(key) and self._exact[key] == pos for pos, key in enumerate(self._lower)], dtype=bool)
+
+        # Normalised key -> first positions sharing it, per key kind
+        self._name_keys = {}
+        if name_keys:
+            for kind, make_key in NAME_KEYS.items():
+                keys = {}
+                for pos in np.flatnonzero(self._first).tolist():
+                    key = make_key(self._lower[pos])
+                    if len(key) >= (2 if kind == 'collapsed' else MIN_SOUND_KEY_LENGTH):
+                        keys.setdefault(key, []).append(pos)
+                self._name_keys[kind] = keys
+
+        # All names in one string for C-speed substring search; starts[i] is name i's offset
+        self._joined = '\x00'.join(self._lower)
+        self._starts = []
+        offset = 0
+        for key in self._lower:
+            self._starts.append(offset)
+            offset += len(key) + 1
+
+        postings = {}
+        for pos, key in enumerate(self._lower):
+            for gram in _ngrams(key):
+                postings.setdefault(gram, []).append(pos)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+        # Per-name character counts bound the SequenceMatcher ratio: matches <= shared characters
+        alphabet = sorted({ch for key in self._lower for ch in key})
+        self._alphabet = {ch: i for i, ch in enumerate(alphabet)}
+        self._char_counts = np.zeros((len(alphabet), len(self.names)), dtype=np.int32)  # char x name
+        for pos, key in enumerate(self._lower):
+            for ch in key:
+                self._char_counts[self._alphabet[ch], pos] += 1
+        self._lengths = np.array([len(key) for key in self._lower], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def find(self, brand_name: str, min_ratio: float = 0.0) -> Tuple[Optional[str], float]:
+        """
+        (best matching company name, ratio), or (None, 0.0).
+        With ``min_ratio`` names that can't reach it aren't scored, and a best
+        match below it is reported as no match.
+        """
+        best = self.top_k(brand_name, 1, min_ratio)
+        return best[0] if best else (None, 0.0)
+
+    def top_k(self, brand_name: str, k: int = 3, min_ratio: float = 0.0) -> List[Tuple[str, float]]:
+        """
+        The ``k`` best distinct company names as [(name, ratio)], best first.
+
+        Candidates are offered to a bounded min-heap of the k best in a single
+        pass: the exact match, then normalised-key and containment matches, then fuzzy candidates
+        in decreasing upper-bound order until no remaining bound can displace
+        the heap's weakest entry.
+        """
+        if not brand_name or not self.names or k < 1:
+            return []
+        query = brand_name.lower().strip()
+        if not query:
+            return []
+
+        # (tier, ratio, rank, -pos); exact > containment > fuzzy as find_similar_brand did, with key
+        # matches between. ``rank`` orders equal reported ratios (the real ratio for key matches)
+        heap = []
+        offered = set()
+
+        def offer(pos: int, tier: int, ratio: float, rank: Optional[float] = None):
+            if pos in offered:
+                return
+            offered.add(pos)
+            if ratio <= 0 or ratio < min_ratio:
+                return
+            item = (tier, ratio, ratio if rank is None else rank, -pos)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+        pos = self._exact.get(query)
+        if pos is not None:
+            offer(pos, 5, 1.0)
+        self._offer_key_matches(query, offer, 'collapsed', 4)
+        self._offer_containment(query, offer)
+        self._offer_key_matches(query, offer, 'phonetic', 2)
+        self._offer_key_matches(query, offer, 'skeleton', 1)
+        if len(heap) < k or heap[0][0] == 0:
+            self._offer_fuzzy(query, heap, k, min_ratio, offered, offer)
+
+        return [(self.names[-neg_pos], ratio) for _, ratio, _, neg_pos in sorted(heap, reverse=True)]
+
+    def _offer_key_matches(self, query: str, offer, kind: str, tier: int):
+        """Names whose ``kind`` key (see NAME_KEYS) equals the query's"""
+        keys = self._name_keys.get(kind)
+        if not keys:
+            return
+        positions = keys.get(NAME_KEYS[kind](query), ())
+        for pos in positions:
+            real = SequenceMatcher(None, query, self._lower[pos]).ratio()
+            ratio = max(KEY_MATCH_RATIOS[kind], real)
+            if len(positions) > 1:
+                ratio = min(ratio, SHARED_KEY_MAX_RATIO)
+            offer(pos, tier, ratio, real)
+
+    def _offer_containment(self, query: str, offer):
+        """Names containing the query (ratio len(name)/len(query)) or contained in it (len(query)/len(name))"""
+        offset = self._joined.find(query)
+        while offset != -1:
+            pos = bisect_right(self._starts, offset) - 1
+            if self._first[pos] and len(self._lower[pos]) != len(query):
+                offer(pos, 3, len(self._lower[pos]) / len(query))
+            if pos + 1 >= len(self._starts):
+                break
+            offset = self._joined.find(query, self._starts[pos + 1])
+
+        # Every substring of the query is a dict lookup
+        for size in range(1, len(query)):
+            for start in range(len(query) - size + 1):
+                pos = self._exact.get(query[start:start + size])
+                if pos is not None:
+                    offer(pos, 3, len(query) / size)
+
+    def _offer_fuzzy(self, query: str, heap: list, k: int, min_ratio: float, offered: set, offer):
+        """SequenceMatcher ratios, scoring only names whose upper bound can still enter the heap"""
+        def floor() -> float:
+            return max(heap[0][1], min_ratio) if len(heap) == k else min_ratio
+
+        def score(pos: int):
+            offer(pos, 0, SequenceMatcher(None, query, self._lower[pos]).ratio())
+
+        # Seed with the names sharing the most trigrams so the floor rises early
+        hits = [self._postings[gram] for gram in _ngrams(query) if gram in self._postings]
+        if hits:
+            ids, shared = np.unique(np.concatenate(hits), return_counts=True)
+            for pos in ids[np.lexsort((ids, -shared))].tolist():
+                if len(offered) >= SEED_CANDIDATES + k:
+                    break
+                if pos not in offered and self._first[pos]:
+                    score(pos)
+
+        # ratio = 2*matches/(len_a+len_b) and matches <= shared characters
+        query_cols, query_counts = [], []
+        for ch in set(query):
+            if ch in self._alphabet:
+                query_cols.append(self._alphabet[ch])
+                query_counts.append(query.count(ch))
+        counts = np.array(query_counts, dtype=np.int32)[:, None]
+        shared_chars = np.minimum(self._char_counts[query_cols], counts).sum(axis=0)
+        bound = 2.0 * shared_chars / (self._lengths + len(query))
+        bound[~self._first] = -1.0
+
+        # Most promising first; stop once no bound can displace the weakest of the k best
+        remaining = np.flatnonzero((bound >= floor()) & (bound > 0))
+        remaining = remaining[np.lexsort((remaining, -bound[remaining]))]
+        for pos in remaining.tolist():
+            if len(heap) == k and (0, bound[pos], bound[pos], -pos) < heap[0]:
+                break
+            if bound[pos] < min_ratio:
+                break
+            if pos not in offered:
+                score(pos)
+
+
+# Words that make up the query around a brand name; a one-word company name
+# made of one of these isn't taken as a mention on its own
+QUERY_WORDS = {
+    'a', 'an', 'the', 'of', 'for', 'me', 'we', 'is', 'do', 'have', 'what', 'whats', 's', 'and', 'about',
+    'fetch', 'get', 'show', 'find', 'give', 'info', 'information', 'details', 'detail', 'data',
+    'brand', 'brands', 'company', 'id', 'gst', 'number', 'email', 'phone', 'address', 'contact',
+    'please', 'pls', 'can', 'you', 'i', 'need', 'want', 'tell', 'send', 'look', 'up', 'lookup', 'all',
+    'their', 'them', 'these', 'those', 'with', 'on', 'to', 'us', 'thanks', 'also',
+    'it', 'its', 'numbers', 'emails', 'addresses', 'contacts', 'ids', 'both',
+}
+
+
+def _token_spans(text: str) -> List[Tuple[str, int, int]]:
+    """(token, start, end) for each lowercased word, possessive 's dropped, offsets into ``text``"""
+    text = re.sub(r"['’]s\b", '  ', text.lower())  # same length, so offsets still line up
+    return [(m.group(), m.start(), m.end()) for m in re.finditer(r'[^\W_]+', text)]
+
+
+def gazetteer_tokens(text: str) -> List[str]:
+    """Lowercased word tokens with possessive 's and punctuation dropped ("FAE's GST" -> fae, gst)"""
+    return [token for token, _, _ in _token_spans(text)]
+
+
+class BrandGazetteer:
+    """
+    Finds known company names mentioned in free text.
+
+    Names are tokenised (case- and punctuation-insensitive) into a word trie;
+    ``extract`` walks the trie from every query position and returns the
+    longest name found (most words, then most characters, then earliest).
+    ``extract_all`` returns every mention, scanning left to right and taking
+    the longest name at each position.
+    """
+
+    _END = object()  # trie key holding the company name that ends at a node
+
+    def __init__(self, names: List[str]):
+        self._trie = {}
+        for name in names:
+            tokens = gazetteer_tokens(name)
+            if not tokens or (len(tokens) == 1 and (tokens[0] in QUERY_WORDS or len(tokens[0]) < 2)):
+                continue
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(self._END, name.strip())  # first name in sheet order wins
+
+    def extract(self, text: str) -> Optional[str]:
+        """The longest known company name mentioned in ``text``, or None"""
+        tokens = gazetteer_tokens(text)
+        best, best_key = None, None
+        for start in range(len(tokens)):
+            node = self._trie
+            chars = 0
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                chars += len(tokens[end])
+                if self._END in node:
+                    key = (end - start + 1, chars, -start)
+                    if best_key is None or key > best_key:
+                        best, best_key = node[self._END], key
+        return best
+
+    def _longest_at(self, tokens: List[str], start: int) -> Tuple[Optional[str], int]:
+        """(company name, end token) of the longest name starting at ``start``"""
+        node = self._trie
+        best, best_end = None, start
+        for end in range(start, len(tokens)):
+            node = node.get(tokens[end])
+            if node is None:
+                break
+            if self._END in node:
+                best, best_end = node[self._END], end
+        return best, best_end
+
+    def extract_all(self, text: str) -> List[Tuple[str, int, int]]:
+        """Every known company name mentioned in ``text`` as (name, start, end) character spans, in order"""
+        spans = _token_spans(text)
+        tokens = [token for token, _, _ in spans]
+        found, seen = [], set()
+        start = 0
+        while start < len(tokens):
+            name, end = self._longest_at(tokens, start)
+            if name is None:
+                start += 1
+                continue
+            if name not in seen:
+                seen.add(name)
+                found.append((name, spans[start][1], spans[end][2]))
+            start = end + 1
+        return found
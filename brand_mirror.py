@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Local SQLite mirror of the Brand Information Master and Brand Balances sheets
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+from dotenv import load_dotenv
+
+from direct_sheets_service import (
+    BRAND_BALANCES_SHEET_ID, BRAND_BALANCES_SHEET_NAME, BRAND_BALANCES_LAST_COLUMN,
+    BRAND_MASTER_SHEET_ID, BRAND_MASTER_SHEET_NAME
+)
+from sheet_table import SheetTable
+from sheet_schema import brand_master_schema
+from balances_engine import balances_engine
+
+# Load environment variables
+load_dotenv()
+
+BRAND_MIRROR_DB_PATH = os.getenv('BRAND_MIRROR_DB_PATH', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'brand_mirror.db'
+))
+
+# Set to false to always read the sheets live
+BRAND_MIRROR_ENABLED = os.getenv('BRAND_MIRROR_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# How often the background job re-reads both sheets
+BRAND_MIRROR_SYNC_SECONDS = int(os.getenv('BRAND_MIRROR_SYNC_SECONDS', '300'))
+
+# Mirror data older than this is ignored and callers read the sheets live
+BRAND_MIRROR_MAX_AGE_SECONDS = int(os.getenv('BRAND_MIRROR_MAX_AGE_SECONDS', '900'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    sheet TEXT PRIMARY KEY,
+    headers TEXT NOT NULL,
+    key_column INTEGER,
+    row_count INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS brand_master (
+    row_index INTEGER PRIMARY KEY,
+    company_name TEXT NOT NULL,
+    name_norm TEXT NOT NULL,
+    brand_id TEXT,
+    row_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_brand_master_name ON brand_master (name_norm);
+CREATE INDEX IF NOT EXISTS idx_brand_master_brand_id ON brand_master (brand_id);
+CREATE TABLE IF NOT EXISTS brand_balances (
+    row_index INTEGER PRIMARY KEY,
+    brand TEXT NOT NULL,
+    brand_norm TEXT NOT NULL,
+    balance_text TEXT NOT NULL,
+    balance REAL
+);
+CREATE INDEX IF NOT EXISTS idx_brand_balances_balance ON brand_balances (balance);
+CREATE INDEX IF NOT EXISTS idx_brand_balances_brand ON brand_balances (brand_norm);
+"""
+
+
+class BrandMirror:
+    """
+    Keeps a local copy of the brand sheets for sub-millisecond lookups.
+
+    A daemon thread re-reads both sheets every BRAND_MIRROR_SYNC_SECONDS and
+    swaps the rows in one transaction. Readers check ``is_fresh`` first and
+    fall back to live sheet reads when the mirror is missing or too old.
+    """
+
+    def __init__(self, db_path: str = BRAND_MIRROR_DB_PATH, sync_seconds: int = BRAND_MIRROR_SYNC_SECONDS,
+                 max_age_seconds: int = BRAND_MIRROR_MAX_AGE_SECONDS):
+        self.db_path = db_path
+        self.sync_seconds = sync_seconds
+        self.max_age_seconds = max_age_seconds
+        self.sheets_service = None
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread (WAL lets readers run during a sync)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # ─── Sync ────────────────────────────────────────────────────────────
+    def _get_sheets_service(self):
+        if self.sheets_service is None:
+            from direct_sheets_service import DirectSheetsService
+            self.sheets_service = DirectSheetsService()
+        return self.sheets_service
+
+    def start(self):
+        """Start the background sync thread (no-op if it's already running or disabled)"""
+        if not BRAND_MIRROR_ENABLED:
+            print("⚠️  Brand mirror disabled (BRAND_MIRROR_ENABLED=false) - brand lookups read the sheets live")
+            return
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='brand-mirror-sync', daemon=True)
+        self._thread.start()
+        print(f"🪞 Brand mirror sync started (every {self.sync_seconds}s → {self.db_path})")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync()
+            self._stop.wait(self.sync_seconds)
+
+    def sync(self) -> Dict[str, bool]:
+        """Re-read both sheets into the mirror; a sheet that can't be read keeps its previous copy"""
+        service = self._get_sheets_service()
+        results = {}
+        for sheet, sheet_id, sheet_name, last_column, writer in (
+            ('brand_master', BRAND_MASTER_SHEET_ID, BRAND_MASTER_SHEET_NAME, None, self._write_master),
+            ('brand_balances', BRAND_BALANCES_SHEET_ID, BRAND_BALANCES_SHEET_NAME, BRAND_BALANCES_LAST_COLUMN, self._write_balances),
+        ):
+            start = time.perf_counter()
+            try:
+                table = service.read_sheet(sheet_id, sheet_name, last_column)
+                if table is None:
+                    raise RuntimeError(f"couldn't read {sheet_name}")
+                writer(table)
+                results[sheet] = True
+                print(f"🪞 Mirrored {table.num_rows} rows of {sheet_name} in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                results[sheet] = False
+                self.last_error = f"{sheet}: {e}"
+                print(f"⚠️  Brand mirror sync failed for {sheet}: {e}")
+        return results
+
+    def _write_master(self, table: SheetTable):
+        schema = brand_master_schema(table.headers).require('company_name')
+        name_col, id_col = schema['company_name'], schema['brand_id']
+        names = table.stripped(name_col).tolist()
+        brand_ids = table.stripped(id_col).tolist() if id_col is not None else [None] * table.num_rows
+        records = [
+            (i, names[i], names[i].lower(), brand_ids[i] or None, json.dumps(table.row(i), ensure_ascii=False))
+            for i in range(table.num_rows)
+        ]
+        self._replace('brand_master', table, name_col, records,
+                      'INSERT INTO brand_master VALUES (?, ?, ?, ?, ?)')
+
+    def _write_balances(self, table: SheetTable):
+        if table.num_columns < 2:
+            raise ValueError("Brand Balances needs at least 2 columns")
+        brands = table.stripped(0).tolist()
+        balance_texts = table.stripped(1).tolist()
+        balances = table.numeric(1).tolist()
+        records = [
+            (i, brands[i], brands[i].lower(), balance_texts[i], None if balances[i] != balances[i] else balances[i])
+            for i in range(table.num_rows)
+        ]
+        self._replace('brand_balances', table, 0, records,
+                      'INSERT INTO brand_balances VALUES (?, ?, ?, ?, ?)')
+
+        # Keep the precomputed unpaid report in step with the mirror
+        balances_engine.apply_snapshot(table)
+
+    def _replace(self, sheet: str, table: SheetTable, key_column: int, records: List[tuple], insert_sql: str):
+        """Swap a sheet's rows and metadata in a single transaction"""
+        conn = self._connect()
+        with self._write_lock, conn:
+            conn.execute(f'DELETE FROM {sheet}')
+            conn.executemany(insert_sql, records)
+            conn.execute(
+                'INSERT OR REPLACE INTO meta VALUES (?, ?, ?, ?, ?)',
+                (sheet, json.dumps(table.headers, ensure_ascii=False), key_column, table.num_rows, time.time())
+            )
+
+    # ─── Reads ───────────────────────────────────────────────────────────
+    def _meta(self, sheet: str) -> Optional[Tuple[str, int, int, float]]:
+        try:
+            return self._connect().execute(
+                'SELECT headers, key_column, row_count, synced_at FROM meta WHERE sheet = ?', (sheet,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            # An unusable database just means every read goes live
+            self.last_error = str(e)
+            return None
+
+    def is_fresh(self, sheet: str) -> bool:
+        """Whether ``sheet`` has been mirrored within the staleness threshold"""
+        meta = self._meta(sheet)
+        return meta is not None and time.time() - meta[3] <= self.max_age_seconds
+
+    def get_headers(self, sheet: str) -> Optional[List[str]]:
+        meta = self._meta(sheet)
+        return json.loads(meta[0]) if meta else None
+
+    def get_key_column(self, sheet: str) -> Optional[int]:
+        """Column the mirror keyed the sheet on (company name / brand)"""
+        meta = self._meta(sheet)
+        return meta[1] if meta else None
+
+    def get_company_names(self) -> List[str]:
+        """Company names in sheet row order (blank rows included, so positions are row indexes)"""
+        rows = self._connect().execute('SELECT company_name FROM brand_master ORDER BY row_index').fetchall()
+        return [name for (name,) in rows]
+
+    def find_brand_row(self, brand_name: str) -> Optional[Tuple[int, List[str]]]:
+        """(row_index, row) of the first brand whose company name matches case-insensitively"""
+        found = self._connect().execute(
+            'SELECT row_index, row_json FROM brand_master WHERE name_norm = ? ORDER BY row_index LIMIT 1',
+            (brand_name.strip().lower(),)
+        ).fetchone()
+        return (found[0], json.loads(found[1])) if found else None
+
+    def find_brand_by_id(self, brand_id: str) -> Optional[Tuple[int, List[str]]]:
+        """(row_index, row) for a Brand ID"""
+        found = self._connect().execute(
+            'SELECT row_index, row_json FROM brand_master WHERE brand_id = ? ORDER BY row_index LIMIT 1',
+            (brand_id.strip(),)
+        ).fetchone()
+        return (found[0], json.loads(found[1])) if found else None
+
+    def get_brand_row(self, row_index: int) -> Optional[List[str]]:
+        found = self._connect().execute(
+            'SELECT row_json FROM brand_master WHERE row_index = ?', (row_index,)
+        ).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def get_master_table(self) -> Optional[SheetTable]:
+        """The mirrored Brand Information Master as a SheetTable"""
+        headers = self.get_headers('brand_master')
+        if headers is None:
+            return None
+        rows = self._connect().execute('SELECT row_json FROM brand_master ORDER BY row_index').fetchall()
+        return SheetTable.from_values([headers] + [json.loads(row) for (row,) in rows], BRAND_MASTER_SHEET_ID)
+    
+    def get_unpaid_balances(self, excluded_names: List[str]) -> List[Tuple[str, str, float]]:
+        """(brand, balance text, balance) for negative balances, most owed first"""
+        placeholders = ', '.join('?' * len(excluded_names)) or "''"
+        return self._connect().execute(
+            f"""SELECT brand, balance_text, balance FROM brand_balances
+                WHERE balance < 0 AND brand != '' AND brand_norm NOT IN ({placeholders})
+                ORDER BY balance, row_index""",
+            list(excluded_names)
+        ).fetchall()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Sync age and row counts per mirrored sheet"""
+        status = {'db_path': self.db_path, 'running': bool(self._thread and self._thread.is_alive()),
+                  'last_error': self.last_error}
+        for sheet in ('brand_master', 'brand_balances'):
+            meta = self._meta(sheet)
+            status[sheet] = None if meta is None else {
+                'rows': meta[2],
+                'age_seconds': round(time.time() - meta[3]),
+                'fresh': self.is_fresh(sheet)
+            }
+        return status
+
+
+# Global mirror instance (the sync thread is started by the Slack apps)
+brand_mirror = BrandMirror()
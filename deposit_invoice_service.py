@@ -13,6 +13,8 @@ from dotenv import load_dotenv
 
 # Google Docs-based PDF exporter
 from google_pdf import convert_docx_to_pdf_google as convert_docx_to_pdf
+from numeric_parsing import parse_amount, amount_to_str
+from utils import format_currency
 
 load_dotenv()
 
@@ -36,19 +38,10 @@ def clean_text(text: str) -> str:
     return re.sub(r"<@[\w]+>", "", text).strip()
 
 
-def format_currency(value: str) -> str:
-    """Format an integer/float string as Indian-rupee currency."""
-    try:
-        num = float(value)
-        return f"₹{num:,.0f}"
-    except:
-        return value
-
-
 def convert_number_to_words(number_str: str) -> str:
     """Convert a number string to words (Indian numbering system)."""
     try:
-        num = int(float(number_str))
+        num = int(parse_amount(number_str))
         
         if num == 0:
             return "zero"
@@ -104,20 +97,20 @@ def convert_number_to_words(number_str: str) -> str:
 def extract_deposit_amount(message_text: str) -> str:
     """
     Extract deposit amount from the message.
-    Patterns: "5000", "Rs 5000", "₹5000", "deposit 5000", "amount 5000" etc.
+    Patterns: "5000", "Rs 5000", "₹5000", "deposit 5000", "amount 5000", "Rs 2 lakh" etc.
     """
     # Try various patterns - more specific patterns first
     patterns = [
-        r'(?:amount|deposit)\s+(?:of\s+)?(?:rs\.?|₹)?\s*([0-9,]+)',
-        r'(?:for|invoice\s+for)\s+(?:rs\.?|₹)?\s*([0-9,]+)',
-        r'(?:rs\.?|₹)\s*([0-9,]+)',
+        r'(?:amount|deposit)\s+(?:of\s+)?(?:rs\.?|₹)?\s*([0-9,]+(?:\.\d+)?(?:\s*(?:lakhs?|lacs?|crores?|cr|k)\b)?)',
+        r'(?:for|invoice\s+for)\s+(?:rs\.?|₹)?\s*([0-9,]+(?:\.\d+)?(?:\s*(?:lakhs?|lacs?|crores?|cr|k)\b)?)',
+        r'(?:rs\.?|₹)\s*([0-9,]+(?:\.\d+)?(?:\s*(?:lakhs?|lacs?|crores?|cr|k)\b)?)',
         r'\b([0-9]{4,})\b',  # Any 4+ digit number as fallback
     ]
     
     for pattern in patterns:
         match = re.search(pattern, message_text, re.IGNORECASE)
         if match:
-            amount = match.group(1).replace(',', '')
+            amount = amount_to_str(match.group(1))
             print(f"💰 Extracted deposit amount: {amount}")
             return amount
     
@@ -7,14 +7,17 @@ Generates deposit invoices using the Advance Deposit Invoice Template
 import os
 import re
 from datetime import date, timedelta
-from docx import Document
 from slack_sdk import WebClient
 from dotenv import load_dotenv
 import json
 from typing import Dict, List, Tuple, Optional
 
-# Google Docs-based PDF exporter
-from google_pdf import convert_docx_to_pdf_google as convert_docx_to_pdf
+# Local LibreOffice pool, Google Docs as fallback
+from pdf_converter import convert_docx_to_pdf
+from numeric_parsing import parse_amount, amount_to_str
+from utils import format_currency, new_job_id, document_filename
+from docx_template import get_template
+from artifact_cache import artifact_cache
 
 load_dotenv()
 
@@ -115,21 +118,10 @@ def clean_text(text: str) -> str:
     return cleaned
 
 
-def format_currency(value: str) -> str:
-    """Format an integer/float string as Indian-rupee currency."""
-    try:
-        num = float(value)
-        formatted = f"₹{num:,.0f}"
-        return formatted
-    except Exception as e:
-        print(f"⚠️ Error formatting currency '{value}': {e}")
-        return value
-
-
 def convert_number_to_words(number_str: str) -> str:
     """Convert a number string to words (Indian numbering system)."""
     try:
-        num = int(float(number_str))
+        num = int(parse_amount(number_str))
         
         if num == 0:
             return "zero"
@@ -186,16 +178,16 @@ def convert_number_to_words(number_str: str) -> str:
 def extract_deposit_amount(message_text: str, logger: InvoiceLogger) -> str:
     """
     Extract deposit amount from the message.
-    Patterns: "5000", "Rs 5000", "₹5000", "deposit 5000", "amount 5000" etc.
+    Patterns: "5000", "Rs 5000", "₹5000", "deposit 5000", "amount 5000", "Rs 2 lakh" etc.
     """
     logger.set_stage("EXTRACT_AMOUNT")
     logger.log(f"Attempting to extract amount from: '{message_text[:100]}...'", "DEBUG")
     
     # Try various patterns - more specific patterns first
     patterns = [
-        (r'(?:amount|deposit)\s+(?:of\s+)?(?:rs\.?|₹)?\s*([0-9,]+)', "Pattern: 'amount/deposit of Rs X'"),
-        (r'(?:for|invoice\s+for)\s+(?:rs\.?|₹)?\s*([0-9,]+)', "Pattern: 'for Rs X'"),
-        (r'(?:rs\.?|₹)\s*([0-9,]+)', "Pattern: 'Rs X' or '₹X'"),
+        (r'(?:amount|deposit)\s+(?:of\s+)?(?:rs\.?|₹)?\s*([0-9,]+(?:\.\d+)?(?:\s*(?:lakhs?|lacs?|crores?|cr|k)\b)?)', "Pattern: 'amount/deposit of Rs X'"),
+        (r'(?:for|invoice\s+for)\s+(?:rs\.?|₹)?\s*([0-9,]+(?:\.\d+)?(?:\s*(?:lakhs?|lacs?|crores?|cr|k)\b)?)', "Pattern: 'for Rs X'"),
+        (r'(?:rs\.?|₹)\s*([0-9,]+(?:\.\d+)?(?:\s*(?:lakhs?|lacs?|crores?|cr|k)\b)?)', "Pattern: 'Rs X' or '₹X'"),
         (r'\b([0-9]{4,})\b', "Pattern: 'Any 4+ digit number'"),
     ]
     
@@ -203,7 +195,7 @@ def extract_deposit_amount(message_text: str, logger: InvoiceLogger) -> str:
         logger.log(f"Trying {description}", "DEBUG")
         match = re.search(pattern, message_text, re.IGNORECASE)
         if match:
-            amount = match.group(1).replace(',', '')
+            amount = amount_to_str(match.group(1))
             logger.log(f"Successfully extracted amount: {amount} using {description}", "SUCCESS")
             return amount
     
@@ -426,166 +418,34 @@ def extract_invoice_fields(message_text: str, brand_data: Optional[dict], logger
     return values, missing
 
 
-def validate_template_placeholders(doc: Document, logger: InvoiceLogger) -> List[str]:
-    """
-    Validate which placeholders exist in the template.
-    Returns list of found placeholders.
-    """
-    logger.set_stage("VALIDATE_TEMPLATE")
-    logger.log("Scanning template for placeholders", "DEBUG")
-    
-    placeholders = set()
-    
-    # Check paragraphs
-    for p in doc.paragraphs:
-        text = p.text
-        matches = re.findall(r'{{([^}]+)}}', text)
-        for match in matches:
-            placeholders.add(match)
-            logger.log(f"Found placeholder in paragraph: {{{{{match}}}}}", "DEBUG")
-    
-    # Check tables
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    text = paragraph.text
-                    matches = re.findall(r'{{([^}]+)}}', text)
-                    for match in matches:
-                        placeholders.add(match)
-                        logger.log(f"Found placeholder in table: {{{{{match}}}}}", "DEBUG")
-    
-    logger.log(f"Template validation complete. Found {len(placeholders)} unique placeholders", "SUCCESS")
-    return sorted(list(placeholders))
-
-
-def replace_text_in_paragraph(paragraph, search: str, replace: str, logger: InvoiceLogger) -> bool:
-    """
-    Helper function to replace text in a paragraph, handling runs correctly.
-    Returns True if replacement was made, False otherwise.
-    """
-    if search not in paragraph.text:
-        return False
-    
-    logger.log(f"Replacing '{search}' with '{replace}' in paragraph", "DEBUG")
-    
-    # Get the full text
-    full_text = paragraph.text
-    
-    # Check if replacement is actually needed
-    if search not in full_text:
-        logger.log(f"Search text '{search}' not found in paragraph text", "DEBUG")
-        return False
-    
-    # Replace the search text
-    new_text = full_text.replace(search, replace)
-    
-    # Clear all existing runs except the first one
-    while len(paragraph.runs) > 1:
-        paragraph._element.remove(paragraph.runs[-1]._element)
-    
-    # Set the new text on the first run (or add a run if none exist)
-    if len(paragraph.runs) > 0:
-        paragraph.runs[0].text = new_text
-    else:
-        paragraph.add_run(new_text)
-    
-    logger.log(f"Successfully replaced '{search}' with '{replace}'", "SUCCESS")
-    return True
-
-
-def fill_invoice_template(values: dict, output_path: str, logger: InvoiceLogger) -> Dict[str, int]:
+def fill_invoice_template(values: dict, logger: InvoiceLogger) -> Tuple[bytes, Dict[str, object]]:
     """
-    Open the invoice template, replace placeholders, and save to output_path.
-    Returns dict with replacement statistics.
+    Fill the compiled invoice template in memory.
+    Returns (.docx bytes, {'total': replacements made, 'unreplaced': placeholders left without a value}).
     """
-    import html
-    
     logger.set_stage("FILL_TEMPLATE")
-    logger.log(f"Opening template: {TEMPLATE_PATH}", "INFO")
     
     try:
-        doc = Document(TEMPLATE_PATH)
+        template = get_template(TEMPLATE_PATH, hash_prefixed=["Invoice_Number"])
     except Exception as e:
         logger.log(f"Failed to open template: {e}", "ERROR")
         raise
+    logger.log(f"Template contains placeholders: {template.placeholders}", "INFO")
     
-    # First, validate what placeholders exist in the template
-    template_placeholders = validate_template_placeholders(doc, logger)
-    logger.log(f"Template contains placeholders: {template_placeholders}", "INFO")
-    
-    # Track replacements
-    replacements = {
-        "paragraphs": 0,
-        "tables": 0,
-        "total": 0
-    }
-    
-    logger.log("Starting placeholder replacement in paragraphs", "INFO")
-    
-    # Replace in paragraphs
-    for i, p in enumerate(doc.paragraphs):
-        # Special handling for invoice number with # prefix
-        if "#{{Invoice_Number}}" in p.text:
-            invoice_value = html.unescape(str(values.get("Invoice_Number", "")))
-            if replace_text_in_paragraph(p, "#{{Invoice_Number}}", invoice_value, logger):
-                replacements["paragraphs"] += 1
-                replacements["total"] += 1
-        
-        # Replace other placeholders
-        for key, val in values.items():
-            placeholder = f"{{{{{key}}}}}"
-            if placeholder in p.text:
-                clean_value = html.unescape(str(val))
-                if replace_text_in_paragraph(p, placeholder, clean_value, logger):
-                    replacements["paragraphs"] += 1
-                    replacements["total"] += 1
-    
-    logger.log("Starting placeholder replacement in tables", "INFO")
-    
-    # Replace in tables
-    for table_idx, table in enumerate(doc.tables):
-        for row_idx, row in enumerate(table.rows):
-            for cell_idx, cell in enumerate(row.cells):
-                for paragraph in cell.paragraphs:
-                    # Special handling for invoice number with # prefix
-                    if "#{{Invoice_Number}}" in paragraph.text:
-                        invoice_value = html.unescape(str(values.get("Invoice_Number", "")))
-                        if replace_text_in_paragraph(paragraph, "#{{Invoice_Number}}", invoice_value, logger):
-                            replacements["tables"] += 1
-                            replacements["total"] += 1
-                            logger.log(f"Replaced in table {table_idx}, row {row_idx}, cell {cell_idx}", "DEBUG")
-                    
-                    # Replace other placeholders
-                    for key, val in values.items():
-                        placeholder = f"{{{{{key}}}}}"
-                        if placeholder in paragraph.text:
-                            clean_value = html.unescape(str(val))
-                            if replace_text_in_paragraph(paragraph, placeholder, clean_value, logger):
-                                replacements["tables"] += 1
-                                replacements["total"] += 1
-                                logger.log(f"Replaced {placeholder} in table {table_idx}, row {row_idx}, cell {cell_idx}", "DEBUG")
-    
-    logger.log(f"Replacement complete: {replacements['total']} total replacements ({replacements['paragraphs']} in paragraphs, {replacements['tables']} in tables)", "SUCCESS")
-    
-    # Save document
     try:
-        doc.save(output_path)
-        logger.log(f"Invoice template saved to: {output_path}", "SUCCESS")
+        buffer, replacements = template.render_to_buffer(values)
+        logger.log(f"Invoice rendered in memory ({buffer.getbuffer().nbytes:,} bytes)", "SUCCESS")
     except Exception as e:
-        logger.log(f"Failed to save document: {e}", "ERROR")
+        logger.log(f"Failed to render document: {e}", "ERROR")
         raise
     
-    # Verify replacements by checking for remaining placeholders
-    verify_doc = Document(output_path)
-    remaining_placeholders = validate_template_placeholders(verify_doc, logger)
-    
-    if remaining_placeholders:
-        logger.log(f"WARNING: Found {len(remaining_placeholders)} unreplaced placeholders: {remaining_placeholders}", "WARNING")
+    logger.log(f"Replacement complete: {replacements['total']} total replacements", "SUCCESS")
+    if replacements['unreplaced']:
+        logger.log(f"WARNING: Found {len(replacements['unreplaced'])} unreplaced placeholders: {replacements['unreplaced']}", "WARNING")
     else:
         logger.log("Verification complete: All placeholders replaced successfully", "SUCCESS")
     
-    return replacements
+    return buffer.getvalue(), replacements
 
 
 def handle_deposit_invoice(event, say, brand_data: Optional[dict] = None):
@@ -706,15 +566,13 @@ def handle_deposit_invoice(event, say, brand_data: Optional[dict] = None):
     
     logger.log("All required fields extracted successfully", "SUCCESS")
     
-    # Generate filename
-    brand_slug = re.sub(r"\W+", "_", values["brand_name"].lower())
-    docx_path = f"{brand_slug}_deposit_invoice.docx"
-    pdf_path = f"{brand_slug}_deposit_invoice.pdf"
-    logger.log(f"Generated filenames: DOCX={docx_path}, PDF={pdf_path}", "DEBUG")
+    # Per-job names, so concurrent invoices for the same brand never collide
+    job_id = new_job_id()
+    logger.log(f"Job ID: {job_id}", "DEBUG")
     
     # Fill template
     try:
-        replacements = fill_invoice_template(values, docx_path, logger)
+        docx_data, replacements = fill_invoice_template(values, logger)
         logger.log(f"Template filled successfully with {replacements['total']} replacements", "SUCCESS")
     except Exception as e:
         logger.log(f"Error filling invoice template: {e}", "ERROR")
@@ -724,29 +582,38 @@ def handle_deposit_invoice(event, say, brand_data: Optional[dict] = None):
     
     # Convert to PDF
     logger.set_stage("PDF_CONVERSION")
-    pdf_ok = convert_docx_to_pdf(docx_path, pdf_path)
+    cache_key = get_template(TEMPLATE_PATH, hash_prefixed=["Invoice_Number"]).cache_key(values)
+    pdf_data = artifact_cache.get(cache_key, "pdf")
+    if pdf_data is not None:
+        logger.log(f"Reusing cached PDF for identical invoice ({cache_key[:12]})", "SUCCESS")
+    else:
+        pdf_data = convert_docx_to_pdf(docx_data, f"Sara_Invoice_{job_id}")
+        if pdf_data is not None:
+            artifact_cache.put(cache_key, "pdf", pdf_data)
+    pdf_ok = pdf_data is not None
     
     if pdf_ok:
         logger.log("PDF conversion successful", "SUCCESS")
-        upload_path = pdf_path
+        upload_data = pdf_data
+        filename = document_filename(values["brand_name"], "deposit_invoice", "pdf", job_id)
         title = f"{values['Brand_Name']} Deposit Invoice (PDF)"
     else:
         logger.log("PDF conversion failed, will upload DOCX", "WARNING")
-        upload_path = docx_path
+        upload_data = docx_data
+        filename = document_filename(values["brand_name"], "deposit_invoice", "docx", job_id)
         title = f"{values['Brand_Name']} Deposit Invoice (Word)"
     
-    # Upload to Slack
+    # Upload to Slack straight from memory
     logger.set_stage("SLACK_UPLOAD")
     try:
-        with open(upload_path, "rb") as f:
-            slack_client.files_upload_v2(
-                channel=channel,
-                thread_ts=thread_ts,
-                file=f,
-                filename=os.path.basename(upload_path),
-                title=title,
-                initial_comment=f"📎 Here's your *{title}*"
-            )
+        slack_client.files_upload_v2(
+            channel=channel,
+            thread_ts=thread_ts,
+            content=upload_data,
+            filename=filename,
+            title=title,
+            initial_comment=f"📎 Here's your *{title}*"
+        )
         logger.log(f"Invoice uploaded successfully: {title}", "SUCCESS")
         
         # Send success summary
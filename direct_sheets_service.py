@@ -5,28 +5,114 @@ Direct Google Sheets service that bypasses MCP authentication issues
 
 import os
 import json
+import time
+import threading
 import requests
-from typing import Optional, Dict, Any, List
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple, Union
 from dotenv import load_dotenv
+import numpy as np
 import openai
+from google_credentials import credential_manager
+from sheet_table import SheetTable, SheetTableBuilder, as_table, string_column, contains_text
+from sheet_index import SheetIndex
+from sheet_query import SheetQueryEngine, normalize_question
+from balances_engine import balances_engine, format_unpaid_report, EXCLUDED_BALANCE_ROWS
+from sheet_join import enrich_brands, format_enriched_unpaid_report
+from sheet_schema import SheetSchema, BRAND_LIST_FIELDS
 
 # Load environment variables
 load_dotenv('mcp-gdrive/.env')
 load_dotenv()
 
+# Brand Balances sheet (payment status)
+BRAND_BALANCES_SHEET_ID = "1Ch6NflcXS6BfK0zZ8SoeoiU_PwKe8_oEVjDX2tTE8QY"
+BRAND_BALANCES_SHEET_NAME = "Brand Balances"
+BRAND_BALANCES_LAST_COLUMN = "B"  # Brand name and balance only
+
+# Brand Information Master sheet (company details)
+BRAND_MASTER_SHEET_ID = "1wkKXtgGLevFpbIaEWWrJ7Lw8iCUEjHT_Am-78PcJn80"
+BRAND_MASTER_SHEET_NAME = "Brand Information Master"
+
+# A column requested by header name, by any of several header names, or by 0-based index
+ColumnSpec = Union[str, int, List[str]]
+
+# Upper bound on spreadsheets fetched in parallel by batch_read_tables
+MAX_CONCURRENT_SPREADSHEETS = 8
+
+# Sheets with more rows than this are fetched in pages of this size
+SHEET_PAGE_ROWS = int(os.getenv('SHEET_PAGE_ROWS', '5000'))
+
+# How long spreadsheets.get grid properties are reused before re-checking
+GRID_CACHE_SECONDS = int(os.getenv('SHEET_GRID_CACHE_SECONDS', '300'))
+
+# Words asking for Brand Master details alongside a payment answer -> detail fields joined in
+DETAIL_QUERY_WORDS = {
+    'email': ['email'],
+    'gst': ['gst'],
+    'phone': ['phone'],
+}
+ALL_DETAILS_WORDS = ['contact', 'details', 'info']
+
+# A snapshot read for a query is reused by follow-up questions for this long, as long as
+# Drive reports the same file version. When Drive can't be asked (no Drive access), edits
+# show up only once the snapshot expires, so this is also the worst-case staleness.
+SNAPSHOT_CACHE_SECONDS = int(os.getenv('SHEET_SNAPSHOT_CACHE_SECONDS', '60'))
+
+# Answers kept per (sheet, snapshot revision, question)
+QUERY_RESULT_CACHE_SIZE = int(os.getenv('QUERY_RESULT_CACHE_SIZE', '256'))
+
+# Answers containing these are failures and are never cached
+UNCACHEABLE_ANSWER_MARKERS = ['encountered an error', 'Error analyzing', "I couldn't", 'cannot analyze it']
+
+# Used only when grid properties can't be read
+LEGACY_DEFAULT_RANGE = "A1:Z10000"
+
+def column_letter(column_number: int) -> str:
+    """1-based column number -> A1 column letters (1 -> A, 27 -> AA)"""
+    letters = ''
+    while column_number > 0:
+        column_number, remainder = divmod(column_number - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def column_number(letters: str) -> int:
+    """A1 column letters -> 1-based column number (A -> 1, AA -> 27)"""
+    number = 0
+    for ch in letters.upper():
+        number = number * 26 + (ord(ch) - ord('A') + 1)
+    return number
+
+def quote_sheet_name(sheet_name: str) -> str:
+    """Quote a tab name for use in an A1 range"""
+    return "'" + sheet_name.replace("'", "''") + "'"
+
+def _unique_in_order(values: np.ndarray) -> List[str]:
+    """Distinct values of an array in first-seen order"""
+    if not len(values):
+        return []
+    _, first_idx = np.unique(values, return_index=True)
+    return [str(values[i]) for i in np.sort(first_idx)]
+
 class DirectSheetsService:
     """Direct Google Sheets service with OAuth for private sheets"""
     
     def __init__(self):
         self.api_key = os.getenv('GOOGLE_API_KEY')
         self.openai_client = None
-        self.oauth_credentials = None
-        
-        # Try to load OAuth credentials for private sheet access
-        self._load_oauth_credentials()
+        self._thread_local = threading.local()
+        self._grid_cache = {}  # sheet_id -> (fetched_at, [tab properties])
+        self._header_cache = {}  # (sheet_id, sheet_name) -> (fetched_at, [headers])
+        self._index_cache = {}  # (sheet_id, source columns) -> SheetIndex
+        self._index_lock = threading.Lock()
+        self._snapshot_cache = {}  # (sheet_id, method, brand count?) -> (fetched_at, version, table, brand_columns)
+        self._result_cache = OrderedDict()  # (sheet_id, revision, source columns, question) -> answer
+        self._result_lock = threading.Lock()
+        self.query_engine = SheetQueryEngine()
         
         # Don't raise error if neither is available - just log warning
-        if not self.api_key and not self.oauth_credentials:
+        if not self.api_key and not credential_manager.has_oauth_credentials():
             print("⚠️  Neither GOOGLE_API_KEY nor OAuth credentials found - sheets access will be limited")
     
     def _get_openai_client(self):
@@ -53,45 +139,10 @@ class DirectSheetsService:
                 })()
         return self.openai_client
     
-    def _load_oauth_credentials(self):
-        """Load OAuth credentials from token.json or environment variables"""
-        try:
-            from google.auth.transport.requests import Request
-            from google.oauth2.credentials import Credentials
-            
-            # First try to load from environment variables (for Render deployment)
-            google_token_json = os.getenv('GOOGLE_TOKEN_JSON')
-            if google_token_json:
-                try:
-                    import json
-                    token_data = json.loads(google_token_json)
-                    self.oauth_credentials = Credentials.from_authorized_user_info(token_data)
-                    
-                    # Refresh if expired
-                    if self.oauth_credentials.expired and self.oauth_credentials.refresh_token:
-                        self.oauth_credentials.refresh(Request())
-                        
-                    print("✅ OAuth credentials loaded from environment variable")
-                    return
-                except Exception as e:
-                    print(f"⚠️  Failed to load OAuth credentials from environment: {e}")
-            
-            # Fallback to token.json file (for local development)
-            token_path = 'token.json'
-            if os.path.exists(token_path):
-                self.oauth_credentials = Credentials.from_authorized_user_file(token_path)
-                
-                # Refresh if expired
-                if self.oauth_credentials.expired and self.oauth_credentials.refresh_token:
-                    self.oauth_credentials.refresh(Request())
-                    
-                print("✅ OAuth credentials loaded from token.json file")
-            else:
-                print("⚠️  No OAuth credentials found (neither GOOGLE_TOKEN_JSON env var nor token.json file)")
-                
-        except Exception as e:
-            print(f"⚠️  Failed to load OAuth credentials: {e}")
-            self.oauth_credentials = None
+    @property
+    def oauth_credentials(self):
+        """OAuth credentials from the shared credential manager (kept fresh in the background)"""
+        return credential_manager.get_credentials()
     
     def extract_sheet_id(self, url_or_id: str) -> str:
         """Extract sheet ID from URL or return ID if already provided"""
@@ -103,19 +154,16 @@ class DirectSheetsService:
                 return sheet_id
         return url_or_id
     
-    def read_private_sheet_oauth(self, sheet_id: str, range_name: str = "A1:Z10000") -> Optional[Dict[str, Any]]:
-        """Read data from a private Google Sheet using OAuth credentials"""
+    def read_private_sheet_oauth(self, sheet_id: str, range_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Read data from a private Google Sheet using OAuth credentials (range sized from the grid by default)"""
         if not self.oauth_credentials:
             return None
             
         try:
-            from googleapiclient.discovery import build
-            
-            # Build the service with OAuth credentials
-            service = build('sheets', 'v4', credentials=self.oauth_credentials)
+            range_name = range_name or self.plan_range(sheet_id)
             
             # Call the Sheets API
-            result = service.spreadsheets().values().get(
+            result = self._sheets_api().spreadsheets().values().get(
                 spreadsheetId=sheet_id,
                 range=range_name
             ).execute()
@@ -141,9 +189,10 @@ class DirectSheetsService:
             print(f"OAuth Error reading sheet: {e}")
             return None
     
-    def read_public_sheet(self, sheet_id: str, range_name: str = "A1:Z1000") -> Optional[Dict[str, Any]]:
-        """Read data from a public Google Sheet using API key"""
+    def read_public_sheet(self, sheet_id: str, range_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Read data from a public Google Sheet using API key (range sized from the grid by default)"""
         try:
+            range_name = range_name or self.plan_range(sheet_id)
             url = f"https://sheets.googleapis.com/v4/spreadsheets/{sheet_id}/values/{range_name}"
             params = {'key': self.api_key}
             
@@ -175,14 +224,352 @@ class DirectSheetsService:
             print(f"Error reading sheet: {e}")
             return None
     
-    def analyze_sheet_data(self, sheet_data: Dict[str, Any], query: str) -> str:
+    def read_sheet_table(self, sheet_id: str, range_name: str) -> Optional[SheetTable]:
+        """Read a range as a SheetTable, trying OAuth first and then the API key"""
+        sheet_data = None
+        if self.oauth_credentials:
+            sheet_data = self.read_private_sheet_oauth(sheet_id, range_name)
+        
+        if not sheet_data and self.api_key:
+            sheet_data = self.read_public_sheet(sheet_id, range_name)
+        
+        return SheetTable.from_sheet_data(sheet_data) if sheet_data else None
+    
+    def _drive_api(self):
+        """Drive API client for the current thread"""
+        service = getattr(self._thread_local, 'drive_api', None)
+        if service is None:
+            from googleapiclient.discovery import build
+            service = build('drive', 'v3', credentials=self.oauth_credentials, cache_discovery=False)
+            self._thread_local.drive_api = service
+        return service
+    
+    def _sheets_api(self):
+        """Sheets API client for the current thread (httplib2 clients are not thread-safe)"""
+        service = getattr(self._thread_local, 'sheets_api', None)
+        if service is None:
+            from googleapiclient.discovery import build
+            service = build('sheets', 'v4', credentials=self.oauth_credentials, cache_discovery=False)
+            self._thread_local.sheets_api = service
+        return service
+    
+    def _batch_get_values(self, sheet_id: str, ranges: List[str], method: Optional[str] = None,
+                          major_dimension: str = 'ROWS') -> Optional[List[List[List[str]]]]:
+        """
+        Fetch several ranges of one spreadsheet with a single values:batchGet call.
+        Returns one values list per range (in request order), or None if both auth methods fail.
+        ``method`` restricts access to 'oauth' or 'api_key'; by default OAuth is tried first.
+        """
+        if method in (None, 'oauth') and self.oauth_credentials:
+            try:
+                result = self._sheets_api().spreadsheets().values().batchGet(
+                    spreadsheetId=sheet_id,
+                    ranges=ranges,
+                    majorDimension=major_dimension
+                ).execute()
+                return [vr.get('values', []) for vr in result.get('valueRanges', [])]
+            except Exception as e:
+                print(f"OAuth Error batch reading sheet {sheet_id}: {e}")
+        
+        if method in (None, 'api_key') and self.api_key:
+            try:
+                url = f"https://sheets.googleapis.com/v4/spreadsheets/{sheet_id}/values:batchGet"
+                params = [('ranges', r) for r in ranges] + [('majorDimension', major_dimension), ('key', self.api_key)]
+                response = requests.get(url, params=params, timeout=30)
+                if response.status_code == 200:
+                    return [vr.get('values', []) for vr in response.json().get('valueRanges', [])]
+                print(f"API Error: {response.status_code} - {response.text}")
+            except Exception as e:
+                print(f"Error batch reading sheet {sheet_id}: {e}")
+        
+        return None
+    
+    def get_sheet_grid(self, sheet_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Tab titles and grid sizes from spreadsheets.get, in tab order.
+        Cached for GRID_CACHE_SECONDS so range planning costs one metadata call per sheet.
+        """
+        cached = self._grid_cache.get(sheet_id)
+        if cached and time.time() - cached[0] < GRID_CACHE_SECONDS:
+            return cached[1]
+        
+        fields = 'sheets.properties(title,index,gridProperties(rowCount,columnCount))'
+        metadata = None
+        if self.oauth_credentials:
+            try:
+                metadata = self._sheets_api().spreadsheets().get(spreadsheetId=sheet_id, fields=fields).execute()
+            except Exception as e:
+                print(f"OAuth Error reading sheet metadata: {e}")
+        
+        if metadata is None and self.api_key:
+            try:
+                url = f"https://sheets.googleapis.com/v4/spreadsheets/{sheet_id}"
+                response = requests.get(url, params={'fields': fields, 'key': self.api_key}, timeout=30)
+                if response.status_code == 200:
+                    metadata = response.json()
+                else:
+                    print(f"API Error reading sheet metadata: {response.status_code} - {response.text}")
+            except Exception as e:
+                print(f"Error reading sheet metadata: {e}")
+        
+        if metadata is None:
+            return None
+        
+        tabs = []
+        for sheet in metadata.get('sheets', []):
+            props = sheet.get('properties', {})
+            grid = props.get('gridProperties', {})
+            tabs.append({
+                'title': props.get('title', ''),
+                'index': props.get('index', 0),
+                'rows': grid.get('rowCount', 0),
+                'columns': grid.get('columnCount', 0)
+            })
+        tabs.sort(key=lambda tab: tab['index'])
+        
+        self._grid_cache[sheet_id] = (time.time(), tabs)
+        return tabs
+    
+    def get_sheet_version(self, sheet_id: str, method: Optional[str] = None) -> Optional[str]:
+        """
+        Drive's version number for the spreadsheet (bumped by every edit), or None
+        when Drive can't be asked. A metadata-only call, far cheaper than a read.
+        """
+        if method in (None, 'oauth') and self.oauth_credentials:
+            try:
+                metadata = self._drive_api().files().get(fileId=sheet_id, fields='version',
+                                                         supportsAllDrives=True).execute()
+                return metadata.get('version')
+            except Exception as e:
+                print(f"OAuth Error reading sheet version: {e}")
+        
+        if method in (None, 'api_key') and self.api_key:
+            try:
+                url = f"https://www.googleapis.com/drive/v3/files/{sheet_id}"
+                response = requests.get(url, params={'fields': 'version', 'key': self.api_key}, timeout=10)
+                if response.status_code == 200:
+                    return response.json().get('version')
+                print(f"API Error reading sheet version: {response.status_code}")
+            except Exception as e:
+                print(f"Error reading sheet version: {e}")
+        
+        return None
+    
+    def _find_tab(self, sheet_id: str, sheet_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Grid properties for a tab (the first tab when no name is given)"""
+        tabs = self.get_sheet_grid(sheet_id)
+        if not tabs:
+            return None
+        if sheet_name is None:
+            return tabs[0]
+        for tab in tabs:
+            if tab['title'] == sheet_name:
+                return tab
+        return None
+    
+    def plan_range(self, sheet_id: str, sheet_name: Optional[str] = None, last_column: Optional[str] = None,
+                   start_row: int = 1, end_row: Optional[int] = None) -> str:
+        """
+        A1 range covering exactly the tab's used columns (capped at ``last_column``).
+        Rows are left open-ended unless ``end_row`` is given, so rows added after the
+        grid was cached are still returned.
+        """
+        tab = self._find_tab(sheet_id, sheet_name)
+        if tab is None:
+            if sheet_name:
+                return f"{quote_sheet_name(sheet_name)}!A{start_row}:{last_column or 'Z'}{end_row or ''}"
+            return LEGACY_DEFAULT_RANGE
+        
+        columns = max(tab['columns'], 1)
+        if last_column:
+            columns = min(columns, column_number(last_column))
+        end = str(end_row) if end_row else ''
+        return f"{quote_sheet_name(tab['title'])}!A{start_row}:{column_letter(columns)}{end}"
+    
+    def read_sheet(self, sheet_id: str, sheet_name: Optional[str] = None, last_column: Optional[str] = None,
+                   method: Optional[str] = None) -> Optional[SheetTable]:
+        """
+        Read a whole tab as a SheetTable with ranges sized from its grid properties.
+        
+        Tabs with more than SHEET_PAGE_ROWS rows are fetched in row pages that are
+        streamed into a SheetTableBuilder, so large sheets are read completely
+        without holding the full raw payload in memory.
+        """
+        tab = self._find_tab(sheet_id, sheet_name)
+        if tab is None or tab['rows'] <= SHEET_PAGE_ROWS:
+            range_name = self.plan_range(sheet_id, sheet_name, last_column)
+            value_ranges = self._batch_get_values(sheet_id, [range_name], method)
+            if not value_ranges or not value_ranges[0]:
+                return None
+            return SheetTable.from_values(value_ranges[0], sheet_id)
+        
+        # Header row first, then fixed-size pages; the last page is open-ended
+        header_values = self._batch_get_values(sheet_id, [self.plan_range(sheet_id, tab['title'], last_column, 1, 1)], method)
+        if not header_values or not header_values[0]:
+            return None
+        builder = SheetTableBuilder(header_values[0][0], sheet_id)
+        
+        total_rows = tab['rows']
+        start = 2
+        pages = 0
+        while start <= total_rows:
+            end = start + SHEET_PAGE_ROWS - 1
+            is_last = end >= total_rows
+            page_range = self.plan_range(sheet_id, tab['title'], last_column, start, None if is_last else end)
+            page_values = self._batch_get_values(sheet_id, [page_range], method)
+            if page_values is None:
+                return None
+            builder.add_rows(page_values[0], None if is_last else SHEET_PAGE_ROWS)
+            pages += 1
+            start = end + 1
+        
+        table = builder.build()
+        print(f"📄 Read {table.num_rows} rows from '{tab['title']}' in {pages} pages")
+        return table
+    
+    def get_headers(self, sheet_id: str, sheet_name: Optional[str] = None, method: Optional[str] = None) -> Optional[List[str]]:
+        """Header row of a tab, cached alongside the grid properties"""
+        key = (sheet_id, sheet_name)
+        cached = self._header_cache.get(key)
+        if cached and time.time() - cached[0] < GRID_CACHE_SECONDS:
+            return cached[1]
+        
+        value_ranges = self._batch_get_values(sheet_id, [self.plan_range(sheet_id, sheet_name, end_row=1)], method)
+        if not value_ranges or not value_ranges[0]:
+            return None
+        
+        headers = [str(h) for h in value_ranges[0][0]]
+        self._header_cache[key] = (time.time(), headers)
+        return headers
+    
+    def resolve_columns(self, headers: List[str], columns: List[ColumnSpec]) -> List[Optional[int]]:
+        """
+        Map column specs to header positions. A spec is a header name, a list of
+        alternative header names (first match wins) or a 0-based column index.
+        """
+        header_index = {}
+        for idx, header in enumerate(headers):
+            header_index.setdefault(header.strip().lower(), idx)
+        
+        resolved = []
+        for spec in columns:
+            if isinstance(spec, int):
+                resolved.append(spec if spec >= 0 else None)
+                continue
+            aliases = [spec] if isinstance(spec, str) else list(spec)
+            resolved.append(next((header_index[a.strip().lower()] for a in aliases if a.strip().lower() in header_index), None))
+        return resolved
+    
+    def read_columns(self, sheet_id: str, sheet_name: Optional[str], columns: List[ColumnSpec],
+                     method: Optional[str] = None) -> Optional[SheetTable]:
+        """
+        Read only the requested columns of a tab.
+        
+        Headers are resolved once (cached) and each column is fetched as its own
+        open-ended range in a single batchGet with majorDimension=COLUMNS, so wide
+        sheets only transfer the cells the caller needs. The returned table holds
+        the columns in request order; ``source_columns`` records their sheet
+        positions. Returns None if any column can't be resolved.
+        """
+        headers = self.get_headers(sheet_id, sheet_name, method)
+        if headers is None:
+            return None
+        
+        indices = self.resolve_columns(headers, columns)
+        if any(idx is None for idx in indices):
+            missing = [spec for spec, idx in zip(columns, indices) if idx is None]
+            print(f"⚠️  Columns not found in sheet: {missing}")
+            return None
+        
+        tab = self._find_tab(sheet_id, sheet_name)
+        title = tab['title'] if tab else sheet_name
+        prefix = f"{quote_sheet_name(title)}!" if title else ''
+        ranges = [f"{prefix}{column_letter(idx + 1)}2:{column_letter(idx + 1)}" for idx in indices]
+        
+        value_ranges = self._batch_get_values(sheet_id, ranges, method, major_dimension='COLUMNS')
+        if value_ranges is None:
+            return None
+        
+        cells = [values[0] if values else [] for values in value_ranges]
+        num_rows = max((len(col) for col in cells), default=0)
+        arrays = [string_column([str(c) for c in col] + [''] * (num_rows - len(col))) for col in cells]
+        
+        return SheetTable(
+            [headers[idx] if idx < len(headers) else '' for idx in indices],
+            arrays,
+            sheet_id,
+            source_columns=indices
+        )
+    
+    def read_row(self, sheet_id: str, sheet_name: Optional[str], row_index: int, method: Optional[str] = None) -> Optional[List[str]]:
+        """Read one data row (0-based, header excluded) across the tab's full width"""
+        row_number = row_index + 2
+        value_ranges = self._batch_get_values(sheet_id, [self.plan_range(sheet_id, sheet_name, start_row=row_number, end_row=row_number)], method)
+        if not value_ranges:
+            return None
+        return [str(c) for c in value_ranges[0][0]] if value_ranges[0] else []
+    
+    def batch_read_tables(self, requests_by_name: Dict[str, Tuple[str, str]]) -> Dict[str, Optional[SheetTable]]:
+        """
+        Read several (sheet_id, range) pairs in as few round trips as possible.
+        
+        Ranges on the same spreadsheet share one values:batchGet call, and different
+        spreadsheets are fetched concurrently. Returns name -> SheetTable (None when
+        the range could not be read or is empty).
+        """
+        by_sheet = {}  # sheet_id -> [(name, range), ...]
+        for name, (sheet_id, range_name) in requests_by_name.items():
+            by_sheet.setdefault(sheet_id, []).append((name, range_name))
+        
+        tables = {name: None for name in requests_by_name}
+        if not by_sheet:
+            return tables
+        
+        def fetch(sheet_id):
+            items = by_sheet[sheet_id]
+            return sheet_id, self._batch_get_values(sheet_id, [r for _, r in items])
+        
+        with ThreadPoolExecutor(max_workers=min(len(by_sheet), MAX_CONCURRENT_SPREADSHEETS)) as pool:
+            for sheet_id, value_ranges in pool.map(fetch, list(by_sheet)):
+                if not value_ranges:
+                    continue
+                for (name, _), values in zip(by_sheet[sheet_id], value_ranges):
+                    if values:
+                        tables[name] = SheetTable.from_values(values, sheet_id)
+        
+        return tables
+    
+    def get_sheet_index(self, table: SheetTable) -> SheetIndex:
+        """
+        Return the search index for a table snapshot.
+
+        One index is kept per sheet; a newer snapshot of the same sheet updates
+        it in place (only changed rows are re-indexed) instead of rebuilding.
+        The index locks itself, so lookups never see a half-applied update.
+        """
+        if table.sheet_id is None:
+            return SheetIndex(table)
+        
+        key = (table.sheet_id, tuple(table.source_columns))
+        with self._index_lock:
+            index = self._index_cache.get(key)
+            if index is None:
+                start = time.perf_counter()
+                index = SheetIndex(table)
+                self._index_cache[key] = index
+                print(f"🗂️  Indexed {table.num_rows} rows in {time.perf_counter() - start:.2f}s")
+            elif index.revision != table.revision:
+                changed = index.update(table)
+                print(f"🗂️  Re-indexed {changed} changed rows")
+            return index
+    
+    def analyze_sheet_data(self, sheet_data: Union[SheetTable, Dict[str, Any]], query: str) -> str:
         """Use OpenAI to analyze sheet data and answer queries"""
         if not sheet_data:
             return "I couldn't access the sheet data. Please make sure the sheet is publicly viewable."
         
-        # Prepare data summary for OpenAI
-        headers = sheet_data.get('headers', [])
-        rows = sheet_data.get('rows', [])
+        table = as_table(sheet_data)
+        headers = table.headers
         
         # Check if this is a search/count query that needs full data analysis
         search_patterns = [
@@ -199,10 +586,15 @@ class DirectSheetsService:
         
         if is_search_query or force_complete_analysis:
             # For search queries, analyze the complete dataset
-            return self._analyze_complete_dataset(headers, rows, query)
+            return self._analyze_complete_dataset(table, query)
         else:
-            # For general queries, use sample data to avoid token limits
-            sample_rows = rows[:10]
+            # Answer from a structured plan executed over the full table when possible
+            answer = self.query_engine.answer(query, table, self._get_openai_client())
+            if answer is not None:
+                return answer
+            
+            # Fall back to sample data to avoid token limits
+            sample_rows = [table.row(i) for i in range(min(10, table.num_rows))]
             
             # Create prompt for OpenAI with instruction to be brief and direct
             prompt = f"""
@@ -210,7 +602,7 @@ You are Sara, a helpful assistant that analyzes Google Sheets data. Be brief and
 
 Dataset Info:
 - Headers: {headers}
-- Total Rows: {len(rows)}
+- Total Rows: {table.num_rows}
 - Total Columns: {len(headers)}
 - Sample Data (first 10 rows): {json.dumps(sample_rows, indent=2)}
 
@@ -234,25 +626,14 @@ Provide a brief, direct answer. Do not suggest manual formulas or explain how th
                 return response.choices[0].message.content
                 
             except Exception as e:
-                return f"I was able to access the sheet with {len(rows)} rows and {len(headers)} columns, but encountered an error analyzing it: {e}"
+                return f"I was able to access the sheet with {table.num_rows} rows and {len(headers)} columns, but encountered an error analyzing it: {e}"
     
-    def _analyze_complete_dataset(self, headers: List[str], rows: List[List[str]], query: str) -> str:
+    def _analyze_complete_dataset(self, table: SheetTable, query: str) -> str:
         """Analyze the complete dataset for search/count queries"""
         try:
             # Check if this is a brand counting query
-            brand_patterns = [
-                'how many brands', 'brands are listed', 'total brands', 'number of brands', 
-                'unique brands', 'distinct brands', 'brands are marked', 'marked as listed',
-                'brands marked as', 'listed brands'
-            ]
-            is_brand_query = any(pattern in query.lower() for pattern in brand_patterns)
-            
-            # Also check if query contains "brand" and any counting/listing words
-            has_brand = 'brand' in query.lower()
-            has_counting = any(word in query.lower() for word in ['how many', 'count', 'total', 'number', 'listed', 'marked'])
-            
-            if is_brand_query or (has_brand and has_counting):
-                return self._analyze_brands_complete(headers, rows, query)
+            if self._is_brand_count_query(query):
+                return self._analyze_brands_complete(table, query)
             
             # Extract search terms from the query for regular search
             search_terms = self._extract_search_terms(query)
@@ -260,23 +641,21 @@ Provide a brief, direct answer. Do not suggest manual formulas or explain how th
             if not search_terms:
                 return "I couldn't identify what to search for in your query. Please specify what term or value you'd like me to find."
             
-            # Search through all data
+            headers = table.headers
+            index = self.get_sheet_index(table)
+            
+            # Answer each term from the index
             results = {}
             for term in search_terms:
-                count = 0
+                hits = index.find(term, limit=10)
                 locations = []
-                
-                # Search through all rows and columns
-                for row_idx, row in enumerate(rows):
-                    for col_idx, cell in enumerate(row):
-                        if isinstance(cell, str) and term.lower() in cell.lower():
-                            count += 1
-                            col_name = headers[col_idx] if col_idx < len(headers) else f"Column {col_idx + 1}"
-                            locations.append(f"Row {row_idx + 2}, {col_name}")  # +2 because row 1 is headers
+                for row_idx, col_idx in hits['cells']:
+                    col_name = headers[col_idx] if col_idx < len(headers) and headers[col_idx] else f"Column {col_idx + 1}"
+                    locations.append(f"Row {row_idx + 2}, {col_name}")  # +2 because row 1 is headers
                 
                 results[term] = {
-                    'count': count,
-                    'locations': locations[:10]  # Show first 10 locations
+                    'count': hits['count'],
+                    'locations': locations  # Show first 10 locations
                 }
             
             # Format response
@@ -300,56 +679,69 @@ Provide a brief, direct answer. Do not suggest manual formulas or explain how th
         except Exception as e:
             return f"Error analyzing the complete dataset: {e}"
     
-    def _analyze_brands_complete(self, headers: List[str], rows: List[List[str]], query: str) -> str:
-        """Analyze brands using the complete dataset"""
+    def _brand_count_columns(self, headers: List[str]) -> Tuple[int, Optional[int]]:
+        """Locate the brand column and (optional) status column for brand counting"""
+        schema = SheetSchema(headers, BRAND_LIST_FIELDS, 'brand sheet')
+        return schema['brand'], schema['status']
+    
+    def _is_brand_count_query(self, query: str) -> bool:
+        """Whether the query is answered by _analyze_brands_complete"""
+        query_lower = query.lower()
+        brand_patterns = [
+            'how many brands', 'brands are listed', 'total brands', 'number of brands', 
+            'unique brands', 'distinct brands', 'brands are marked', 'marked as listed',
+            'brands marked as', 'listed brands'
+        ]
+        is_brand_query = any(pattern in query_lower for pattern in brand_patterns)
+        
+        # Also check if query contains "brand" and any counting/listing words
+        has_brand = 'brand' in query_lower
+        has_counting = any(word in query_lower for word in ['how many', 'count', 'total', 'number', 'listed', 'marked'])
+        
+        return is_brand_query or (has_brand and has_counting)
+    
+    def _analyze_brands_complete(self, table: SheetTable, query: str,
+                                 columns: Optional[Tuple[int, Optional[int]]] = None) -> str:
+        """
+        Analyze brands using the complete dataset.
+        ``columns`` gives (brand, status) positions in ``table`` when it is a column projection.
+        """
         try:
-            # Find brand column (usually first column or column B)
-            brand_col_idx = 0
-            if len(headers) > 1 and 'brand' in headers[1].lower():
-                brand_col_idx = 1
-            
-            # Find status column (look for column M or 'Status')
-            status_col_idx = None
-            for idx, header in enumerate(headers):
-                if header.lower() in ['status', 'm'] or idx == 12:  # Column M is index 12
-                    status_col_idx = idx
-                    break
-            
-            # Count all brands
-            all_brands = set()
-            listed_brands = set()
-            
-            for row in rows:
-                if len(row) > brand_col_idx and row[brand_col_idx].strip():
-                    brand = row[brand_col_idx].strip()
-                    all_brands.add(brand)
-                    
-                    # Check if listed (if status column exists)
-                    if status_col_idx is not None and len(row) > status_col_idx:
-                        status = row[status_col_idx].strip().lower()
-                        if 'listed' in status:
-                            listed_brands.add(brand)
+            if not table.num_columns:
+                return "The sheet has no columns to analyze."
+            
+            brand_col_idx, status_col_idx = columns or self._brand_count_columns(table.headers)
+            
+            # Unique brands in first-seen order
+            brands = table.stripped(brand_col_idx)
+            present = brands != ''
+            all_brands = _unique_in_order(brands[present])
+            
+            listed_brands = []
+            if status_col_idx is not None:
+                is_listed = contains_text(table.normalized(status_col_idx), 'listed')
+                listed_brands = _unique_in_order(brands[present & is_listed])
             
             total_brands = len(all_brands)
             total_listed = len(listed_brands)
             
             # Format response based on query
             if 'listed' in query.lower() and status_col_idx is not None:
-                response = f"I analyzed the complete dataset with {len(rows)} rows:\n\n"
+                response = f"I analyzed the complete dataset with {table.num_rows} rows:\n\n"
                 response += f"📊 **Total unique brands**: {total_brands}\n"
                 response += f"✅ **Brands marked as 'listed'**: {total_listed}\n"
                 response += f"❌ **Brands not listed**: {total_brands - total_listed}\n\n"
                 
                 if total_listed > 0:
-                    response += f"**Listed brands include**: {', '.join(list(listed_brands)[:10])}"
+                    response += f"**Listed brands include**: {', '.join(listed_brands[:10])}"
                     if total_listed > 10:
                         response += f" (and {total_listed - 10} more)"
                 
                 return response
             else:
-                response = f"I analyzed the complete dataset with {len(rows)} rows:\n\n"
+                response = f"I analyzed the complete dataset with {table.num_rows} rows:\n\n"
                 response += f"📊 **Total unique brands**: {total_brands}\n\n"
-                response += f"**Examples**: {', '.join(list(all_brands)[:10])}"
+                response += f"**Examples**: {', '.join(all_brands[:10])}"
                 if total_brands > 10:
                     response += f" (and {total_brands - 10} more)"
                 
@@ -393,106 +785,185 @@ Provide a brief, direct answer. Do not suggest manual formulas or explain how th
         
         return potential_terms if potential_terms else []
     
-    def _check_brand_balances(self, query: str) -> str:
-        """Check Brand Balances sheet for negative amounts (unpaid brands)"""
+    def _check_brand_balances(self, query: str, table: Optional[SheetTable] = None) -> str:
+        """
+        Check Brand Balances sheet for negative amounts (unpaid brands).
+        Pass ``table`` when the sheet was already fetched (e.g. via batch_read_tables).
+        """
         try:
-            # Hardcoded Brand Balances sheet URL
-            brand_balances_sheet_id = "1Ch6NflcXS6BfK0zZ8SoeoiU_PwKe8_oEVjDX2tTE8QY"
-            brand_balances_range = "Brand Balances!A1:B1000"  # Specific sheet and range
-            
             print("💰 Checking Brand Balances sheet for unpaid amounts...")
             
-            # Try to read the Brand Balances sheet
-            sheet_data = None
-            if self.oauth_credentials:
-                sheet_data = self.read_private_sheet_oauth(brand_balances_sheet_id, brand_balances_range)
-            
-            if not sheet_data and self.api_key:
-                sheet_data = self.read_public_sheet(brand_balances_sheet_id, brand_balances_range)
+            if table is None:
+                report = self._balances_report_from_mirror()
+                if report is not None:
+                    return report
+                
+                # Try to read the Brand Balances sheet
+                table = self.read_sheet(BRAND_BALANCES_SHEET_ID, BRAND_BALANCES_SHEET_NAME, BRAND_BALANCES_LAST_COLUMN)
             
-            if not sheet_data:
+            if table is None:
                 return "I couldn't access the Brand Balances sheet. Please make sure I have permission to access it."
             
-            headers = sheet_data.get('headers', [])
-            rows = sheet_data.get('rows', [])
-            
-            if len(headers) < 2:
+            if table.num_columns < 2:
                 return "The Brand Balances sheet doesn't have the expected structure (needs at least 2 columns)."
             
-            # Find brands with negative balances
-            unpaid_brands = []
+            # Only rows that changed since the last snapshot are re-applied
+            changed = balances_engine.apply_snapshot(table)
+            print(f"💰 Applied Brand Balances snapshot ({changed} rows changed)")
+            return balances_engine.get_report()
             
-            # Define rows to exclude (summary/total rows)
-            excluded_rows = {
-                'grand total', 'total', 'sum', 'subtotal', 'summary', 
-                'overall total', 'net total', 'final total'
-            }
+        except Exception as e:
+            return f"Error checking brand balances: {e}"
+    
+    def _requested_details(self, query: str) -> List[str]:
+        """Brand Master fields a payment query asks for (e.g. "unpaid brands with email and GST")"""
+        query_lower = query.lower()
+        fields = [field for field, words in DETAIL_QUERY_WORDS.items() if any(w in query_lower for w in words)]
+        if not fields and any(w in query_lower for w in ALL_DETAILS_WORDS):
+            fields = list(DETAIL_QUERY_WORDS)
+        return fields
+    
+    def _unpaid_brands_with_details(self, fields: List[str]) -> str:
+        """
+        Unpaid brands joined locally with their Brand Master details.
+        Uses the mirror when it's fresh; otherwise both sheets are read in one batch.
+        """
+        try:
+            print(f"💰 Joining unpaid brands with Brand Master {', '.join(fields)}...")
+            balances_table = None
+            master_table = None
+            balances_current = False
+            try:
+                from brand_mirror import brand_mirror
+                balances_current = brand_mirror.is_fresh('brand_balances') and \
+                    balances_engine.is_fresh(brand_mirror.max_age_seconds)
+                if brand_mirror.is_fresh('brand_master'):
+                    master_table = brand_mirror.get_master_table()
+            except Exception as e:
+                print(f"⚠️  Brand mirror unavailable, reading the brand sheets live: {e}")
             
-            for row in rows:
-                if len(row) >= 2:
-                    brand_name = row[0].strip() if row[0] else ""
-                    balance_str = row[1].strip() if row[1] else ""
-                    
-                    if brand_name and balance_str:
-                        # Skip summary/total rows
-                        if brand_name.lower() in excluded_rows:
-                            continue
-                            
-                        try:
-                            # Parse the balance (handle currency symbols, commas, etc.)
-                            balance_clean = balance_str.replace('$', '').replace(',', '').replace('₹', '').strip()
-                            balance = float(balance_clean)
-                            
-                            # If balance is negative, this brand hasn't paid
-                            if balance < 0:
-                                unpaid_brands.append({
-                                    'brand': brand_name,
-                                    'amount_due': abs(balance),  # Convert to positive for display
-                                    'original_balance': balance_str
-                                })
-                        except ValueError:
-                            # Skip rows where balance can't be parsed as a number
-                            continue
-            
-            # Format the response
-            if not unpaid_brands:
-                return "🎉 Great news! All brands have paid their balances. No outstanding payments found."
-            
-            # Sort by amount due (highest first)
-            unpaid_brands.sort(key=lambda x: x['amount_due'], reverse=True)
-            
-            response = f"💸 **Brands that haven't paid** ({len(unpaid_brands)} total):\n\n"
-            
-            total_outstanding = sum(brand['amount_due'] for brand in unpaid_brands)
-            
-            for brand in unpaid_brands:
-                response += f"• **{brand['brand']}**: ₹{brand['amount_due']:,.2f} due\n"
-            
-            response += f"\n💰 **Total outstanding**: ₹{total_outstanding:,.2f}"
-            
-            return response
+            live = {}
+            if not balances_current:
+                live['balances'] = (BRAND_BALANCES_SHEET_ID, self.plan_range(
+                    BRAND_BALANCES_SHEET_ID, BRAND_BALANCES_SHEET_NAME, BRAND_BALANCES_LAST_COLUMN))
+            if master_table is None:
+                live['master'] = (BRAND_MASTER_SHEET_ID, self.plan_range(BRAND_MASTER_SHEET_ID, BRAND_MASTER_SHEET_NAME))
+            if live:
+                tables = self.batch_read_tables(live)
+                balances_table = tables.get('balances')
+                master_table = tables.get('master', master_table)
+                if 'balances' in live and balances_table is None:
+                    return "I couldn't access the Brand Balances sheet. Please make sure I have permission to access it."
+            
+            if balances_table is not None:
+                balances_engine.apply_snapshot(balances_table)
+            if master_table is None:
+                return "I couldn't access the Brand Information Master sheet to look up those details."
+            
+            summary = balances_engine.get_summary()
+            unpaid = enrich_brands(balances_engine.get_unpaid(), master_table, fields)
+            return format_enriched_unpaid_report(unpaid, summary['total_outstanding'], fields)
             
         except Exception as e:
             return f"Error checking brand balances: {e}"
     
-    def count_unique_values(self, sheet_data: Dict[str, Any], column_index: int = 0) -> Dict[str, Any]:
+    def _balances_report_from_mirror(self) -> Optional[str]:
+        """
+        Unpaid-brands report without a live read, or None when the mirror is stale or unavailable.
+        The mirror sync feeds each snapshot to the balances engine, so this is normally just
+        the engine's precomputed report; the SQLite copy covers a mirror synced by another process.
+        """
+        try:
+            from brand_mirror import brand_mirror
+            if not brand_mirror.is_fresh('brand_balances'):
+                return None
+            if balances_engine.is_fresh(brand_mirror.max_age_seconds):
+                return balances_engine.get_report()
+            rows = brand_mirror.get_unpaid_balances(EXCLUDED_BALANCE_ROWS)
+        except Exception as e:
+            print(f"⚠️  Brand mirror unavailable, reading Brand Balances live: {e}")
+            return None
+        
+        print("🪞 Using mirrored Brand Balances")
+        unpaid_brands = [
+            {'brand': brand, 'amount_due': -balance, 'original_balance': balance_text}
+            for brand, balance_text, balance in rows
+        ]
+        return format_unpaid_report(unpaid_brands, sum(brand['amount_due'] for brand in unpaid_brands))
+    
+    def count_unique_values(self, sheet_data: Union[SheetTable, Dict[str, Any]], column_index: int = 0) -> Dict[str, Any]:
         """Count unique values in a specific column"""
-        if not sheet_data or not sheet_data.get('rows'):
+        table = as_table(sheet_data)
+        if table is None or not table.num_rows:
             return {'error': 'No data available'}
         
-        rows = sheet_data['rows']
-        unique_values = set()
-        
-        for row in rows:
-            if len(row) > column_index and row[column_index].strip():
-                unique_values.add(row[column_index].strip())
+        unique_values = []
+        if table.column_index(column_index) is not None:
+            values = table.stripped(column_index)
+            unique_values = _unique_in_order(values[values != ''])
         
         return {
             'unique_count': len(unique_values),
-            'unique_values': list(unique_values),
-            'total_rows': len(rows)
+            'unique_values': unique_values,
+            'total_rows': table.num_rows
         }
     
+    def _read_sheet_for_query(self, sheet_id: str, query: str, method: str) -> Tuple[Optional[SheetTable], Optional[Tuple[int, Optional[int]]]]:
+        """
+        Read what the query needs: just the brand/status columns for brand counts
+        (returned with their positions in the projection), else the whole tab.
+        """
+        if self._is_brand_count_query(query):
+            headers = self.get_headers(sheet_id, method=method)
+            if headers:
+                brand_col_idx, status_col_idx = self._brand_count_columns(headers)
+                wanted = [brand_col_idx] + ([status_col_idx] if status_col_idx is not None else [])
+                table = self.read_columns(sheet_id, None, wanted, method)
+                if table is not None:
+                    return table, (0, 1 if status_col_idx is not None else None)
+        return self.read_sheet(sheet_id, method=method), None
+    
+    def _get_query_snapshot(self, sheet_id: str, query: str, method: str) -> Tuple[Optional[SheetTable], Optional[Tuple[int, Optional[int]]]]:
+        """
+        _read_sheet_for_query, reusing a snapshot read within SNAPSHOT_CACHE_SECONDS
+        while the sheet's Drive version is unchanged (see get_sheet_version)
+        """
+        key = (sheet_id, method, self._is_brand_count_query(query))
+        version = self.get_sheet_version(sheet_id, method)
+        cached = self._snapshot_cache.get(key)
+        if cached and time.time() - cached[0] < SNAPSHOT_CACHE_SECONDS:
+            if version is None or version == cached[1]:
+                return cached[2], cached[3]
+            print(f"🔄 Sheet {sheet_id} changed (version {cached[1]} → {version}) - re-reading")
+        
+        table, brand_columns = self._read_sheet_for_query(sheet_id, query, method)
+        if table is not None:
+            self._snapshot_cache[key] = (time.time(), version, table, brand_columns)
+        return table, brand_columns
+    
+    def _result_key(self, table: SheetTable, query: str) -> tuple:
+        return (table.sheet_id, table.revision, tuple(table.source_columns), normalize_question(query))
+    
+    def _get_cached_result(self, key: tuple) -> Optional[str]:
+        with self._result_lock:
+            answer = self._result_cache.get(key)
+            if answer is not None:
+                self._result_cache.move_to_end(key)
+            return answer
+    
+    def _cache_result(self, key: tuple, answer: str):
+        """Remember an answer; answers for older revisions of the same sheet are dropped"""
+        if not answer or any(marker in answer for marker in UNCACHEABLE_ANSWER_MARKERS):
+            return
+        sheet_id, revision = key[0], key[1]
+        with self._result_lock:
+            for stale in [k for k in self._result_cache if k[0] == sheet_id and k[1] != revision]:
+                del self._result_cache[stale]
+            self._result_cache[key] = answer
+            self._result_cache.move_to_end(key)
+            while len(self._result_cache) > QUERY_RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+    
     def process_sheets_query(self, sheet_url_or_id: str, query: str) -> str:
         """Main method to process a sheets query with OAuth fallback"""
         try:
@@ -505,6 +976,9 @@ Provide a brief, direct answer. Do not suggest manual formulas or explain how th
             is_payment_query = any(pattern in query.lower() for pattern in payment_patterns)
             
             if is_payment_query:
+                fields = self._requested_details(query)
+                if fields:
+                    return self._unpaid_brands_with_details(fields)
                 return self._check_brand_balances(query)
             
             # For non-payment queries, we need a sheet URL/ID
@@ -513,24 +987,25 @@ Provide a brief, direct answer. Do not suggest manual formulas or explain how th
             
             # Extract sheet ID
             sheet_id = self.extract_sheet_id(sheet_url_or_id)
-            sheet_data = None
+            table = None
+            brand_columns = None
             access_method = "unknown"
             
             # Try OAuth first (for private sheets)
             if self.oauth_credentials:
                 print("🔐 Trying OAuth access for private sheet...")
-                sheet_data = self.read_private_sheet_oauth(sheet_id)
-                if sheet_data:
+                table, brand_columns = self._get_query_snapshot(sheet_id, query, 'oauth')
+                if table is not None:
                     access_method = "OAuth (private sheet)"
             
             # Fallback to API key (for public sheets)
-            if not sheet_data and self.api_key:
+            if table is None and self.api_key:
                 print("🔑 Trying API key access for public sheet...")
-                sheet_data = self.read_public_sheet(sheet_id)
-                if sheet_data:
+                table, brand_columns = self._get_query_snapshot(sheet_id, query, 'api_key')
+                if table is not None:
                     access_method = "API key (public sheet)"
             
-            if not sheet_data:
+            if table is None:
                 error_msg = f"I couldn't access the sheet (ID: {sheet_id}). "
                 if not self.oauth_credentials and not self.api_key:
                     error_msg += "No authentication methods available."
@@ -545,11 +1020,24 @@ Provide a brief, direct answer. Do not suggest manual formulas or explain how th
             
             print(f"✅ Successfully accessed sheet using {access_method}")
             
+            # Same question on an unchanged snapshot -> same answer
+            result_key = self._result_key(table, query)
+            cached = self._get_cached_result(result_key)
+            if cached is not None:
+                print("⚡ Answering from the query result cache")
+                return cached
+            
             # Remove the special handling that bypasses complete dataset analysis
             # All brand queries should now go through the complete dataset analysis
             
-            # Use OpenAI for general analysis
-            analysis = self.analyze_sheet_data(sheet_data, query)
+            # Brand counts only fetched the brand and status columns
+            if brand_columns:
+                analysis = self._analyze_brands_complete(table, query, brand_columns)
+            else:
+                # Analyze the columnar snapshot
+                analysis = self.analyze_sheet_data(table, query)
+            
+            self._cache_result(result_key, analysis)
             return analysis
             
         except Exception as e:
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Compiled .docx templates: placeholders located once, rendered at the zip level per request
+"""
+
+import io
+import os
+import re
+import html
+import json
+import hashlib
+import zipfile
+import threading
+from typing import Optional, Dict, List, Tuple, Iterable, Union, BinaryIO
+
+# {{key}}, optionally preceded by '#' (e.g. "#{{Invoice_Number}}" in the invoice template)
+PLACEHOLDER_PATTERN = re.compile(r'(#?)\{\{\s*([^{}<>]+?)\s*\}\}')
+
+# Parts of the package that can hold placeholders
+TEXT_PART_PATTERN = re.compile(r'^word/(document|header\d*|footer\d*)\.xml$')
+
+# Paragraph boundaries and <w:t> text runs in WordprocessingML (not <w:pPr>, <w:tab/>, <w:tbl> ...)
+XML_TOKEN_PATTERN = re.compile(r'<w:p(?=[\s>/])[^>]*?(/?)>|</w:p>|<w:t(?=[\s>])([^>]*)>([^<]*)</w:t>')
+
+
+class _Edit:
+    """
+    One change to a part's XML: replace raw[start:end] with ``text``, or with
+    the placeholder's value (``key`` set, ``first`` run) / nothing (its other
+    runs) when the render has a value for ``key``.
+    """
+
+    __slots__ = ('start', 'end', 'text', 'key', 'first')
+
+    def __init__(self, start: int, end: int, text: str, key: Optional[str] = None, first: bool = False):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.key = key
+        self.first = first
+
+
+def _compile_part(xml: str, hash_prefixed: Iterable[str]) -> Tuple[List[object], List[str]]:
+    """
+    Split a part's XML into literal chunks and _Edit slots.
+    Returns (segments, placeholder keys in document order).
+    """
+    # (paragraph id, tag start, tag end, text start, text end) for every <w:t>
+    runs = []
+    stack, next_id = [], 0
+    for m in XML_TOKEN_PATTERN.finditer(xml):
+        token = m.group(0)
+        if token == '</w:p>':
+            if stack:
+                stack.pop()
+        elif token.startswith('<w:p'):
+            if not m.group(1):  # <w:p/> holds no text
+                stack.append(next_id)
+                next_id += 1
+        else:
+            runs.append((stack[-1] if stack else -1, m.start(), m.start(3), m.start(3), m.end(3)))
+
+    edits, keys = [], []
+    start = 0
+    while start < len(runs):
+        end = start
+        while end < len(runs) and runs[end][0] == runs[start][0]:
+            end += 1
+        group = runs[start:end]
+        text = ''.join(xml[r[3]:r[4]] for r in group)
+        if '{{' in text:
+            # Raw XML offset of every character of the paragraph's text
+            offsets = [pos for r in group for pos in range(r[3], r[4])]
+            owner = [i for i, r in enumerate(group) for _ in range(r[3], r[4])]
+            for match in PLACEHOLDER_PATTERN.finditer(text):
+                key = match.group(2)
+                first = match.start() if key in hash_prefixed else match.start() + len(match.group(1))
+                last = match.end() - 1
+                keys.append(key)
+                for i in range(owner[first], owner[last] + 1):
+                    run = group[i]
+                    lo = offsets[first] if i == owner[first] else run[3]
+                    hi = offsets[last] + 1 if i == owner[last] else run[4]
+                    edits.append(_Edit(lo, hi, xml[lo:hi], key, i == owner[first]))
+                    if i == owner[first] and 'xml:space' not in xml[run[1]:run[2]]:
+                        # Values may start or end with spaces
+                        tag_end = run[2] - 1
+                        edits.append(_Edit(tag_end, tag_end, ' xml:space="preserve"'))
+        start = end
+
+    segments, pos = [], 0
+    for edit in sorted({(e.start, e.end, e.text): e for e in edits}.values(), key=lambda e: (e.start, e.end)):
+        segments.append(xml[pos:edit.start])
+        segments.append(edit)
+        pos = edit.end
+    segments.append(xml[pos:])
+    return segments, keys
+
+
+def _escape(value: object) -> str:
+    return html.escape(html.unescape(str(value)), quote=False)
+
+
+class DocxTemplate:
+    """
+    A .docx template compiled once into a substitution plan, rendered as a zip.
+
+    Every untouched package part is written once into a base archive at
+    compile time; a render copies that archive's bytes into a buffer and
+    appends just the body/header/footer parts holding placeholders, each
+    rebuilt by joining precompiled XML chunks with the escaped values. No
+    document object model is built per request.
+
+    A placeholder split across runs gets its value in the first run (keeping
+    that run's formatting); its other runs lose just their share of it. Keys
+    in ``hash_prefixed`` also consume a '#' written right before them.
+    """
+
+    def __init__(self, path: str, hash_prefixed: Iterable[str] = ()):
+        self.path = path
+        self.hash_prefixed = set(hash_prefixed)
+        self.mtime = os.path.getmtime(path)
+        with open(path, 'rb') as f:
+            source_data = f.read()
+        self.version = hashlib.sha256(source_data).hexdigest()[:16]
+
+        self._parts = {}  # part name -> (ZipInfo, segments)
+        keys = []
+        base = io.BytesIO()
+        with zipfile.ZipFile(io.BytesIO(source_data)) as source, zipfile.ZipFile(base, 'w') as target:
+            for info in source.infolist():
+                data = source.read(info)
+                if TEXT_PART_PATTERN.match(info.filename):
+                    segments, part_keys = _compile_part(data.decode('utf-8'), self.hash_prefixed)
+                    if part_keys:
+                        self._parts[info.filename] = (info, segments)
+                        keys.extend(part_keys)
+                        continue
+                target.writestr(info, data)
+        self._base = base.getvalue()
+
+        self.placeholder_count = len(keys)
+        self.placeholders = sorted(set(keys))
+
+    def cache_key(self, values: Dict[str, object]) -> str:
+        """
+        Content hash of a render: the template version plus the values it
+        would substitute (as rendered), so identical output gets the same key.
+        """
+        used = {key: html.unescape(str(values[key])) for key in self.placeholders if key in values}
+        payload = json.dumps({'template': self.version, 'hash_prefixed': sorted(self.hash_prefixed), 'values': used},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def render_to_buffer(self, values: Dict[str, object]) -> Tuple[io.BytesIO, Dict[str, object]]:
+        """
+        Fill the template into an in-memory .docx.
+        Returns (buffer at position 0, {'total': replacements made, 'unreplaced': placeholders with no value}).
+        """
+        escaped = {key: _escape(values[key]) for key in self.placeholders if key in values}
+        unreplaced = [key for key in self.placeholders if key not in escaped]
+        replaced = 0
+
+        buffer = io.BytesIO(self._base)
+        buffer.seek(0, io.SEEK_END)
+        with zipfile.ZipFile(buffer, 'a') as archive:
+            for info, segments in self._parts.values():
+                chunks = []
+                for segment in segments:
+                    if isinstance(segment, str):
+                        chunks.append(segment)
+                    elif segment.key is None or segment.key not in escaped:
+                        chunks.append(segment.text)
+                    elif segment.first:
+                        chunks.append(escaped[segment.key])
+                        replaced += 1
+                # A fresh ZipInfo per render: writestr fills in offsets and sizes
+                part_info = zipfile.ZipInfo(info.filename, info.date_time)
+                part_info.compress_type = info.compress_type
+                part_info.external_attr = info.external_attr
+                archive.writestr(part_info, ''.join(chunks).encode('utf-8'))
+        buffer.seek(0)
+        return buffer, {'total': replaced, 'unreplaced': unreplaced}
+
+    def render(self, values: Dict[str, object], output: Union[str, BinaryIO]) -> Dict[str, object]:
+        """Fill the template and write it to ``output`` (a path or binary file); returns the render stats"""
+        buffer, stats = self.render_to_buffer(values)
+        if isinstance(output, str):
+            with open(output, 'wb') as f:
+                f.write(buffer.getbuffer())
+        else:
+            output.write(buffer.getbuffer())
+        return stats
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_template(path: str, hash_prefixed: Iterable[str] = ()) -> DocxTemplate:
+    """Compiled template for ``path`` and ``hash_prefixed``, recompiled only when the file changes"""
+    key = (path, tuple(sorted(hash_prefixed)))
+    with _templates_lock:
+        template = _templates.get(key)
+        if template is None or template.mtime != os.path.getmtime(path):
+            template = DocxTemplate(path, key[1])
+            _templates[key] = template
+            print(f"📄 Compiled {os.path.basename(path)}: {template.placeholder_count} placeholders "
+                  f"({', '.join(template.placeholders)})")
+        return template
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Central Google credential manager shared by every Google-backed service
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, List
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Refresh this many seconds before the access token actually expires
+REFRESH_MARGIN_SECONDS = int(os.getenv('GOOGLE_TOKEN_REFRESH_MARGIN', '300'))
+
+# Retry delay after a failed background refresh
+REFRESH_RETRY_SECONDS = 60
+
+# Re-check interval when the token carries no expiry information
+DEFAULT_CHECK_SECONDS = 1800
+
+
+class GoogleCredentialManager:
+    """Loads Google credentials once and keeps them fresh on a background timer"""
+
+    def __init__(self, token_path: str = 'token.json', service_account_path: str = None):
+        self.token_path = token_path
+        self.service_account_path = service_account_path or os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'credentials.json'
+        )
+        self.oauth_credentials = None
+        self.source = None
+
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+        # Single-flight refresh: one refresh at a time, everyone else waits on it
+        self._refresh_lock = threading.Lock()
+        self._timer = None
+
+        self._service_account_credentials = {}  # tuple(scopes) -> credentials
+
+        self._metrics = {
+            'refresh_count': 0,
+            'refresh_failures': 0,
+            'last_refresh_seconds': None,
+            'max_refresh_seconds': 0.0,
+            'total_refresh_seconds': 0.0,
+            'last_refresh_at': None,
+            'last_error': None,
+        }
+
+    def _load(self):
+        """Load OAuth credentials from GOOGLE_TOKEN_JSON or token.json (once)"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                from google.oauth2.credentials import Credentials
+
+                # First try to load from environment variables (for Render deployment)
+                google_token_json = os.getenv('GOOGLE_TOKEN_JSON')
+                if google_token_json:
+                    try:
+                        token_data = json.loads(google_token_json)
+                        self.oauth_credentials = Credentials.from_authorized_user_info(token_data)
+                        self.source = 'GOOGLE_TOKEN_JSON'
+                        print("✅ OAuth credentials loaded from environment variable")
+                    except Exception as e:
+                        print(f"⚠️  Failed to load OAuth credentials from environment: {e}")
+
+                # Fallback to token.json file (for local development)
+                if not self.oauth_credentials:
+                    if os.path.exists(self.token_path):
+                        self.oauth_credentials = Credentials.from_authorized_user_file(self.token_path)
+                        self.source = self.token_path
+                        print("✅ OAuth credentials loaded from token.json file")
+                    else:
+                        print("⚠️  No OAuth credentials found (neither GOOGLE_TOKEN_JSON env var nor token.json file)")
+
+            except Exception as e:
+                print(f"⚠️  Failed to load OAuth credentials: {e}")
+                self.oauth_credentials = None
+            finally:
+                self._loaded = True
+
+        if self.oauth_credentials:
+            if self.oauth_credentials.valid:
+                self._schedule_refresh()
+            else:
+                self._start_background_refresh()
+
+    def has_oauth_credentials(self) -> bool:
+        """Whether OAuth credentials are configured at all"""
+        self._load()
+        return self.oauth_credentials is not None
+
+    def get_credentials(self):
+        """
+        Return OAuth credentials for API calls.
+
+        The background timer keeps the token fresh, so this is normally a plain
+        attribute read. Only a token that has already expired (e.g. after a
+        failed refresh) makes the caller wait, and then it joins the single
+        in-flight refresh rather than starting its own.
+        """
+        self._load()
+        creds = self.oauth_credentials
+        if creds is None:
+            return None
+
+        if creds.valid:
+            if self._seconds_to_expiry() < REFRESH_MARGIN_SECONDS:
+                self._start_background_refresh()
+            return creds
+
+        if not creds.refresh_token:
+            return None
+
+        self.refresh()
+        return creds if creds.valid else None
+
+    def get_service_account_credentials(self, scopes: List[str]):
+        """Return cached service-account credentials from credentials.json for the given scopes"""
+        key = tuple(sorted(scopes))
+        creds = self._service_account_credentials.get(key)
+        if creds is None:
+            from google.oauth2 import service_account
+            creds = service_account.Credentials.from_service_account_file(
+                self.service_account_path, scopes=scopes
+            )
+            self._service_account_credentials[key] = creds
+        return creds
+
+    def refresh(self) -> bool:
+        """Refresh the OAuth token now; concurrent callers share one refresh"""
+        self._load()
+        if not self.oauth_credentials or not self.oauth_credentials.refresh_token:
+            return False
+
+        if not self._refresh_lock.acquire(blocking=False):
+            # Someone else is refreshing - wait for them to finish and share the result
+            if self._refresh_lock.acquire(timeout=30):
+                self._refresh_lock.release()
+            return bool(self.oauth_credentials.valid)
+
+        try:
+            from google.auth.transport.requests import Request
+
+            start = time.perf_counter()
+            try:
+                self.oauth_credentials.refresh(Request())
+            except Exception as e:
+                self._metrics['refresh_failures'] += 1
+                self._metrics['last_error'] = str(e)
+                print(f"⚠️  Google token refresh failed: {e}")
+                self._schedule_refresh(REFRESH_RETRY_SECONDS)
+                return False
+
+            elapsed = time.perf_counter() - start
+            self._metrics['refresh_count'] += 1
+            self._metrics['last_refresh_seconds'] = elapsed
+            self._metrics['max_refresh_seconds'] = max(self._metrics['max_refresh_seconds'], elapsed)
+            self._metrics['total_refresh_seconds'] += elapsed
+            self._metrics['last_refresh_at'] = time.time()
+            self._metrics['last_error'] = None
+            print(f"🔄 Google token refreshed in {elapsed:.2f}s")
+
+            self._schedule_refresh()
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def _start_background_refresh(self):
+        """Kick off a refresh on a daemon thread unless one is already running"""
+        if self._refresh_lock.locked():
+            return
+        thread = threading.Thread(target=self.refresh, name='google-token-refresh', daemon=True)
+        thread.start()
+
+    def _seconds_to_expiry(self) -> float:
+        """Seconds until the current access token expires (inf if unknown)"""
+        expiry = getattr(self.oauth_credentials, 'expiry', None)
+        if expiry is None:
+            return float('inf')
+        if expiry.tzinfo is None:
+            expiry = expiry.replace(tzinfo=timezone.utc)  # google-auth stores expiry as a naive UTC datetime
+        return (expiry - datetime.now(timezone.utc)).total_seconds()
+
+    def _schedule_refresh(self, delay: float = None):
+        """Arm the background timer to refresh ahead of expiry"""
+        if not self.oauth_credentials or not self.oauth_credentials.refresh_token:
+            return
+
+        if delay is None:
+            remaining = self._seconds_to_expiry()
+            if remaining == float('inf'):
+                delay = DEFAULT_CHECK_SECONDS
+            else:
+                delay = max(remaining - REFRESH_MARGIN_SECONDS, 0)
+
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self.refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Refresh counters and latency figures"""
+        metrics = dict(self._metrics)
+        count = metrics['refresh_count']
+        metrics['avg_refresh_seconds'] = metrics['total_refresh_seconds'] / count if count else None
+        metrics['source'] = self.source
+        if self.oauth_credentials is not None:
+            remaining = self._seconds_to_expiry()
+            metrics['seconds_to_expiry'] = None if remaining == float('inf') else round(remaining)
+        return metrics
+
+
+# Global credential manager instance
+credential_manager = GoogleCredentialManager()
@@ -1,45 +1,26 @@
+import io
 import os
-from google.oauth2.credentials import Credentials
+import uuid
+from typing import Optional
 from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from datetime import datetime
+from googleapiclient.http import MediaIoBaseUpload
+from google_credentials import credential_manager
 
 SCOPES = ['https://www.googleapis.com/auth/drive']
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
 
-def convert_docx_to_pdf_google(docx_path, pdf_path):
-    """
-    Convert DOCX to PDF using Google Drive API.
-    Returns True if successful, False if it fails (so DOCX can be used as fallback).
-    """
-    try:
-        # Try to get credentials from environment variables first
+def _get_drive_service():
+    """Drive API client, or None when there are no usable Google credentials"""
+    # Shared credentials, loaded once and refreshed in the background
+    creds = credential_manager.get_credentials()
+
+    if creds is None and not credential_manager.has_oauth_credentials():
         google_creds_json = os.getenv('GOOGLE_CREDENTIALS_JSON')
-        google_token_json = os.getenv('GOOGLE_TOKEN_JSON')
-        
-        creds = None
-        
-        if google_token_json:
-            # Use token from environment variable
-            print("🔍 DEBUG: Using Google token from environment variable")
-            import json
-            token_data = json.loads(google_token_json)
-            creds = Credentials.from_authorized_user_info(token_data, SCOPES)
-        elif google_creds_json:
-            # Use credentials from environment variable
-            print("🔍 DEBUG: Using Google credentials from environment variable")
-            import json
-            creds_data = json.loads(google_creds_json)
-            from google_auth_oauthlib.flow import InstalledAppFlow
-            flow = InstalledAppFlow.from_client_config(creds_data, SCOPES)
+        if google_creds_json:
             # This won't work in production without a browser, so we'll skip it
             print("⚠️  Cannot run OAuth flow in production environment")
-            return False
-        elif os.path.exists('token.json'):
-            # Use local token file
-            print("🔍 DEBUG: Using local token.json file")
-            creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+            return None
         elif os.path.exists('credentials.json'):
             # Use local credentials file
             print("🔍 DEBUG: Using local credentials.json file")
@@ -51,46 +32,66 @@ def convert_docx_to_pdf_google(docx_path, pdf_path):
             print("⚠️  No Google credentials found - PDF conversion disabled")
             print("⚠️  Set GOOGLE_TOKEN_JSON environment variable for PDF support")
             print("⚠️  Will upload DOCX file instead")
-            return False
+            return None
+
+    # Check if credentials are valid
+    if not creds or not creds.valid:
+        print("⚠️  Google credentials are invalid - PDF conversion disabled")
+        return None
 
-        # Check if credentials are valid
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                print("🔍 DEBUG: Refreshing expired Google credentials")
-                creds.refresh(Request())
-            else:
-                print("⚠️  Google credentials are invalid - PDF conversion disabled")
-                return False
+    print("🔍 DEBUG: Building Google Drive service")
+    return build('drive', 'v3', credentials=creds)
 
-        print("🔍 DEBUG: Building Google Drive service")
-        drive_service = build('drive', 'v3', credentials=creds)
 
-        # Upload .docx as a Google Docs file
+def convert_docx_bytes_to_pdf_google(docx_data: bytes, name: Optional[str] = None) -> Optional[bytes]:
+    """
+    Convert an in-memory DOCX to PDF bytes using the Google Drive API.
+    Returns None if it fails (so the DOCX can be uploaded instead).
+    """
+    try:
+        drive_service = _get_drive_service()
+        if drive_service is None:
+            return None
+
+        # Upload .docx as a Google Docs file, named per job so concurrent conversions never collide
         file_metadata = {
-            'name': f'Sara_Agreement_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+            'name': name or f'Sara_Document_{uuid.uuid4().hex}',
             'mimeType': 'application/vnd.google-apps.document'
         }
 
         print("🔍 DEBUG: Uploading DOCX to Google Drive")
-        media = MediaFileUpload(docx_path, mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+        media = MediaIoBaseUpload(io.BytesIO(docx_data), mimetype=DOCX_MIMETYPE, resumable=False)
         uploaded_file = drive_service.files().create(body=file_metadata, media_body=media, fields='id').execute()
         file_id = uploaded_file.get('id')
         print(f"🔍 DEBUG: File uploaded with ID: {file_id}")
 
-        # Export as PDF
-        print("🔍 DEBUG: Exporting as PDF")
-        request = drive_service.files().export_media(fileId=file_id, mimeType='application/pdf')
-        with open(pdf_path, 'wb') as f:
-            f.write(request.execute())
-
-        # Clean up: delete uploaded file from Drive
-        print("🔍 DEBUG: Cleaning up temporary file from Drive")
-        drive_service.files().delete(fileId=file_id).execute()
+        try:
+            # Export as PDF
+            print("🔍 DEBUG: Exporting as PDF")
+            pdf_data = drive_service.files().export_media(fileId=file_id, mimeType='application/pdf').execute()
+        finally:
+            # Clean up: delete uploaded file from Drive
+            print("🔍 DEBUG: Cleaning up temporary file from Drive")
+            drive_service.files().delete(fileId=file_id).execute()
 
         print("✅ PDF generated via Google Docs API.")
-        return True
-        
+        return pdf_data
+
     except Exception as e:
         print(f"⚠️  PDF conversion failed: {e}")
         print("⚠️  Will upload DOCX file instead")
+        return None
+
+
+def convert_docx_to_pdf_google(docx_path, pdf_path):
+    """
+    Convert a DOCX file to a PDF file using Google Drive API.
+    Returns True if successful, False if it fails (so DOCX can be used as fallback).
+    """
+    with open(docx_path, 'rb') as f:
+        pdf_data = convert_docx_bytes_to_pdf_google(f.read())
+    if pdf_data is None:
         return False
+    with open(pdf_path, 'wb') as f:
+        f.write(pdf_data)
+    return True
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Currency and number parsing shared by the sheet, agreement and invoice code.
+
+Understands values as they appear in the sheets and in Slack messages:
+"₹1,50,000", "$1,200.50", "Rs. 5000", "INR 2,00,000", "5000/-", "(1,200)"
+and "-₹300", plus "5 lakh" / "2 crore" / "10k" style amounts. Blanks and
+anything else that isn't a number (including digits split by whitespace,
+"12 34") parse to None (scalar) or NaN (batch).
+"""
+
+import re
+import math
+from typing import Optional, Any, Iterable, Union
+
+import numpy as np
+
+# Currency markers removed before parsing (word markers only when they stand alone, so "crores" keeps its "rs")
+_CURRENCY = re.compile(r'₹|\$|/-|(?<![a-z])(?:inr|rs\.?)(?![a-z])')
+
+# Word multipliers for Indian-style amounts
+MULTIPLIERS = {
+    'k': 1e3, 'thousand': 1e3,
+    'l': 1e5, 'lac': 1e5, 'lacs': 1e5, 'lakh': 1e5, 'lakhs': 1e5,
+    'cr': 1e7, 'crore': 1e7, 'crores': 1e7,
+}
+
+# Most sheet cells: "150000", "₹1,50,000", "-$1,200.50" (read without the general rules below)
+_PLAIN = re.compile(r'(-?)[₹$]?(\d[\d,]*(?:\.\d+)?)')
+_NUMBER = re.compile(r'[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:e[-+]?\d+)?')
+_SIGN_SPACE = re.compile(r'^([-+])\s+')
+_MULTIPLIER = re.compile(r'^(.*?\d)\s*(' + '|'.join(sorted(MULTIPLIERS, key=len, reverse=True)) + r')$')
+
+
+def parse_amount(value: Any) -> Optional[float]:
+    """Parse one amount; None for blanks and anything that isn't a number"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        number = float(value)
+        return number if np.isfinite(number) else None
+
+    text = str(value).strip()
+    m = _PLAIN.fullmatch(text)
+    if m:
+        number = float(m.group(2).replace(',', ''))
+        return (-number if m.group(1) else number) if math.isfinite(number) else None
+
+    negative = text.startswith('(') and text.endswith(')')
+    if negative:
+        text = text[1:-1]
+
+    text = _CURRENCY.sub('', text.strip().lower()).replace(',', '').strip()
+
+    multiplier = 1.0
+    m = _MULTIPLIER.match(text)
+    if m:
+        text, multiplier = m.group(1), MULTIPLIERS[m.group(2)]
+
+    # "- ₹300" -> "-300"; whitespace inside the number itself ("12 34") is not an amount
+    text = _SIGN_SPACE.sub(r'\1', text)
+    if not _NUMBER.fullmatch(text):
+        return None
+    number = float(text) * multiplier
+    if not np.isfinite(number):
+        return None
+    return -abs(number) if negative else number
+
+
+def parse_amounts(values: Union[np.ndarray, Iterable[Any]]) -> np.ndarray:
+    """Parse a whole column of amounts into a float64 array (NaN for blanks and non-numbers)"""
+    cells = values.reshape(-1).tolist() if isinstance(values, np.ndarray) else list(values)
+    parsed = (parse_amount(cell) for cell in cells)
+    return np.fromiter((np.nan if number is None else number for number in parsed), float, count=len(cells))
+
+
+def amount_to_str(value: Any) -> str:
+    """Plain amount string for templates and prompts ("500000", "1200.5"); '' if unparsable"""
+    number = parse_amount(value)
+    if number is None:
+        return ''
+    return str(int(number)) if number.is_integer() else f"{number:.2f}".rstrip('0').rstrip('.')
@@ -12,6 +12,8 @@ from sheets_service import sheets_service
 from direct_sheets_service import DirectSheetsService
 from email_service import handle_email_request, handle_email_confirmation
 from brand_info_service import BrandInfoService
+from brand_mirror import brand_mirror
+from pdf_converter import local_pdf_converter
 from service_status_checker import ServiceStatusChecker
 
 
@@ -37,10 +39,14 @@ except Exception as e:
 try:
     brand_info_service = BrandInfoService()
     print("✅ Brand Info Service initialized")
+    brand_mirror.start()
 except Exception as e:
     print(f"⚠️  Brand Info Service failed to initialize: {e}")
     brand_info_service = None
 
+# Warm up the local PDF workers (no-op without LibreOffice; conversions then use Google Drive)
+local_pdf_converter.start_in_background()
+
 
 # ─── Function: route_mention ─────────────────────────────────────────────
 @app.event("app_mention")
@@ -212,6 +218,14 @@ def handle_all_messages(body, say, client, logger):
         handle_deposit_invoice({**event, "text": user_text}, say, brand_data=brand_data)
         return
 
+    # A reply picking one of the numbered "did you mean" brands resolves from the cached snapshot
+    reply_text = clean_slack_text(user_text).strip()
+    if brand_info_service and brand_info_service.has_pending_choice(thread_ts, reply_text):
+        print(f"📨 [THREAD] Reply answers a pending brand choice - bypassing intent classification")
+        response = brand_info_service.process_brand_query(reply_text, thread_id=thread_ts)
+        say(f"🏢 {response}", thread_ts=thread_ts)
+        return
+
     # Combine parent and user text for context
     combined_text = parent_text + "\n" + user_text
     cleaned_text = clean_slack_text(combined_text).lower()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+DOCX → PDF conversion: a pool of warm headless LibreOffice workers, with Google Drive as fallback
+"""
+
+import os
+import time
+import queue
+import atexit
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import subprocess
+from typing import Optional, Dict, Any
+from dotenv import load_dotenv
+
+from google_pdf import convert_docx_bytes_to_pdf_google
+
+# Load environment variables
+load_dotenv()
+
+# 'auto' (warm local pool when unoserver is installed, else Drive), 'local' (local, Drive on failure) or 'google'
+PDF_CONVERTER = os.getenv('PDF_CONVERTER', 'auto').lower()
+
+# Number of office processes kept running
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', '2'))
+
+# A conversion taking longer than this kills and restarts its worker
+PDF_CONVERT_TIMEOUT_SECONDS = float(os.getenv('PDF_CONVERT_TIMEOUT_SECONDS', '60'))
+
+# Workers are restarted after this many conversions (office processes grow over time)
+PDF_WORKER_MAX_JOBS = int(os.getenv('PDF_WORKER_MAX_JOBS', '100'))
+
+# How long a listener gets to come up before the worker is treated as broken
+PDF_WORKER_START_SECONDS = float(os.getenv('PDF_WORKER_START_SECONDS', '30'))
+
+SOFFICE_PATH = os.getenv('SOFFICE_PATH') or shutil.which('soffice') or shutil.which('libreoffice')
+UNOSERVER_PATH = os.getenv('UNOSERVER_PATH') or shutil.which('unoserver')
+UNOCONVERT_PATH = os.getenv('UNOCONVERT_PATH') or shutil.which('unoconvert')
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class ConverterWorker:
+    """
+    One headless office process with its own user profile.
+
+    With unoserver installed (``listener``) the process stays up on a local
+    port and each conversion streams DOCX bytes in and PDF bytes out through
+    unoconvert. Without it there is no process to keep: each conversion is
+    a cold ``soffice --convert-to`` start on this worker's profile, through a
+    temporary directory removed straight after (degraded mode).
+    """
+
+    def __init__(self, worker_id: int, listener: bool = True):
+        self.worker_id = worker_id
+        self.jobs = 0
+        self.process = None
+        self.port = None
+        self.profile_dir = tempfile.mkdtemp(prefix=f'sara-office-{worker_id}-')
+        self.listener = listener
+
+    @property
+    def profile_url(self) -> str:
+        return 'file://' + self.profile_dir
+
+    def start(self):
+        """Start the listener and wait until it accepts connections"""
+        if not self.listener:
+            return
+        self.port = _free_port()
+        self.process = subprocess.Popen(
+            [UNOSERVER_PATH, '--interface', '127.0.0.1', '--port', str(self.port),
+             '--uno-port', str(_free_port()), '--user-installation', self.profile_url]
+            + (['--executable', SOFFICE_PATH] if SOFFICE_PATH else []),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.time() + PDF_WORKER_START_SECONDS
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"office worker {self.worker_id} exited with code {self.process.returncode}")
+            try:
+                with socket.create_connection(('127.0.0.1', self.port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"office worker {self.worker_id} didn't start within {PDF_WORKER_START_SECONDS:.0f}s")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def restart(self):
+        self.stop()
+        self.jobs = 0
+        self.start()
+
+    def is_alive(self) -> bool:
+        """Whether the listener is still running (always True in degraded mode, where there is none)"""
+        return not self.listener or (self.process is not None and self.process.poll() is None)
+
+    def convert(self, docx_data: bytes, timeout: float) -> bytes:
+        """PDF bytes for ``docx_data``; raises on failure or timeout"""
+        self.jobs += 1
+        if self.listener:
+            result = subprocess.run(
+                [UNOCONVERT_PATH, '--host', '127.0.0.1', '--port', str(self.port),
+                 '--input-filter', 'MS Word 2007 XML', '--convert-to', 'pdf', '-', '-'],
+                input=docx_data, capture_output=True, timeout=timeout
+            )
+            if result.returncode != 0 or not result.stdout.startswith(b'%PDF'):
+                raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip()[-300:] or 'no PDF returned')
+            return result.stdout
+
+        with tempfile.TemporaryDirectory(prefix='sara-convert-') as workdir:
+            docx_path = os.path.join(workdir, 'document.docx')
+            with open(docx_path, 'wb') as f:
+                f.write(docx_data)
+            # soffice hands the document to a child process; its own session lets a timeout kill both
+            process = subprocess.Popen(
+                [SOFFICE_PATH, '--headless', '--norestore', '--nologo', f'-env:UserInstallation={self.profile_url}',
+                 '--convert-to', 'pdf', '--outdir', workdir, docx_path],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True
+            )
+            try:
+                _, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except OSError:
+                    pass  # exited meanwhile
+                process.communicate()
+                raise
+            pdf_path = os.path.join(workdir, 'document.pdf')
+            if process.returncode != 0 or not os.path.exists(pdf_path):
+                raise RuntimeError(stderr.decode('utf-8', 'replace').strip()[-300:] or 'no PDF written')
+            with open(pdf_path, 'rb') as f:
+                return f.read()
+
+
+class LocalPdfConverter:
+    """
+    Pool of ConverterWorkers handing each DOCX to an idle worker.
+
+    Workers start on first use (or via ``start_in_background`` at boot). A
+    worker that times out, fails or reaches PDF_WORKER_MAX_JOBS is restarted
+    before it goes back to the pool; callers wait up to the conversion
+    timeout for an idle worker.
+
+    Warm workers need unoserver. Without it the pool is only used when
+    ``cold_start`` allows it (PDF_CONVERTER=local), and then every document
+    pays a full soffice start; the workers just cap concurrency and keep
+    profiles apart.
+    """
+
+    def __init__(self, workers: int = PDF_WORKERS, timeout: float = PDF_CONVERT_TIMEOUT_SECONDS,
+                 max_jobs: int = PDF_WORKER_MAX_JOBS, cold_start: bool = PDF_CONVERTER == 'local'):
+        self.size = max(1, workers)
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self.cold_start = cold_start
+        self._idle = queue.Queue()
+        self._workers = []
+        self._start_lock = threading.Lock()
+        self._started = False
+        self._metrics_lock = threading.Lock()
+        self._metrics = {'conversions': 0, 'failures': 0, 'timeouts': 0, 'restarts': 0, 'total_seconds': 0.0}
+        self.last_error = None
+
+    @property
+    def warm(self) -> bool:
+        """Whether workers are long-running unoserver listeners"""
+        return bool(UNOSERVER_PATH and UNOCONVERT_PATH)
+
+    @property
+    def available(self) -> bool:
+        return self.warm or (self.cold_start and SOFFICE_PATH is not None)
+
+    def start(self):
+        """Start every worker (no-op once started)"""
+        with self._start_lock:
+            if self._started:
+                return
+            if not self.warm:
+                print("⚠️  unoserver/unoconvert not found - converting PDFs with a cold soffice start per "
+                      "document (degraded mode; install unoserver for warm workers)")
+            for worker_id in range(self.size):
+                worker = ConverterWorker(worker_id, listener=self.warm)
+                try:
+                    worker.start()
+                except Exception as e:
+                    self.last_error = str(e)
+                    print(f"⚠️  PDF worker {worker_id} failed to start: {e}")
+                    shutil.rmtree(worker.profile_dir, ignore_errors=True)
+                    continue
+                self._workers.append(worker)
+                self._idle.put(worker)
+            self._started = True
+            atexit.register(self.stop)
+            mode = 'unoserver listeners' if self.warm else 'soffice per document, degraded'
+            print(f"🖨️  Local PDF converter ready: {len(self._workers)}/{self.size} workers ({mode})")
+
+    def start_in_background(self):
+        if self.available:
+            threading.Thread(target=self.start, name='pdf-workers-start', daemon=True).start()
+        elif SOFFICE_PATH is not None and PDF_CONVERTER != 'google':
+            print("ℹ️  LibreOffice found but unoserver isn't - converting PDFs with Google Drive "
+                  "(set PDF_CONVERTER=local for per-document soffice)")
+
+    def stop(self):
+        """Stop every worker and remove its profile (also run at interpreter exit)"""
+        for worker in self._workers:
+            worker.stop()
+            shutil.rmtree(worker.profile_dir, ignore_errors=True)
+        self._workers = []
+
+    def _count(self, key: str, amount: float = 1):
+        with self._metrics_lock:
+            self._metrics[key] += amount
+
+    def _recycle(self, worker: ConverterWorker):
+        if not worker.listener:
+            worker.jobs = 0
+            return
+        try:
+            worker.restart()
+            self._count('restarts')
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️  PDF worker {worker.worker_id} failed to restart: {e}")
+
+    def convert(self, docx_data: bytes) -> Optional[bytes]:
+        """PDF bytes, or None if no worker could convert the document in time"""
+        if not self.available:
+            return None
+        self.start()
+        if not self._workers:
+            return None
+
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            self.last_error = 'no idle PDF worker'
+            self._count('timeouts')
+            return None
+
+        start = time.perf_counter()
+        try:
+            if not worker.is_alive():
+                self._recycle(worker)
+            pdf_data = worker.convert(docx_data, self.timeout)
+            with self._metrics_lock:
+                self._metrics['conversions'] += 1
+                self._metrics['total_seconds'] += time.perf_counter() - start
+            if worker.jobs >= self.max_jobs:
+                self._recycle(worker)
+            return pdf_data
+        except subprocess.TimeoutExpired:
+            self._count('timeouts')
+            self.last_error = f"worker {worker.worker_id} timed out after {self.timeout:.0f}s"
+            print(f"⚠️  Local PDF conversion timed out - restarting worker {worker.worker_id}")
+            self._recycle(worker)
+            return None
+        except Exception as e:
+            self._count('failures')
+            self.last_error = str(e)
+            print(f"⚠️  Local PDF conversion failed: {e}")
+            self._recycle(worker)
+            return None
+        finally:
+            self._idle.put(worker)
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        conversions = metrics['conversions']
+        return {
+            'available': self.available,
+            'mode': 'warm' if self.warm else 'cold (degraded)',
+            'workers': len(self._workers),
+            'idle': self._idle.qsize(),
+            'avg_seconds': round(metrics['total_seconds'] / conversions, 3) if conversions else None,
+            **{key: value for key, value in metrics.items() if key != 'total_seconds'},
+            'last_error': self.last_error
+        }
+
+
+# Global pool shared by the agreement and invoice services
+local_pdf_converter = LocalPdfConverter()
+
+
+def convert_docx_to_pdf(docx_data: bytes, name: Optional[str] = None) -> Optional[bytes]:
+    """
+    PDF bytes for an in-memory DOCX via the configured backend (PDF_CONVERTER),
+    falling back to Google Drive when the local pool can't convert it.
+    Returns None if every backend fails (so the DOCX can be uploaded instead).
+    """
+    if PDF_CONVERTER != 'google' and local_pdf_converter.available:
+        start = time.perf_counter()
+        pdf_data = local_pdf_converter.convert(docx_data)
+        if pdf_data is not None:
+            print(f"✅ PDF generated locally in {time.perf_counter() - start:.2f}s.")
+            return pdf_data
+        print("⚠️  Local PDF conversion unavailable - falling back to Google Drive")
+    return convert_docx_bytes_to_pdf_google(docx_data, name)
@@ -7,10 +7,11 @@ from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 from slack_sdk.errors import SlackApiError
 from slack_sdk.web import WebClient
-from docx import Document
 import pypandoc
 from openai import OpenAI
-from google_pdf import convert_docx_to_pdf_google as convert_docx_to_pdf
+from pdf_converter import convert_docx_to_pdf
+from utils import format_currency, new_job_id, document_filename
+from docx_template import get_template
 
 
 # Load environment variables
@@ -37,19 +38,10 @@ thread_memory = {}
 def clean_slack_text(text):
     return re.sub(r"<@[\w]+>", "", text).strip()
 
-def format_currency(value):
-    try:
-        return "₹{:,.0f}".format(float(value)).replace(",", ",")
-    except:
-        return value
-
 
-def fill_docx_template(template_path, output_path, values):
-    doc = Document(template_path)
-    for p in doc.paragraphs:
-        for key, val in values.items():
-            p.text = p.text.replace(f"{{{{{key}}}}}", str(val))
-    doc.save(output_path)
+def fill_docx_template(template_path, values):
+    buffer, _ = get_template(template_path).render_to_buffer(values)
+    return buffer.getvalue()
 
 def extract_agreement_fields(message_text):
     system_prompt = (
@@ -84,26 +76,24 @@ def generate_agreement(values):
     values["start_date"] = str(date.today())
 
     brand = values["brand_name"]
-    safe_brand = re.sub(r'\W+', '_', brand.lower())
-    docx_path = f"{safe_brand}_agreement.docx"
-    pdf_path = f"{safe_brand}_agreement.pdf"
+    job_id = new_job_id()
 
-    fill_docx_template("Partnership Agreement Template.docx", docx_path, values)
-    if convert_docx_to_pdf(docx_path, pdf_path):
-        return pdf_path, f"{brand.title()} Agreement (PDF)"
+    docx_data = fill_docx_template("Partnership Agreement Template.docx", values)
+    pdf_data = convert_docx_to_pdf(docx_data, f"Sara_Agreement_{job_id}")
+    if pdf_data:
+        return pdf_data, document_filename(brand, "agreement", "pdf", job_id), f"{brand.title()} Agreement (PDF)"
     else:
-        return docx_path, f"{brand.title()} Agreement (.docx fallback)"
-
-def upload_file_to_slack(path, title, channel, thread_ts):
-    with open(path, "rb") as f:
-        client.files_upload_v2(
-            channel=channel,
-            thread_ts=thread_ts,
-            file=f,
-            title=title,
-            filename=os.path.basename(path),
-            initial_comment=f"📎 Here's your file: *{title}*"
-        )
+        return docx_data, document_filename(brand, "agreement", "docx", job_id), f"{brand.title()} Agreement (.docx fallback)"
+
+def upload_file_to_slack(data, filename, title, channel, thread_ts):
+    client.files_upload_v2(
+        channel=channel,
+        thread_ts=thread_ts,
+        content=data,
+        title=title,
+        filename=filename,
+        initial_comment=f"📎 Here's your file: *{title}*"
+    )
 
 # ---------- MAIN FLOW ----------
 
@@ -124,8 +114,8 @@ def process_agreement_request(message_text, event, say):
             say(f"🤖 I need a few more details to finish the agreement: *{', '.join(still_missing)}*", thread_ts=thread_ts)
             return
 
-        filepath, title = generate_agreement(prev)
-        upload_file_to_slack(filepath, title, channel, thread_ts)
+        data, filename, title = generate_agreement(prev)
+        upload_file_to_slack(data, filename, title, channel, thread_ts)
         say(f"✅ Agreement for *{prev['brand_name']}* is ready!", thread_ts=thread_ts)
         del thread_memory[key]
 
@@ -5,14 +5,12 @@ Checks the health and availability of all critical services
 """
 
 import os
-import json
 import requests
 from typing import Dict, Any, List, Tuple
 from dotenv import load_dotenv
 import openai
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from google_credentials import credential_manager
 
 # Load environment variables
 load_dotenv()
@@ -22,6 +20,24 @@ class ServiceStatusChecker:
     
     def __init__(self):
         self.status_results = {}
+        self._sheet_tables = None  # Brand sheets fetched together for the feature checks
+        
+    def _get_sheet_tables(self) -> Dict[str, Any]:
+        """Read every sheet the feature checks need in one batched round trip"""
+        if self._sheet_tables is None:
+            from direct_sheets_service import (
+                DirectSheetsService, BRAND_BALANCES_SHEET_ID, BRAND_BALANCES_SHEET_NAME,
+                BRAND_BALANCES_LAST_COLUMN, BRAND_MASTER_SHEET_ID, BRAND_MASTER_SHEET_NAME
+            )
+            
+            service = DirectSheetsService()
+            self._sheet_tables = service.batch_read_tables({
+                'brand_balances': (BRAND_BALANCES_SHEET_ID, service.plan_range(
+                    BRAND_BALANCES_SHEET_ID, BRAND_BALANCES_SHEET_NAME, BRAND_BALANCES_LAST_COLUMN)),
+                'brand_master': (BRAND_MASTER_SHEET_ID, service.plan_range(
+                    BRAND_MASTER_SHEET_ID, BRAND_MASTER_SHEET_NAME, end_row=1)),
+            })
+        return self._sheet_tables
         
     def check_all_services(self) -> Dict[str, Any]:
         """Check all services and return comprehensive status"""
@@ -118,30 +134,17 @@ class ServiceStatusChecker:
     def _check_google_oauth(self) -> Dict[str, Any]:
         """Check Google OAuth credentials for private sheets"""
         try:
-            # Check for OAuth credentials in environment or file
-            google_token_json = os.getenv('GOOGLE_TOKEN_JSON')
-            token_file_exists = os.path.exists('token.json')
-            
-            if not google_token_json and not token_file_exists:
+            if not credential_manager.has_oauth_credentials():
                 return {
                     'status': 'WARNING',
                     'error': 'No OAuth credentials found (neither GOOGLE_TOKEN_JSON env var nor token.json)',
                     'impact': 'Cannot access private Google Sheets'
                 }
             
-            # Try to load and validate credentials
-            credentials = None
-            if google_token_json:
-                token_data = json.loads(google_token_json)
-                credentials = Credentials.from_authorized_user_info(token_data)
-            elif token_file_exists:
-                credentials = Credentials.from_authorized_user_file('token.json')
+            # Shared credentials - refreshed in the background, not here
+            credentials = credential_manager.get_credentials()
             
             if credentials:
-                # Test if credentials need refresh
-                if credentials.expired and credentials.refresh_token:
-                    credentials.refresh(Request())
-                
                 # Test with a simple API call
                 service = build('sheets', 'v4', credentials=credentials)
                 test_sheet_id = "1Ch6NflcXS6BfK0zZ8SoeoiU_PwKe8_oEVjDX2tTE8QY"
@@ -151,11 +154,25 @@ class ServiceStatusChecker:
                     range="A1:A1"
                 ).execute()
                 
+                metrics = credential_manager.get_metrics()
+                details = 'OAuth credentials working, can access private sheets'
+                if metrics['refresh_count']:
+                    details += (f" (token refreshes: {metrics['refresh_count']}, "
+                                f"avg {metrics['avg_refresh_seconds']:.2f}s, "
+                                f"max {metrics['max_refresh_seconds']:.2f}s)")
+                
                 return {
                     'status': 'HEALTHY',
-                    'details': 'OAuth credentials working, can access private sheets'
+                    'details': details,
+                    'metrics': metrics
                 }
             
+            return {
+                'status': 'FAILED',
+                'error': credential_manager.get_metrics().get('last_error') or 'OAuth credentials are expired and could not be refreshed',
+                'impact': 'Cannot access private Google Sheets'
+            }
+
         except Exception as e:
             return {
                 'status': 'FAILED',
@@ -229,9 +246,16 @@ class ServiceStatusChecker:
             from direct_sheets_service import DirectSheetsService
             
             service = DirectSheetsService()
+            balances_table = self._get_sheet_tables().get('brand_balances')
+            if balances_table is None:
+                return {
+                    'status': 'WARNING',
+                    'error': "I couldn't access the Brand Balances sheet",
+                    'impact': 'Payment queries may fail'
+                }
             
-            # Test payment query functionality
-            test_result = service._check_brand_balances("who hasn't paid")
+            # Test payment query functionality on the prefetched sheet
+            test_result = service._check_brand_balances("who hasn't paid", table=balances_table)
             
             if "Error" not in test_result and "couldn't access" not in test_result:
                 return {
@@ -258,9 +282,17 @@ class ServiceStatusChecker:
             from brand_info_service import BrandInfoService
             
             service = BrandInfoService()
+            
+            if self._get_sheet_tables().get('brand_master') is None:
+                return {
+                    'status': 'WARNING',
+                    'error': "Brand Info Service initialized but can't access the Brand Information Master sheet",
+                    'impact': 'Brand information queries will fail'
+                }
+            
             return {
                 'status': 'HEALTHY',
-                'details': 'Brand Info Service initialized successfully'
+                'details': 'Brand Info Service initialized and Brand Master sheet accessible'
             }
             
         except Exception as e:
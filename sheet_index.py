@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Token and substring index over the cells of a SheetTable
+"""
+
+import re
+import heapq
+import threading
+from typing import Optional, Dict, Any, List, Set, Tuple
+
+from sheet_table import SheetTable
+
+# Substring lookups use character n-grams of this length
+NGRAM_SIZE = 3
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class SheetIndex:
+    """
+    Inverted index over one sheet snapshot.
+
+    Every distinct normalised (stripped + lowercased) cell value gets an id and
+    a posting set of the cells holding it, encoded as ``row * num_columns + col``.
+    Two indexes point at those value ids:
+
+    - tokens: word token -> value ids containing it
+    - ngrams: character trigram -> value ids containing it
+
+    A substring query intersects the trigram postings to get candidate values,
+    verifies them, and sums their cell postings, so its cost follows the number
+    of matching values rather than the size of the sheet.
+
+    One index is shared by concurrent queries and updated in place, so
+    updates and lookups hold the index's lock. Values no cell holds any more
+    are dropped (their ids are reused).
+    """
+
+    def __init__(self, table: SheetTable):
+        self.sheet_id = table.sheet_id
+        self.revision = None
+        self.num_columns = 0
+        self.num_rows = 0
+
+        self._value_ids = {}      # normalised value -> value id
+        self._values = []         # value id -> normalised value
+        self._postings = []       # value id -> set of cell ids
+        self._tokens = {}         # token -> set of value ids
+        self._ngrams = {}         # trigram -> set of value ids
+        self._row_values = []     # row -> tuple of normalised cells (for incremental updates)
+        self._free_ids = []       # ids of dropped values, reused first
+        self._lock = threading.RLock()
+
+        self.rebuild(table)
+
+    # ─── Building ────────────────────────────────────────────────────────
+    def rebuild(self, table: SheetTable):
+        """Index the whole table from scratch"""
+        rows = self._table_rows(table)
+        with self._lock:
+            self._value_ids = {}
+            self._values = []
+            self._postings = []
+            self._tokens = {}
+            self._ngrams = {}
+            self._free_ids = []
+            self.num_columns = table.num_columns
+            self._row_values = rows
+            self.num_rows = len(rows)
+
+            for row_idx, row in enumerate(rows):
+                self._add_row(row_idx, row)
+            self.revision = table.revision
+
+    def update(self, table: SheetTable) -> int:
+        """
+        Bring the index in line with a newer snapshot of the same sheet.
+
+        Only rows whose cells changed are re-indexed; a change in the number
+        of columns alters every cell id, so that falls back to a full rebuild.
+        Returns the number of rows re-indexed.
+        """
+        if table.revision == self.revision:
+            return 0
+        if table.num_columns != self.num_columns:
+            self.rebuild(table)
+            return self.num_rows
+
+        new_rows = self._table_rows(table)
+        with self._lock:
+            old_rows = self._row_values
+            changed = []
+            for row_idx in range(max(len(old_rows), len(new_rows))):
+                old = old_rows[row_idx] if row_idx < len(old_rows) else None
+                new = new_rows[row_idx] if row_idx < len(new_rows) else None
+                if old != new:
+                    changed.append((row_idx, old, new))
+
+            # Remove every changed row before adding, so a value that only moved keeps its id
+            touched = set()
+            for row_idx, old, _ in changed:
+                if old is not None:
+                    touched |= self._remove_row(row_idx, old)
+            for row_idx, _, new in changed:
+                if new is not None:
+                    self._add_row(row_idx, new)
+            for value_id in touched:
+                if not self._postings[value_id]:
+                    self._drop_value(value_id)
+
+            self._row_values = new_rows
+            self.num_rows = len(new_rows)
+            self.revision = table.revision
+        return len(changed)
+
+    def _table_rows(self, table: SheetTable) -> List[Tuple[str, ...]]:
+        columns = [table.normalized(idx).tolist() for idx in range(table.num_columns)]
+        return list(zip(*columns)) if columns else []
+
+    def _add_row(self, row_idx: int, row: Tuple[str, ...]):
+        base = row_idx * self.num_columns
+        for col_idx, value in enumerate(row):
+            if not value:
+                continue
+            value_id = self._value_ids.get(value)
+            if value_id is None:
+                value_id = self._new_value(value)
+            self._postings[value_id].add(base + col_idx)
+
+    def _remove_row(self, row_idx: int, row: Tuple[str, ...]) -> Set[int]:
+        """Drop the row's cells from their postings; returns the value ids touched"""
+        base = row_idx * self.num_columns
+        touched = set()
+        for col_idx, value in enumerate(row):
+            if value:
+                value_id = self._value_ids[value]
+                self._postings[value_id].discard(base + col_idx)
+                touched.add(value_id)
+        return touched
+
+    def _new_value(self, value: str) -> int:
+        if self._free_ids:
+            value_id = self._free_ids.pop()
+            self._values[value_id] = value
+            self._postings[value_id] = set()
+        else:
+            value_id = len(self._values)
+            self._values.append(value)
+            self._postings.append(set())
+        self._value_ids[value] = value_id
+        for token in set(TOKEN_PATTERN.findall(value)):
+            self._tokens.setdefault(token, set()).add(value_id)
+        for gram in _ngrams(value):
+            self._ngrams.setdefault(gram, set()).add(value_id)
+        return value_id
+
+    def _drop_value(self, value_id: int):
+        """Forget a value no cell holds any more"""
+        value = self._values[value_id]
+        del self._value_ids[value]
+        for index, keys in ((self._tokens, set(TOKEN_PATTERN.findall(value))), (self._ngrams, _ngrams(value))):
+            for key in keys:
+                ids = index[key]
+                ids.discard(value_id)
+                if not ids:
+                    del index[key]
+        self._values[value_id] = None
+        self._postings[value_id] = None
+        self._free_ids.append(value_id)
+
+    # ─── Lookups ─────────────────────────────────────────────────────────
+    def _matching_values(self, term: str) -> List[int]:
+        """Value ids whose text contains ``term`` as a substring"""
+        if len(term) >= NGRAM_SIZE:
+            posting_sets = []
+            for gram in _ngrams(term):
+                ids = self._ngrams.get(gram)
+                if not ids:
+                    return []
+                posting_sets.append(ids)
+            posting_sets.sort(key=len)
+            candidates = set.intersection(*posting_sets)
+        elif TOKEN_PATTERN.fullmatch(term):
+            # A short run of word characters can only occur inside a single token
+            candidates = set()
+            for token, ids in self._tokens.items():
+                if term in token:
+                    candidates |= ids
+        else:
+            candidates = self._value_ids.values()
+
+        return [value_id for value_id in candidates if term in self._values[value_id]]
+
+    def find(self, term: str, limit: Optional[int] = 10) -> Dict[str, Any]:
+        """
+        Count the cells containing ``term`` (case-insensitive) and return the
+        first ``limit`` of them in row-major order as (row, column) pairs.
+        """
+        term = term.strip().lower()
+        if not term:
+            return {'count': 0, 'cells': []}
+
+        with self._lock:
+            postings = [self._postings[value_id] for value_id in self._matching_values(term)]
+            count = sum(len(cells) for cells in postings)
+
+            if limit is None:
+                first = sorted(cell for cells in postings for cell in cells)
+            else:
+                first = heapq.nsmallest(limit, (cell for cells in postings for cell in cells))
+            return {'count': count, 'cells': [divmod(cell, self.num_columns) for cell in first]}
+
+    def count(self, term: str) -> int:
+        """Number of cells containing ``term``"""
+        return self.find(term, limit=0)['count']
+
+    def count_token(self, token: str) -> int:
+        """Number of cells containing ``token`` as a whole word"""
+        with self._lock:
+            value_ids = self._tokens.get(token.strip().lower(), ())
+            return sum(len(self._postings[value_id]) for value_id in value_ids)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Index size figures"""
+        with self._lock:
+            return {
+                'rows': self.num_rows,
+                'columns': self.num_columns,
+                'distinct_values': len(self._value_ids),
+                'tokens': len(self._tokens),
+                'ngrams': len(self._ngrams)
+            }
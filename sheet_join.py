@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Local joins between sheet snapshots (e.g. Brand Balances × Brand Information Master)
+"""
+
+import re
+from difflib import SequenceMatcher, get_close_matches
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+
+from sheet_table import SheetTable
+from sheet_schema import brand_master_schema
+
+# Fuzzy matches below this SequenceMatcher ratio are treated as "not in the other sheet"
+FUZZY_JOIN_CUTOFF = 0.85
+
+# Brand Master fields that can be joined onto a brand (see sheet_schema.BRAND_MASTER_FIELDS)
+DETAIL_LABELS = {'email': '📧 Email', 'gst': '🧾 GST', 'phone': '📞 Phone'}
+
+
+def normalize_brand_name(name: str) -> str:
+    """Join key for brand names: lowercase, '&' -> 'and', punctuation and extra spaces dropped"""
+    name = name.lower().replace('&', ' and ')
+    return ' '.join(re.sub(r'[^\w\s]', ' ', name).split())
+
+
+class BrandNameIndex:
+    """
+    Hash index from normalised brand name to row, with a fuzzy fallback.
+
+    Exact (normalised) names are a dict lookup; names that miss are matched
+    against the distinct keys with difflib, and those results are memoised
+    so a join only pays for each unmatched name once.
+    """
+
+    def __init__(self, names: Iterable[str], cutoff: float = FUZZY_JOIN_CUTOFF):
+        self.cutoff = cutoff
+        self._rows = {}  # normalised name -> first row index
+        for row_idx, name in enumerate(names):
+            key = normalize_brand_name(name)
+            if key and key not in self._rows:
+                self._rows[key] = row_idx
+        self._keys = list(self._rows)
+        self._fuzzy = {}  # normalised name -> (row index, ratio)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def lookup(self, name: str) -> Tuple[Optional[int], float]:
+        """(row index, match ratio) for a brand name; (None, 0.0) when nothing is close enough"""
+        key = normalize_brand_name(name)
+        if not key:
+            return None, 0.0
+        if key in self._rows:
+            return self._rows[key], 1.0
+
+        if key not in self._fuzzy:
+            close = get_close_matches(key, self._keys, n=1, cutoff=self.cutoff)
+            if close:
+                self._fuzzy[key] = (self._rows[close[0]], SequenceMatcher(None, key, close[0]).ratio())
+            else:
+                self._fuzzy[key] = (None, 0.0)
+        return self._fuzzy[key]
+
+
+def join_on_brand(left: SheetTable, left_col: int, right: SheetTable, right_col: int,
+                  cutoff: float = FUZZY_JOIN_CUTOFF) -> List[Tuple[int, Optional[int], float]]:
+    """
+    Left join two snapshots on normalised brand name.
+    Returns (left row, right row or None, match ratio) for every left row.
+    """
+    index = BrandNameIndex(right.stripped(right_col).tolist(), cutoff)
+    return [(row_idx, *index.lookup(name)) for row_idx, name in enumerate(left.stripped(left_col).tolist())]
+
+
+def enrich_brands(brands: List[Dict[str, Any]], master: SheetTable, fields: List[str],
+                  cutoff: float = FUZZY_JOIN_CUTOFF) -> List[Dict[str, Any]]:
+    """
+    Copies of ``brands`` (dicts with a 'brand' key) with Brand Master details added.
+
+    Each result gets the requested ``fields`` (keys of DETAIL_LABELS; '' when
+    the column or brand is missing), plus 'matched_name' and 'match_ratio'.
+    """
+    schema = brand_master_schema(master.headers).require('company_name')
+    name_col = schema['company_name']
+
+    index = BrandNameIndex(master.stripped(name_col).tolist(), cutoff)
+    field_values = {}
+    for field in fields:
+        col = schema[field]
+        field_values[field] = master.stripped(col) if col is not None else None
+
+    names = master.stripped(name_col)
+    enriched = []
+    for brand in brands:
+        row_idx, ratio = index.lookup(brand['brand'])
+        entry = dict(brand, matched_name=str(names[row_idx]) if row_idx is not None else None, match_ratio=ratio)
+        for field, values in field_values.items():
+            entry[field] = str(values[row_idx]) if row_idx is not None and values is not None else ''
+        enriched.append(entry)
+    return enriched
+
+
+def format_enriched_unpaid_report(unpaid_brands: List[Dict[str, Any]], total_outstanding: float,
+                                  fields: List[str]) -> str:
+    """Unpaid-brands Slack message with the joined Brand Master details under each brand"""
+    if not unpaid_brands:
+        return "🎉 Great news! All brands have paid their balances. No outstanding payments found."
+
+    response = f"💸 **Brands that haven't paid** ({len(unpaid_brands)} total):\n\n"
+
+    for brand in unpaid_brands:
+        response += f"• **{brand['brand']}**: ₹{brand['amount_due']:,.2f} due\n"
+        if brand['matched_name'] is None:
+            response += "    _Not found in the Brand Information Master_\n"
+            continue
+        if brand['match_ratio'] < 1.0:
+            response += f"    _Matched to \"{brand['matched_name']}\"_\n"
+        details = [f"{DETAIL_LABELS[field]}: {brand[field] or '_not available_'}" for field in fields]
+        response += "    " + " · ".join(details) + "\n"
+
+    response += f"\n💰 **Total outstanding**: ₹{total_outstanding:,.2f}"
+
+    return response
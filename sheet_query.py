@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Structured query plans for natural-language sheet questions.
+
+The LLM only translates the question into a small JSON plan (filters,
+group-by, an aggregate, ordering and top-k) over named columns; the plan is
+then executed locally against the full SheetTable.
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+from sheet_table import SheetTable, contains_text
+from numeric_parsing import parse_amount
+
+# Maximum number of cached question plans
+PLAN_CACHE_SIZE = int(os.getenv('SHEET_QUERY_PLAN_CACHE_SIZE', '256'))
+
+# Rows/groups shown when the plan doesn't set top_k, and the hard ceiling
+DEFAULT_TOP_K = 10
+MAX_TOP_K = 50
+
+FILTER_OPS = {'eq', 'ne', 'contains', 'not_contains', 'in', 'gt', 'gte', 'lt', 'lte', 'empty', 'not_empty'}
+AGGREGATE_OPS = {'count', 'sum', 'avg', 'min', 'max', 'distinct', 'rows'}
+NUMERIC_OPS = {'gt', 'gte', 'lt', 'lte'}
+
+PLAN_SYSTEM_PROMPT = """You translate questions about a spreadsheet into a JSON query plan. Reply with JSON only.
+
+Plan format:
+{
+  "filters": [{"column": "<header>", "op": "eq|ne|contains|not_contains|in|gt|gte|lt|lte|empty|not_empty", "value": <string, number or list>}],
+  "group_by": "<header>" or null,
+  "aggregate": {"op": "count|sum|avg|min|max|distinct|rows", "column": "<header>" or null},
+  "columns": ["<header>", ...],
+  "order_by": "<header>" or null,
+  "descending": true,
+  "top_k": 10
+}
+
+Rules:
+- Use header names exactly as given. Text comparisons are case-insensitive.
+- "count" counts rows; "distinct" counts unique values of its column; "rows" lists matching rows (pick the useful "columns").
+- sum/avg/min/max need a numeric column.
+- With group_by, the aggregate is computed per group and groups are ranked by it.
+- If the question can't be answered this way, reply {"unsupported": true}."""
+
+
+class QueryPlanError(ValueError):
+    """Raised when a plan is malformed or doesn't fit the sheet"""
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r'\s+', ' ', question.strip().lower()).rstrip('?.! ')
+
+
+def schema_key(table: SheetTable) -> str:
+    """Hash of the header row; plans are only reused for the same schema"""
+    return hashlib.sha1('\x1f'.join(table.headers).encode('utf-8')).hexdigest()
+
+
+def _column_profile(table: SheetTable, idx: int) -> Dict[str, Any]:
+    """Header, rough type and a few example values for the plan prompt"""
+    values = table.stripped(idx)
+    filled = values[values != '']
+    numeric = table.numeric(idx)
+    is_numeric = len(filled) > 0 and np.count_nonzero(~np.isnan(numeric)) >= 0.8 * len(filled)
+
+    examples = []
+    for value in filled[:200].tolist():
+        if value not in examples:
+            examples.append(value[:40])
+        if len(examples) == 3:
+            break
+    return {'column': table.headers[idx], 'type': 'number' if is_numeric else 'text', 'examples': examples}
+
+
+def _parse_plan(content: str) -> Optional[Dict[str, Any]]:
+    """Pull the JSON plan out of an LLM reply (None for an unsupported question)"""
+    m = re.search(r"(\{.*\})", content or '', re.DOTALL)
+    if not m:
+        raise QueryPlanError("No JSON found in plan response")
+    try:
+        plan = json.loads(m.group(1))
+    except Exception as e:
+        raise QueryPlanError(f"Invalid plan JSON: {e}")
+    if not isinstance(plan, dict):
+        raise QueryPlanError("Plan must be a JSON object")
+    if plan.get('unsupported'):
+        return None
+    return plan
+
+
+def validate_plan(plan: Dict[str, Any], table: SheetTable) -> Dict[str, Any]:
+    """Check a raw plan against the table and resolve header names to column indices"""
+    def resolve(name, field):
+        if name is None:
+            return None
+        idx = table.column_index(str(name))
+        if idx is None:
+            raise QueryPlanError(f"Unknown column {name!r} in {field}")
+        return idx
+
+    filters = []
+    for f in plan.get('filters') or []:
+        if not isinstance(f, dict):
+            raise QueryPlanError("Each filter must be an object")
+        op = str(f.get('op', 'eq')).lower()
+        if op not in FILTER_OPS:
+            raise QueryPlanError(f"Unsupported filter op {op!r}")
+        value = f.get('value')
+        if op in NUMERIC_OPS:
+            number = parse_amount(value)
+            if number is None:
+                raise QueryPlanError(f"Filter {op!r} needs a number, got {value!r}")
+            value = number
+        elif op == 'in':
+            value = [str(v).strip().lower() for v in (value if isinstance(value, list) else [value])]
+        elif op not in ('empty', 'not_empty'):
+            value = '' if value is None else str(value).strip().lower()
+        filters.append({'column': resolve(f.get('column'), 'filters'), 'op': op, 'value': value})
+
+    aggregate = plan.get('aggregate') or {'op': 'count'}
+    if isinstance(aggregate, str):
+        aggregate = {'op': aggregate}
+    agg_op = str(aggregate.get('op', 'count')).lower()
+    if agg_op not in AGGREGATE_OPS:
+        raise QueryPlanError(f"Unsupported aggregate {agg_op!r}")
+    agg_column = resolve(aggregate.get('column'), 'aggregate')
+    if agg_op in ('sum', 'avg', 'min', 'max', 'distinct') and agg_column is None:
+        raise QueryPlanError(f"Aggregate {agg_op!r} needs a column")
+
+    group_by = resolve(plan.get('group_by'), 'group_by')
+    if group_by is not None and agg_op == 'rows':
+        raise QueryPlanError("'rows' can't be combined with group_by")
+
+    try:
+        top_k = int(plan.get('top_k') or DEFAULT_TOP_K)
+    except (TypeError, ValueError):
+        top_k = DEFAULT_TOP_K
+
+    return {
+        'filters': filters,
+        'group_by': group_by,
+        'aggregate': agg_op,
+        'aggregate_column': agg_column,
+        'columns': [resolve(c, 'columns') for c in plan.get('columns') or []],
+        'order_by': resolve(plan.get('order_by'), 'order_by'),
+        'descending': bool(plan.get('descending', True)),
+        'top_k': max(1, min(top_k, MAX_TOP_K))
+    }
+
+
+def _filter_mask(table: SheetTable, filters: List[Dict[str, Any]]) -> np.ndarray:
+    """Rows that are non-blank and pass every filter"""
+    mask = np.zeros(table.num_rows, dtype=bool)
+    for idx in range(table.num_columns):
+        mask |= table.stripped(idx) != ''
+
+    for f in filters:
+        col, op, value = f['column'], f['op'], f['value']
+        if op in NUMERIC_OPS:
+            numbers = table.numeric(col)
+            with np.errstate(invalid='ignore'):
+                if op == 'gt':
+                    mask &= numbers > value
+                elif op == 'gte':
+                    mask &= numbers >= value
+                elif op == 'lt':
+                    mask &= numbers < value
+                else:
+                    mask &= numbers <= value
+            continue
+
+        cells = table.normalized(col)
+        if op in ('eq', 'ne'):
+            matches = cells == value
+            number = parse_amount(value)
+            if number is not None:
+                # "5000" should also match a cell showing "₹5,000"
+                matches |= table.numeric(col) == number
+            mask &= matches if op == 'eq' else ~matches
+        elif op == 'contains':
+            mask &= contains_text(cells, value)
+        elif op == 'not_contains':
+            mask &= ~contains_text(cells, value)
+        elif op == 'in':
+            mask &= np.isin(cells, value)
+        elif op == 'empty':
+            mask &= cells == ''
+        elif op == 'not_empty':
+            mask &= cells != ''
+    return mask
+
+
+def _reduce(op: str, values: Optional[np.ndarray], keys: np.ndarray, num_groups: int) -> np.ndarray:
+    """Per-group aggregate; ``keys`` maps each selected row to its group"""
+    if op == 'count':
+        return np.bincount(keys, minlength=num_groups).astype(float)
+
+    valid = ~np.isnan(values)
+    keys, values = keys[valid], values[valid]
+    counts = np.bincount(keys, minlength=num_groups)
+    if op in ('sum', 'avg'):
+        totals = np.bincount(keys, weights=values, minlength=num_groups)
+        if op == 'sum':
+            return totals
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+
+    result = np.full(num_groups, np.nan)
+    (np.fmin if op == 'min' else np.fmax).at(result, keys, values)
+    return result
+
+
+def execute_plan(plan: Dict[str, Any], table: SheetTable) -> Dict[str, Any]:
+    """Run a validated plan over the whole table"""
+    mask = _filter_mask(table, plan['filters'])
+    selected = np.flatnonzero(mask)
+    op, agg_col, top_k = plan['aggregate'], plan['aggregate_column'], plan['top_k']
+    result = {'plan': plan, 'matched_rows': int(len(selected)), 'total_rows': table.num_rows}
+
+    if op == 'rows':
+        if plan['order_by'] is not None:
+            numbers = table.numeric(plan['order_by'])[selected]
+            if np.count_nonzero(~np.isnan(numbers)):
+                sort_keys = np.where(np.isnan(numbers), -np.inf if plan['descending'] else np.inf, numbers)
+            else:
+                sort_keys = table.normalized(plan['order_by'])[selected]
+            order = np.argsort(sort_keys, kind='stable')
+            selected = selected[order[::-1]] if plan['descending'] else selected[order]
+        columns = plan['columns'] or list(range(table.num_columns))
+        result['columns'] = [table.headers[c] for c in columns]
+        result['rows'] = [[str(table.stripped(c)[r]) for c in columns] for r in selected[:top_k]]
+        return result
+
+    if plan['group_by'] is None:
+        if op == 'count':
+            result['value'] = float(len(selected))
+        elif op == 'distinct':
+            present = selected[table.stripped(agg_col)[selected] != '']
+            values = table.stripped(agg_col)[present]
+            _, first_idx = np.unique(table.normalized(agg_col)[present], return_index=True)
+            result['value'] = float(len(first_idx))
+            result['examples'] = values[np.sort(first_idx)][:top_k].tolist()
+        else:
+            values = table.numeric(agg_col)[selected]
+            result['value'] = float(_reduce(op, values, np.zeros(len(selected), dtype=int), 1)[0])
+        return result
+
+    # Grouped aggregate: groups are the distinct normalised values of the group column
+    group_norm = table.normalized(plan['group_by'])[selected]
+    group_keys, first_idx, inverse = np.unique(group_norm, return_index=True, return_inverse=True)
+    labels = table.stripped(plan['group_by'])[selected][first_idx]
+
+    if op == 'distinct':
+        values = table.normalized(agg_col)[selected]
+        keep = values != ''
+        pairs = np.unique(np.stack([inverse[keep], np.unique(values[keep], return_inverse=True)[1]]), axis=1)
+        agg = np.bincount(pairs[0], minlength=len(group_keys)).astype(float)
+    else:
+        values = table.numeric(agg_col)[selected] if agg_col is not None else None
+        agg = _reduce(op, values, inverse, len(group_keys))
+
+    # Rank groups by the aggregate (NaN last), ties in first-seen order
+    rank_keys = np.where(np.isnan(agg), -np.inf, agg if plan['descending'] else -agg)
+    order = np.lexsort((first_idx, -rank_keys))
+    result['groups'] = [(str(labels[i]) or '(blank)', float(agg[i])) for i in order[:top_k]]
+    result['num_groups'] = int(len(group_keys))
+    return result
+
+
+def _format_number(value: float) -> str:
+    if np.isnan(value):
+        return 'n/a'
+    if float(value).is_integer():
+        return f"{int(value):,}"
+    return f"{value:,.2f}"
+
+
+def _describe_filters(plan: Dict[str, Any], table: SheetTable) -> str:
+    symbols = {'eq': '=', 'ne': '≠', 'gt': '>', 'gte': '≥', 'lt': '<', 'lte': '≤'}
+    parts = []
+    for f in plan['filters']:
+        name = table.headers[f['column']]
+        if f['op'] in ('empty', 'not_empty'):
+            parts.append(f"{name} is {'empty' if f['op'] == 'empty' else 'not empty'}")
+        elif f['op'] == 'in':
+            parts.append(f"{name} in ({', '.join(f['value'])})")
+        else:
+            value = _format_number(f['value']) if f['op'] in NUMERIC_OPS else f"'{f['value']}'"
+            parts.append(f"{name} {symbols.get(f['op'], f['op'].replace('_', ' '))} {value}")
+    return ' and '.join(parts)
+
+
+def format_result(result: Dict[str, Any], table: SheetTable) -> str:
+    """Render an executed plan as a short Slack-friendly answer"""
+    plan = result['plan']
+    op, agg_col = plan['aggregate'], plan['aggregate_column']
+    lines = []
+
+    filters = _describe_filters(plan, table)
+    scope = f"{result['matched_rows']} of {result['total_rows']} rows" + (f" where {filters}" if filters else "")
+
+    if op == 'rows':
+        if not result['rows']:
+            return f"No rows match{' ' + filters if filters else ''}."
+        lines.append(f"Found {scope}:")
+        for row in result['rows']:
+            lines.append("• " + " | ".join(f"{h}: {v}" for h, v in zip(result['columns'], row) if v))
+        if result['matched_rows'] > len(result['rows']):
+            lines.append(f"(and {result['matched_rows'] - len(result['rows'])} more)")
+        return "\n".join(lines)
+
+    metric = 'Count' if op == 'count' else f"{op.capitalize()} of {table.headers[agg_col]}"
+    if op == 'distinct':
+        metric = f"Distinct {table.headers[agg_col]}"
+
+    if 'groups' in result:
+        lines.append(f"**{metric} by {table.headers[plan['group_by']]}** ({scope}):")
+        for label, value in result['groups']:
+            lines.append(f"• {label}: {_format_number(value)}")
+        if result['num_groups'] > len(result['groups']):
+            lines.append(f"(showing top {len(result['groups'])} of {result['num_groups']} groups)")
+        return "\n".join(lines)
+
+    lines.append(f"**{metric}:** {_format_number(result['value'])} ({scope})")
+    if result.get('examples'):
+        lines.append(", ".join(result['examples']))
+    return "\n".join(lines)
+
+
+class SheetQueryEngine:
+    """Turns questions into cached query plans and runs them locally"""
+
+    def __init__(self, cache_size: int = PLAN_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._plans = OrderedDict()  # (normalised question, schema key) -> raw plan or None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'llm_failures': 0}
+
+    def _cached_plan(self, key: Tuple[str, str]) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        with self._lock:
+            if key not in self._plans:
+                return False, None
+            self._plans.move_to_end(key)
+            return True, self._plans[key]
+
+    def _store_plan(self, key: Tuple[str, str], plan: Optional[Dict[str, Any]]):
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.cache_size:
+                self._plans.popitem(last=False)
+
+    def _request_plan(self, question: str, table: SheetTable, client) -> Optional[Dict[str, Any]]:
+        """Ask the LLM for a plan; None means it judged the question unsupported"""
+        schema = [_column_profile(table, idx) for idx in range(table.num_columns) if table.headers[idx].strip()]
+        response = client.chat.completions.create(
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": PLAN_SYSTEM_PROMPT},
+                {"role": "user", "content": f"Columns: {json.dumps(schema, ensure_ascii=False)}\n\nQuestion: {question}"}
+            ],
+            max_tokens=300,
+            temperature=0
+        )
+        return _parse_plan(response.choices[0].message.content)
+
+    def get_plan(self, question: str, table: SheetTable, client) -> Optional[Dict[str, Any]]:
+        """Cached plan for this question and schema, asking the LLM on a miss"""
+        key = (normalize_question(question), schema_key(table))
+        found, plan = self._cached_plan(key)
+        if found:
+            self.stats['hits'] += 1
+            return plan
+
+        self.stats['misses'] += 1
+        plan = self._request_plan(question, table, client)
+        if plan is not None:
+            validate_plan(plan, table)  # don't cache plans that can't run
+        self._store_plan(key, plan)
+        return plan
+
+    def answer(self, question: str, table: SheetTable, client) -> Optional[str]:
+        """Answer from a local plan, or None if the question couldn't be planned"""
+        try:
+            plan = self.get_plan(question, table, client)
+        except Exception as e:
+            self.stats['llm_failures'] += 1
+            print(f"⚠️  Couldn't build a query plan: {e}")
+            return None
+        if plan is None:
+            return None
+
+        try:
+            result = execute_plan(validate_plan(plan, table), table)
+        except QueryPlanError as e:
+            print(f"⚠️  Query plan rejected: {e}")
+            return None
+        print(f"📊 Query plan matched {result['matched_rows']} of {result['total_rows']} rows")
+        return format_result(result, table)
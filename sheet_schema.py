@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Header-to-field schemas for the sheets the bot reads, resolved once per snapshot
+"""
+
+from typing import Optional, Dict, List, Iterable
+
+
+class FieldSpec:
+    """
+    How to find one logical field among a sheet's headers.
+
+    ``aliases`` are header names (case- and whitespace-insensitive) in
+    preference order. ``position`` is the column the field lives in unless an
+    alias names an earlier one (the old "Column B unless named earlier"
+    rule). ``contains`` matches aliases as substrings, ``columns`` restricts
+    which positions may match, and ``default`` is used when nothing does.
+    """
+
+    __slots__ = ('aliases', 'position', 'default', 'contains', 'columns')
+
+    def __init__(self, aliases: Iterable[str], position: Optional[int] = None, default: Optional[int] = None,
+                 contains: bool = False, columns: Optional[Iterable[int]] = None):
+        self.aliases = [alias.strip().lower() for alias in aliases]
+        self.position = position
+        self.default = default
+        self.contains = contains
+        self.columns = set(columns) if columns is not None else None
+
+    def _matches(self, idx: int, header: str) -> Optional[int]:
+        """Alias rank of ``header`` (lower is preferred), or None"""
+        if self.columns is not None and idx not in self.columns:
+            return None
+        for rank, alias in enumerate(self.aliases):
+            if (alias in header) if self.contains else (alias == header):
+                return rank
+        return None
+
+    def resolve(self, headers: List[str]) -> Optional[int]:
+        """Column index for this field in ``headers``, or None"""
+        normalized = [' '.join(str(h).lower().split()) for h in headers]
+        if self.position is not None and self.position < len(normalized):
+            for idx in range(self.position):
+                if self._matches(idx, normalized[idx]) is not None:
+                    return idx
+            return self.position
+
+        best, best_rank = None, None
+        for idx, header in enumerate(normalized):
+            rank = self._matches(idx, header)
+            if rank is not None and (best_rank is None or rank < best_rank):
+                best, best_rank = idx, rank
+        if best is not None:
+            return best
+        return self.default if self.default is not None and self.default < len(normalized) else None
+
+
+# Brand Information Master fields
+BRAND_ID_HEADERS = ['brand id', 'brand_id', 'brand code', 'id']
+
+BRAND_MASTER_FIELDS = {
+    'company_name': FieldSpec(['company name', 'brand name', 'name'], position=1),
+    'brand_id': FieldSpec(BRAND_ID_HEADERS),
+    'registered_company_name': FieldSpec(['registered company name', 'registered name', 'legal name']),
+    'address_line1': FieldSpec(['address line 1', 'address 1', 'address']),
+    'address_line2': FieldSpec(['address line 2', 'address 2']),
+    'city': FieldSpec(['city']),
+    'state': FieldSpec(['state']),
+    'pin_code': FieldSpec(['pin code', 'pincode', 'pin', 'postal code']),
+    'phone': FieldSpec(['phone', 'phone number', 'contact number']),
+    'email': FieldSpec(['email', 'emailid', 'email id', 'email address']),
+    'gst': FieldSpec(['gst number', 'gst', 'gstin', 'gst no', 'gst no.']),
+    'status': FieldSpec(['status']),
+}
+
+# Brand listing sheets counted by DirectSheetsService: brand in A (or B when its header
+# mentions brands), status named "Status"/"M" or in Column M
+BRAND_LIST_FIELDS = {
+    'brand': FieldSpec(['brand'], contains=True, columns=[1], default=0),
+    'status': FieldSpec(['status', 'm'], position=12),
+}
+
+
+class SheetSchema:
+    """
+    Logical field -> column index for one set of headers.
+
+    Resolved once (per snapshot), so per-request code indexes columns
+    directly instead of rescanning headers for aliases.
+    """
+
+    def __init__(self, headers: List[str], fields: Dict[str, FieldSpec], name: str = 'sheet'):
+        self.name = name
+        self.headers = list(headers)
+        self.columns = {field: spec.resolve(self.headers) for field, spec in fields.items()}
+
+    def __getitem__(self, field: str) -> Optional[int]:
+        return self.columns.get(field)
+
+    def get(self, field: str) -> Optional[int]:
+        """Column index of ``field``, or None when the sheet has no such column"""
+        return self.columns.get(field)
+
+    @property
+    def missing(self) -> List[str]:
+        return [field for field, col in self.columns.items() if col is None]
+
+    def require(self, *fields: str) -> 'SheetSchema':
+        """Raise ValueError naming any of ``fields`` the headers don't have"""
+        missing = [field for field in fields if self.columns.get(field) is None]
+        if missing:
+            labels = ', '.join(field.replace('_', ' ') for field in missing)
+            raise ValueError(f"couldn't find the {labels} column{'s' if len(missing) > 1 else ''} in the {self.name}")
+        return self
+
+
+def brand_master_schema(headers: List[str]) -> SheetSchema:
+    return SheetSchema(headers, BRAND_MASTER_FIELDS, 'Brand Master sheet')
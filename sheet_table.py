@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Columnar, typed representation of Google Sheets data
+"""
+
+import hashlib
+from itertools import zip_longest
+from typing import Optional, Dict, Any, List, Union
+
+import numpy as np
+
+from numeric_parsing import parse_amounts
+
+ColumnKey = Union[int, str]
+
+# A '<U' column reserves its longest cell's width for every row, so a column whose
+# longest cell is wider than this (notes, addresses) is kept as an object array
+MAX_FIXED_WIDTH = 128
+
+
+class SheetTable:
+    """
+    One snapshot of a sheet stored column by column.
+
+    Cells are kept as NumPy string arrays (ragged rows are padded with ''),
+    except free-text columns with a cell wider than MAX_FIXED_WIDTH, which are
+    object arrays of str (see ``string_column``). Derived views - stripped,
+    normalised (stripped + lowercased) and numeric - are computed once per
+    column on first use and reused by every query against the snapshot.
+    """
+
+    def __init__(self, headers: List[str], columns: List[np.ndarray], sheet_id: Optional[str] = None,
+                 source_columns: Optional[List[int]] = None):
+        self.sheet_id = sheet_id
+        self.headers = list(headers)
+        self._columns = columns
+        self.num_rows = len(columns[0]) if columns else 0
+
+        # Sheet column positions of each column (differs from 0..n-1 for column projections)
+        self.source_columns = list(source_columns) if source_columns is not None else list(range(len(columns)))
+
+        # Normalised header name -> column index (first occurrence wins)
+        self.header_index = {}
+        for idx, header in enumerate(self.headers):
+            key = header.strip().lower()
+            if key and key not in self.header_index:
+                self.header_index[key] = idx
+
+        self._stripped = {}
+        self._normalized = {}
+        self._numeric = {}
+        self._revision = None
+
+    # ─── Construction ────────────────────────────────────────────────────
+    @classmethod
+    def from_rows(cls, headers: List[str], rows: List[List[Any]], sheet_id: Optional[str] = None) -> 'SheetTable':
+        """Build a table from a header row and ragged data rows"""
+        headers = [str(h) if h is not None else '' for h in headers]
+        width = max([len(headers)] + [len(row) for row in rows]) if rows else len(headers)
+        headers = headers + [''] * (width - len(headers))
+
+        return cls(headers, _columns_from_rows(rows, width), sheet_id)
+
+    @classmethod
+    def from_values(cls, values: List[List[Any]], sheet_id: Optional[str] = None) -> 'SheetTable':
+        """Build a table from a raw Sheets API ``values`` payload (first row is the header)"""
+        headers = values[0] if values else []
+        return cls.from_rows(headers, values[1:], sheet_id)
+
+    @classmethod
+    def from_sheet_data(cls, sheet_data: Dict[str, Any]) -> 'SheetTable':
+        """Build a table from the legacy ``{'headers': [...], 'rows': [...]}`` dict"""
+        return cls.from_rows(sheet_data.get('headers', []), sheet_data.get('rows', []), sheet_data.get('sheet_id'))
+
+    @property
+    def revision(self) -> str:
+        """Content hash of the headers and cells; equal snapshots share a revision"""
+        if self._revision is None:
+            digest = hashlib.sha1()
+            digest.update('\x1f'.join(self.headers).encode('utf-8'))
+            for col in self._columns:
+                digest.update(b'\x1e')
+                digest.update(str(col.dtype).encode('ascii'))
+                if col.dtype == object:
+                    digest.update('\x1f'.join(col.tolist()).encode('utf-8'))
+                else:
+                    digest.update(col.tobytes())
+            self._revision = digest.hexdigest()
+        return self._revision
+
+    # ─── Column access ───────────────────────────────────────────────────
+    @property
+    def num_columns(self) -> int:
+        return len(self.headers)
+
+    def column_index(self, key: ColumnKey) -> Optional[int]:
+        """Resolve a column index from an int or a (case-insensitive) header name"""
+        if isinstance(key, (int, np.integer)):
+            return int(key) if 0 <= key < len(self._columns) else None
+        return self.header_index.get(str(key).strip().lower())
+
+    def _require_index(self, key: ColumnKey) -> int:
+        idx = self.column_index(key)
+        if idx is None:
+            raise KeyError(f"Column {key!r} not found")
+        return idx
+
+    def column(self, key: ColumnKey) -> np.ndarray:
+        """Raw cell strings for a column"""
+        return self._columns[self._require_index(key)]
+
+    def stripped(self, key: ColumnKey) -> np.ndarray:
+        """Whitespace-stripped cell strings for a column"""
+        idx = self._require_index(key)
+        if idx not in self._stripped:
+            col = self._columns[idx]
+            self._stripped[idx] = string_column([c.strip() for c in col.tolist()]) if col.dtype == object \
+                else np.char.strip(col)
+        return self._stripped[idx]
+
+    def normalized(self, key: ColumnKey) -> np.ndarray:
+        """Stripped and lowercased cell strings for a column"""
+        idx = self._require_index(key)
+        if idx not in self._normalized:
+            col = self.stripped(idx)
+            self._normalized[idx] = np.array([c.lower() for c in col.tolist()], dtype=object) if col.dtype == object \
+                else np.char.lower(col)
+        return self._normalized[idx]
+
+    def numeric(self, key: ColumnKey) -> np.ndarray:
+        """Column parsed as float64 amounts (see numeric_parsing; NaN where unparsable)"""
+        idx = self._require_index(key)
+        if idx not in self._numeric:
+            self._numeric[idx] = parse_amounts(self.stripped(idx))
+        return self._numeric[idx]
+
+    # ─── Row access (for formatting and legacy callers) ──────────────────
+    def row(self, index: int) -> List[str]:
+        """One row as a list of strings"""
+        return [str(col[index]) for col in self._columns]
+
+    def rows(self) -> List[List[str]]:
+        """All rows as lists of strings"""
+        return [list(map(str, row)) for row in zip(*self._columns)]
+
+    def to_sheet_data(self) -> Dict[str, Any]:
+        """Convert back to the legacy ``{'headers': [...], 'rows': [...]}`` dict"""
+        return {
+            'sheet_id': self.sheet_id,
+            'headers': self.headers,
+            'rows': self.rows(),
+            'total_rows': self.num_rows + 1,
+            'total_columns': self.num_columns
+        }
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+
+class SheetTableBuilder:
+    """
+    Incrementally builds a SheetTable from row pages.
+
+    Each page is converted to column arrays as soon as it arrives, so the raw
+    row lists of a large sheet never have to be held in memory all at once.
+    """
+
+    def __init__(self, headers: List[str], sheet_id: Optional[str] = None):
+        self.headers = [_cell_str(h) for h in headers]
+        self.sheet_id = sheet_id
+        self._chunks = []  # [(row_count, [column arrays])]
+        self._pending_blank_rows = 0
+
+    def add_rows(self, rows: List[List[Any]], expected_rows: Optional[int] = None):
+        """
+        Append one page of rows.
+
+        The Sheets API drops trailing empty rows from a range, so a page may come
+        back shorter than requested. Those rows are kept as pending blanks and only
+        materialised if a later page has data, which keeps row numbers aligned.
+        """
+        if rows:
+            if self._pending_blank_rows:
+                self._append([[]] * self._pending_blank_rows)
+                self._pending_blank_rows = 0
+            self._append(rows)
+        if expected_rows is not None and expected_rows > len(rows):
+            self._pending_blank_rows += expected_rows - len(rows)
+
+    def _append(self, rows: List[List[Any]]):
+        width = max(len(row) for row in rows) if rows else 0
+        self._chunks.append((len(rows), _columns_from_rows(rows, width)))
+
+    def build(self) -> SheetTable:
+        """Concatenate the page chunks into a single SheetTable"""
+        width = max([len(self.headers)] + [len(cols) for _, cols in self._chunks])
+        headers = self.headers + [''] * (width - len(self.headers))
+
+        columns = []
+        for j in range(width):
+            parts = [cols[j] if j < len(cols) else np.full(count, '', dtype=str) for count, cols in self._chunks]
+            columns.append(np.concatenate(parts) if parts else np.array([], dtype=str))
+
+        return SheetTable(headers, columns, self.sheet_id)
+
+
+def as_table(sheet_data: Union['SheetTable', Dict[str, Any], None]) -> Optional[SheetTable]:
+    """Accept either a SheetTable or a legacy sheet_data dict"""
+    if sheet_data is None or isinstance(sheet_data, SheetTable):
+        return sheet_data
+    return SheetTable.from_sheet_data(sheet_data)
+
+
+def string_column(cells: List[str]) -> np.ndarray:
+    """Column array for ``cells``: fixed-width '<U', or object when a cell exceeds MAX_FIXED_WIDTH"""
+    longest = max(map(len, cells), default=0)
+    return np.array(cells, dtype=str if longest <= MAX_FIXED_WIDTH else object)
+
+
+def contains_text(cells: np.ndarray, text: str) -> np.ndarray:
+    """Mask of the cells containing ``text`` (works for both column representations)"""
+    if cells.dtype == object:
+        return np.fromiter((text in cell for cell in cells.tolist()), bool, count=len(cells))
+    return np.char.find(cells, text) >= 0
+
+
+def _cell_str(cell: Any) -> str:
+    if cell is None:
+        return ''
+    return cell if isinstance(cell, str) else str(cell)
+
+
+def _columns_from_rows(rows: List[List[Any]], width: int) -> List[np.ndarray]:
+    """Transpose ragged rows into ``width`` string column arrays padded with ''"""
+    if not rows:
+        return [np.array([], dtype=str) for _ in range(width)]
+
+    # zip_longest transposes the ragged rows in one pass
+    padded = list(zip_longest(*rows, fillvalue=''))
+    padded += [('',) * len(rows)] * (width - len(padded))
+    return [string_column([_cell_str(c) for c in col]) for col in padded]
+
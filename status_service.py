@@ -1,24 +1,19 @@
 # status_service.py
-from google.oauth2 import service_account
 from googleapiclient.discovery import build
-import os
+from google_credentials import credential_manager
 
 SCOPES = [
     "https://www.googleapis.com/auth/documents.readonly",
     "https://www.googleapis.com/auth/drive.metadata.readonly"
 ]
 
-SERVICE_ACCOUNT_FILE = os.path.join(os.path.dirname(__file__), "credentials.json")
-
 
 def read_google_doc_text(doc_title="Sara Test Doc"):
     """
     Looks up a doc by title and returns its plain text content.
     """
 
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SCOPES
-    )
+    creds = credential_manager.get_service_account_credentials(SCOPES)
     drive = build("drive", "v3", credentials=creds)
     
     # Step 1: Find document ID by name
@@ -0,0 +1,71 @@
+import os
+import time
+
+from artifact_cache import ArtifactCache
+
+
+def age(cache, name, seconds):
+    path = os.path.join(cache.directory, name)
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_put_and_get(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=1000)
+    assert cache.get('abc', 'pdf') is None
+    cache.put('abc', 'pdf', b'%PDF-1')
+    assert cache.get('abc', 'pdf') == b'%PDF-1'
+    status = cache.get_status()
+    assert (status['hits'], status['misses'], status['stores']) == (1, 1, 1)
+
+
+def test_least_recently_used_artifacts_are_evicted(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=250)
+    cache.put('a', 'pdf', b'a' * 100)
+    cache.put('b', 'pdf', b'b' * 100)
+    age(cache, 'a.pdf', 20)
+    age(cache, 'b.pdf', 10)
+    assert cache.get('a', 'pdf') is not None  # a is now the most recently used
+
+    cache.put('c', 'pdf', b'c' * 100)
+    assert cache.get('b', 'pdf') is None
+    assert cache.get('a', 'pdf') is not None
+    assert cache.get('c', 'pdf') is not None
+    assert cache.get_status()['evictions'] == 1
+
+
+def test_processes_sharing_a_directory_stay_under_one_limit(tmp_path):
+    first = ArtifactCache(str(tmp_path), max_bytes=250)
+    second = ArtifactCache(str(tmp_path), max_bytes=250)
+    first.put('a', 'pdf', b'a' * 100)
+    age(first, 'a.pdf', 10)
+    second.put('b', 'pdf', b'b' * 100)
+    assert first.get('b', 'pdf') == b'b' * 100  # written by the other instance
+
+    second.put('c', 'pdf', b'c' * 100)
+    sizes = [os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path) if not name.startswith('.')]
+    assert sum(sizes) <= 250
+    assert first.get('a', 'pdf') is None
+
+
+def test_artifacts_larger_than_the_cache_are_not_stored(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=10)
+    cache.put('big', 'pdf', b'x' * 11)
+    assert cache.get('big', 'pdf') is None
+
+
+def test_stale_temp_file_removed_by_another_process_is_ignored(tmp_path, monkeypatch):
+    cache = ArtifactCache(str(tmp_path), max_bytes=1000)
+    open(os.path.join(tmp_path, '.tmp-dead'), 'wb').close()
+    age(cache, '.tmp-dead', 24 * 3600)
+    remove = os.remove
+
+    def remove_raced(path):
+        remove(path)  # the other process's scan got there first
+        if os.path.basename(path).startswith('.tmp-'):
+            raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, 'remove', remove_raced)
+    cache.put('a', 'pdf', b'%PDF-1')
+    assert cache.get_status()['stores'] == 1 and cache.last_error is None
+    assert sorted(os.listdir(tmp_path)) == ['.lock', 'a.pdf']
@@ -0,0 +1,14 @@
+from sheet_table import SheetTable
+from balances_engine import BalancesEngine
+
+
+def test_reads_follow_the_latest_snapshot():
+    engine = BalancesEngine()
+    engine.apply_snapshot(SheetTable.from_rows(['Brand', 'Balance'], [['Plum', '-500'], ['FAE', '200'], ['Total', '-500']]))
+    assert engine.get_summary()['unpaid_count'] == 1
+    assert 'Plum' in engine.get_report()
+
+    engine.apply_snapshot(SheetTable.from_rows(['Brand', 'Balance'], [['Plum', '0'], ['FAE', '-1,200']]))
+    assert [brand['brand'] for brand in engine.get_unpaid()] == ['FAE']
+    assert engine.get_summary()['largest']['amount_due'] == 1200
+    assert 'FAE' in engine.get_report()
@@ -0,0 +1,61 @@
+import pytest
+
+from sheet_table import SheetTable
+from brand_master import BrandMasterSnapshot
+from brand_info_service import BrandInfoService
+
+NAMES = ['Freakins', 'Plum', 'FAE', 'Yama Yoga', 'Coco Soul', 'Bellavita', 'Theater', 'Kitsch', 'Inde Wild', 'Fruitsy',
+         'Kapda', 'Kupid']
+
+
+@pytest.fixture
+def snapshot():
+    rows = [[str(i + 1), name, f'9876500{i:03d}', f'27AAAC{i:04d}Z'] for i, name in enumerate(NAMES)]
+    return BrandMasterSnapshot(SheetTable.from_rows(['S.No', 'Company Name', 'Phone', 'GST Number'], rows))
+
+
+@pytest.fixture
+def service(snapshot, monkeypatch):
+    service = BrandInfoService()
+    monkeypatch.setattr(service, 'get_brand_master', lambda: snapshot)
+    return service
+
+
+@pytest.mark.parametrize('query, expected', [
+    ("fetch Freakins info and its GST", ['Freakins']),
+    ("fetch Plum and Freakins phone numbers", ['Plum', 'Freakins']),
+    ("fetch details of Freakins & co", ['Freakins']),
+    ("fetch info for Freakins, FAE and Yama Yoga", ['Freakins', 'FAE', 'Yama Yoga']),
+])
+def test_extract_brand_names_ignores_words_that_are_not_brands(service, query, expected):
+    assert service.extract_brand_names(query) == expected
+
+
+def test_extract_brand_names_keeps_misspelt_and_partial_list_items(service):
+    assert service.extract_brand_names("fetch info for Freakins, FAE and Yama Yga") == ['Freakins', 'FAE', 'yama yga']
+    assert service.extract_brand_names("fetch Plum and Yama") == ['Plum', 'yama']
+
+
+def test_multi_brand_unsure_match_can_be_confirmed(service):
+    response = service.process_brand_query("fetch Plum and Kitchen", thread_id='t1')
+    assert "**Plum:**" in response
+    assert "1. **Kitsch**" in response
+    assert service.pending_confirmations['t1'] == ['Kitsch']
+
+    response = service.process_brand_query("yes", thread_id='t1')
+    assert "Found information for **Kitsch**" in response
+    assert 't1' not in service.pending_confirmations
+
+
+def test_multi_brand_unsure_matches_are_numbered(service):
+    response = service.process_brand_query("Plum, Kitchen and Freekings", thread_id='t1')
+    choices = service.pending_confirmations['t1']
+    assert len(choices) == 2 and choices[0] == 'Kitsch'
+    assert service.resolve_pending_choice('t1', '2') == choices[1]
+    assert f"2. 'freekings' → **{choices[1]}**" in response
+
+
+def test_brands_sharing_a_sound_key_are_offered_as_choices(service):
+    response = service.process_brand_query("fetch Plum and Kiped", thread_id='t1')
+    assert sorted(service.pending_confirmations['t1']) == ['Kapda', 'Kupid']
+    assert "1. **K" in response and "2. **K" in response
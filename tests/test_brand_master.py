@@ -0,0 +1,31 @@
+import gc
+import weakref
+
+from sheet_table import SheetTable
+from brand_master import BrandMasterSnapshot
+
+HEADERS = ['S.No', 'Company Name', 'Registered Company Name', 'Address Line 1', 'City', 'Phone']
+ROWS = [
+    ['1', 'Freakins', 'Freakins Apparel Pvt Ltd', ' 12, Linking Road ', 'Mumbai', '9876500001'],
+    ['2', 'Plum', 'Plum Goodness Pvt Ltd', '4 MG Road', 'Bengaluru', ''],
+]
+
+
+def test_find_record_reads_fields_through_the_schema():
+    snapshot = BrandMasterSnapshot(SheetTable.from_rows(HEADERS, ROWS))
+    record = snapshot.find_record('freakins ')
+    assert record.brand_name == 'Freakins'
+    assert record.get('address_line1') == '12, Linking Road'
+    assert record.get('email') == ''
+    assert record.headers == HEADERS
+    assert record.row == ROWS[0]
+
+
+def test_record_does_not_keep_its_snapshot_alive():
+    snapshot = BrandMasterSnapshot(SheetTable.from_rows(HEADERS, ROWS))
+    record = snapshot.find_record('Plum')
+    ref = weakref.ref(snapshot)
+    del snapshot
+    gc.collect()
+    assert ref() is None
+    assert record.get('registered_company_name') == 'Plum Goodness Pvt Ltd'
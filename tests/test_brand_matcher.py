@@ -0,0 +1,62 @@
+from difflib import SequenceMatcher
+
+from brand_matcher import BrandGazetteer, FuzzyBrandIndex, AUTO_ACCEPT_RATIO
+
+NAMES = ['Freakins', 'Yama', 'Yama Yoga', 'FAE', 'Inde Wild', 'Info', 'Plum']
+
+
+def test_extract_prefers_the_longest_name():
+    gazetteer = BrandGazetteer(NAMES)
+    assert gazetteer.extract("Show me info for yama yoga") == 'Yama Yoga'
+    assert gazetteer.extract("What's FAE's GST number") == 'FAE'
+    assert gazetteer.extract("fetch theater info") is None
+
+
+def test_extract_all_returns_every_mention_with_its_span():
+    gazetteer = BrandGazetteer(NAMES)
+    text = "fetch info for Freakins, FAE's GST and Yama Yoga (and freakins again)"
+    mentions = gazetteer.extract_all(text)
+    assert [name for name, _, _ in mentions] == ['Freakins', 'FAE', 'Yama Yoga']
+    assert [text[start:end] for _, start, end in mentions] == ['Freakins', 'FAE', 'Yama Yoga']
+
+
+def test_one_word_names_made_of_query_words_are_not_mentions():
+    gazetteer = BrandGazetteer(NAMES)
+    assert gazetteer.extract_all("fetch info for Plum") == [('Plum', 15, 19)]
+    assert gazetteer.extract_all("Inde-Wild details") == [('Inde Wild', 0, 9)]
+
+
+def test_fuzzy_index_tiers():
+    index = FuzzyBrandIndex(['Inde Wild', 'Bewakoof', 'Freakins', 'Yama Yoga', 'Plum', 'Plum Goodness'])
+    assert index.find('PLUM ') == ('Plum', 1.0)
+    assert [name for name, _ in index.top_k('plum', 2)] == ['Plum', 'Plum Goodness']  # exact beats containment
+    assert index.find('indewild') == ('Inde Wild', 1.0)  # collapsed key
+    assert index.find('Bewakuf') == ('Bewakoof', 0.85)  # phonetic key, below AUTO_ACCEPT_RATIO
+    assert index.find('yama') == ('Yama Yoga', 2.25)  # containment scores len(name) / len(query)
+    assert index.find('xyz', 0.6) == (None, 0.0)
+
+
+def test_fuzzy_index_without_name_keys_scores_like_sequence_matcher():
+    names = ['Inde Wild', 'Bewakoof', 'Freakins']
+    index = FuzzyBrandIndex(names, name_keys=False)
+    for query in ['indewild', 'Bewakuf', 'frekins']:
+        expected = max(names, key=lambda name: SequenceMatcher(None, query.lower(), name.lower()).ratio())
+        ratio = SequenceMatcher(None, query.lower(), expected.lower()).ratio()
+        assert index.find(query) == (expected, ratio)
+
+
+def test_sound_key_matches_are_never_auto_accepted():
+    index = FuzzyBrandIndex(['Plum', 'Freakins', 'Sugar', 'Mamaearth', 'Boat', 'Bata', 'Kapda', 'Kupid'])
+    for query, expected in [('Palm', 'Plum'), ('Saagar', 'Sugar'), ('Siger', 'Sugar')]:
+        name, ratio = index.find(query)
+        assert name == expected and ratio < AUTO_ACCEPT_RATIO, query
+
+
+def test_names_sharing_a_key_are_all_offered():
+    index = FuzzyBrandIndex(['Plum', 'Kapda', 'Kupid', 'Boat', 'Bata'])
+    choices = index.top_k('Kiped', 3, 0.6)
+    assert sorted(name for name, _ in choices) == ['Kapda', 'Kupid']
+    assert all(ratio < AUTO_ACCEPT_RATIO for _, ratio in choices)
+
+    # Ranked by the real ratio, not sheet order
+    assert [name for name, _ in index.top_k('Baata', 2)] == ['Bata', 'Boat']
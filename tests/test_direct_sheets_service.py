@@ -0,0 +1,36 @@
+import pytest
+
+from sheet_table import SheetTable
+from direct_sheets_service import DirectSheetsService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = DirectSheetsService()
+    reads = []
+
+    def read_sheet_for_query(sheet_id, query, method):
+        reads.append(sheet_id)
+        rows = [['Plum', str(len(reads))]]
+        return SheetTable.from_rows(['Brand', 'Read'], rows, sheet_id=sheet_id), None
+
+    monkeypatch.setattr(service, '_read_sheet_for_query', read_sheet_for_query)
+    service.reads = reads
+    return service
+
+
+def test_query_snapshot_is_reused_while_the_sheet_version_is_unchanged(service, monkeypatch):
+    monkeypatch.setattr(service, 'get_sheet_version', lambda sheet_id, method=None: '7')
+    first, _ = service._get_query_snapshot('sheet', 'how many rows', 'oauth')
+    second, _ = service._get_query_snapshot('sheet', 'how many rows', 'oauth')
+    assert second is first
+    assert len(service.reads) == 1
+
+
+def test_query_snapshot_is_reread_when_the_sheet_changes(service, monkeypatch):
+    versions = iter(['7', '8'])
+    monkeypatch.setattr(service, 'get_sheet_version', lambda sheet_id, method=None: next(versions))
+    first, _ = service._get_query_snapshot('sheet', 'how many rows', 'oauth')
+    second, _ = service._get_query_snapshot('sheet', 'how many rows', 'oauth')
+    assert len(service.reads) == 2
+    assert second.revision != first.revision
@@ -0,0 +1,109 @@
+import os
+import re
+import time
+import zipfile
+
+import pytest
+from docx import Document
+
+from docx_template import DocxTemplate, _compile_part, get_template
+
+
+def render_text(segments, values):
+    """Join compiled segments as DocxTemplate.render_to_buffer does"""
+    chunks = []
+    for segment in segments:
+        if isinstance(segment, str):
+            chunks.append(segment)
+        elif segment.key is None or segment.key not in values:
+            chunks.append(segment.text)
+        elif segment.first:
+            chunks.append(values[segment.key])
+    return ''.join(chunks)
+
+
+def paragraph(*runs):
+    return '<w:p><w:pPr/>' + ''.join(f'<w:r><w:t>{text}</w:t></w:r>' for text in runs) + '</w:p>'
+
+
+def test_compile_part_joins_placeholders_split_across_runs():
+    xml = '<w:body>' + paragraph('Dear {{bra', 'nd_na', 'me}},') + paragraph('{{ city }}') + '</w:body>'
+    segments, keys = _compile_part(xml, ())
+    assert keys == ['brand_name', 'city']
+    out = render_text(segments, {'brand_name': 'Plum &amp; Co', 'city': 'Pune'})
+    assert out == ('<w:body><w:p><w:pPr/><w:r><w:t xml:space="preserve">Dear Plum &amp; Co</w:t></w:r>'
+                   '<w:r><w:t></w:t></w:r><w:r><w:t>,</w:t></w:r></w:p>'
+                   '<w:p><w:pPr/><w:r><w:t xml:space="preserve">Pune</w:t></w:r></w:p></w:body>')
+
+
+def test_compile_part_leaves_missing_values_and_other_paragraphs_alone():
+    xml = paragraph('{{brand', '}} and {{city}}') + paragraph('{{', 'not closed') + '<w:p/>'
+    segments, keys = _compile_part(xml, ())
+    assert keys == ['brand', 'city']
+    assert render_text(segments, {}).replace(' xml:space="preserve"', '') == xml
+    assert 'Goa' in render_text(segments, {'city': 'Goa'})
+
+
+def test_compile_part_consumes_hash_prefix_only_for_listed_keys():
+    xml = paragraph('Invoice #', '{{Invoice_Number}} / #{{ref}}')
+    segments, _ = _compile_part(xml, {'Invoice_Number'})
+    out = render_text(segments, {'Invoice_Number': 'SB/042', 'ref': '7'})
+    assert ''.join(re.findall(r'<w:t[^>]*>([^<]*)</w:t>', out)) == 'Invoice SB/042 / #7'
+
+
+@pytest.fixture
+def template_path(tmp_path):
+    doc = Document()
+    p = doc.add_paragraph('Agreement with ')
+    p.add_run('{{brand').bold = True
+    p.add_run('_name}} dated {{date}}')
+    doc.add_table(rows=1, cols=1).cell(0, 0).paragraphs[0].add_run('Deposit: {{deposit}}')
+    section = doc.sections[0]
+    section.header.paragraphs[0].text = '{{brand_name}} - confidential'
+    path = str(tmp_path / 'template.docx')
+    doc.save(path)
+    return path
+
+
+def test_render_fills_body_tables_and_headers(template_path):
+    template = DocxTemplate(template_path)
+    assert template.placeholders == ['brand_name', 'date', 'deposit']
+    buffer, stats = template.render_to_buffer({'brand_name': 'Plum & Co', 'date': '19/10/2026', 'deposit': '₹2,00,000'})
+    assert stats == {'total': 4, 'unreplaced': []}
+
+    doc = Document(buffer)
+    assert doc.paragraphs[0].text == 'Agreement with Plum & Co dated 19/10/2026'
+    assert doc.paragraphs[0].runs[1].bold
+    assert doc.tables[0].cell(0, 0).text == 'Deposit: ₹2,00,000'
+    assert doc.sections[0].header.paragraphs[0].text == 'Plum & Co - confidential'
+
+    buffer.seek(0)
+    with zipfile.ZipFile(buffer) as archive:
+        assert archive.testzip() is None
+        assert len(archive.namelist()) == len(set(archive.namelist()))
+
+
+def test_render_reports_unreplaced_and_cache_key_tracks_values(template_path):
+    template = DocxTemplate(template_path)
+    _, stats = template.render_to_buffer({'brand_name': 'Plum'})
+    assert stats['unreplaced'] == ['date', 'deposit']
+    values = {'brand_name': 'Plum', 'date': '1', 'deposit': '2'}
+    assert template.cache_key(values) == template.cache_key({**values, 'unused': 'x'})
+    assert template.cache_key(values) != template.cache_key({**values, 'date': '3'})
+
+
+def test_get_template_recompiles_when_the_file_changes(template_path):
+    first = get_template(template_path)
+    assert get_template(template_path) is first
+    later = time.time() + 5
+    os.utime(template_path, (later, later))
+    assert get_template(template_path) is not first
+
+
+def test_get_template_keeps_one_compilation_per_hash_prefixed_set(template_path):
+    plain = get_template(template_path)
+    prefixed = get_template(template_path, hash_prefixed=['date'])
+    assert prefixed is not plain
+    assert prefixed.hash_prefixed == {'date'} and plain.hash_prefixed == set()
+    assert get_template(template_path) is plain
+    assert get_template(template_path, hash_prefixed=('date',)) is prefixed
@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+import pytest
+
+from numeric_parsing import parse_amount, parse_amounts, amount_to_str
+
+CASES = [
+    ("₹1,50,000", 150000.0),
+    ("$1,200.50", 1200.5),
+    ("Rs. 5000", 5000.0),
+    ("INR 2,00,000", 200000.0),
+    ("5000/-", 5000.0),
+    ("(1,200)", -1200.0),
+    ("-₹300", -300.0),
+    ("- ₹300", -300.0),
+    ("₹ 1,500", 1500.0),
+    ("  42  ", 42.0),
+    ("5 lakh", 500000.0),
+    ("2.5 crore", 25000000.0),
+    ("10k", 10000.0),
+    ("12 34", None),
+    ("1, 234", None),
+    ("1 .5", None),
+    ("12 34 lakh", None),
+    ("Grand Total", None),
+    ("", None),
+    ("1.2.3", None),
+    ("(1,200", None),
+    ("-$1,200.50", -1200.5),
+    ("₹-300", -300.0),
+    ("007", 7.0),
+    ("1.", 1.0),
+    ("9" * 400, None),
+]
+
+
+@pytest.mark.parametrize('text, expected', CASES)
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+def test_parse_amounts_matches_parse_amount_cell_by_cell():
+    cells = [text for text, _ in CASES] + ['9' * 16, '₹' + '1,' * 12 + '000', 'crores', '1e5']
+    expected = [math.nan if v is None else v for v in map(parse_amount, cells)]
+    assert np.array_equal(parse_amounts(cells), np.array(expected), equal_nan=True)
+
+
+def test_parse_amount_numbers_and_blanks():
+    assert parse_amount(None) is None
+    assert parse_amount(1500) == 1500.0
+    assert parse_amount(float('nan')) is None
+    assert amount_to_str("₹2,00,000") == "200000"
+    assert amount_to_str("1200.50") == "1200.5"
+    assert amount_to_str("12 34") == ""
@@ -0,0 +1,47 @@
+import time
+import subprocess
+
+import pytest
+
+import pdf_converter
+from pdf_converter import ConverterWorker, LocalPdfConverter
+
+
+def _running(pid: int) -> bool:
+    """Whether ``pid`` is alive (a killed child may linger as a zombie until init reaps it)"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+@pytest.fixture
+def hanging_soffice(tmp_path, monkeypatch):
+    """A soffice stand-in that hands off to a child which never finishes"""
+    pid_file = tmp_path / 'child.pid'
+    script = tmp_path / 'soffice'
+    script.write_text(f"#!/bin/sh\nsleep 60 &\necho $! > {pid_file}\nwait\n")
+    script.chmod(0o755)
+    monkeypatch.setattr(pdf_converter, 'SOFFICE_PATH', str(script))
+    return pid_file
+
+
+def test_degraded_timeout_kills_the_whole_soffice_process_group(hanging_soffice):
+    worker = ConverterWorker(0, listener=False)
+    with pytest.raises(subprocess.TimeoutExpired):
+        worker.convert(b'docx', timeout=0.5)
+
+    child = int(hanging_soffice.read_text())
+    time.sleep(0.1)
+    assert not _running(child)
+
+
+def test_degraded_timeout_is_counted_and_the_worker_reused(hanging_soffice, monkeypatch):
+    monkeypatch.setattr(LocalPdfConverter, 'warm', property(lambda self: False))
+    converter = LocalPdfConverter(workers=1, timeout=0.5, cold_start=True)
+    assert converter.convert(b'docx') is None
+    status = converter.get_status()
+    assert status['timeouts'] == 1 and status['idle'] == 1
+    converter.stop()
+    assert converter.get_status()['workers'] == 0
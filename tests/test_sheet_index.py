@@ -0,0 +1,37 @@
+from sheet_table import SheetTable
+from sheet_index import SheetIndex
+
+HEADERS = ['Brand', 'City', 'Status']
+
+
+def make_table(rows):
+    return SheetTable.from_rows(HEADERS, rows, sheet_id='sheet')
+
+
+def test_find_counts_substring_matches_in_row_major_order():
+    index = SheetIndex(make_table([['Plum', 'Mumbai', 'Paid'], ['Freakins', 'Pune', 'Unpaid'], ['FAE', 'Mumbai', '']]))
+    assert index.find('mumbai') == {'count': 2, 'cells': [(0, 1), (2, 1)]}
+    assert index.count('paid') == 2
+    assert index.count_token('paid') == 1
+    assert index.find('  ')['count'] == 0
+
+
+def test_update_matches_a_rebuild_and_drops_values_that_are_gone():
+    index = SheetIndex(make_table([['Plum', 'Mumbai', 'Paid'], ['Freakins', 'Pune', 'Unpaid'], ['FAE', 'Goa', 'Paid']]))
+    newer = make_table([['Plum', 'Mumbai', 'Paid'], ['Freakins', 'Delhi', 'Paid']])
+
+    assert index.update(newer) == 2
+    rebuilt = SheetIndex(newer)
+    for term in ['pune', 'goa', 'fae', 'delhi', 'paid', 'unpaid', 'mum', 'p']:
+        assert index.find(term, limit=None) == rebuilt.find(term, limit=None), term
+    assert index.get_stats() == rebuilt.get_stats()
+    assert index.count_token('pune') == 0
+
+
+def test_update_reuses_ids_of_dropped_values():
+    index = SheetIndex(make_table([['Plum', 'Pune', 'Paid']]))
+    for city in ['Goa', 'Delhi', 'Pune', 'Goa']:
+        index.update(make_table([['Plum', city, 'Paid']]))
+    assert len(index._values) == 4
+    assert index.find('goa')['cells'] == [(0, 1)]
+
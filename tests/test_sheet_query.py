@@ -0,0 +1,85 @@
+import pytest
+
+import sheet_table
+from sheet_table import SheetTable
+from sheet_query import QueryPlanError, validate_plan, execute_plan, format_result, _parse_plan
+
+HEADERS = ['Brand', 'City', 'Balance', 'Status']
+ROWS = [
+    ['Plum', 'Mumbai', '₹1,500', 'Paid'],
+    ['Freakins', 'Pune', '-₹300', 'Unpaid'],
+    ['FAE', 'Mumbai', '(1,200)', 'Unpaid'],
+    ['Yama Yoga', 'Goa', '2,000', 'paid'],
+    ['', '', '', ''],
+    ['Bellavita', 'mumbai', 'n/a', 'Unpaid'],
+]
+
+
+@pytest.fixture(params=['fixed', 'object'])
+def table(request, monkeypatch):
+    if request.param == 'object':
+        monkeypatch.setattr(sheet_table, 'MAX_FIXED_WIDTH', 0)  # every column as free text
+    return SheetTable.from_rows(HEADERS, ROWS)
+
+
+def run(plan, table):
+    return execute_plan(validate_plan(plan, table), table)
+
+
+def test_validate_plan_resolves_columns_and_defaults(table):
+    plan = validate_plan({'filters': [{'column': 'Balance', 'op': 'lt', 'value': '₹0'}], 'top_k': 500}, table)
+    assert plan['filters'] == [{'column': 2, 'op': 'lt', 'value': 0.0}]
+    assert plan['aggregate'] == 'count' and plan['aggregate_column'] is None
+    assert plan['top_k'] == 50
+
+
+@pytest.mark.parametrize('plan', [
+    {'filters': [{'column': 'Region', 'op': 'eq', 'value': 'x'}]},
+    {'filters': [{'column': 'Balance', 'op': 'gt', 'value': 'lots'}]},
+    {'filters': [{'column': 'City', 'op': 'like', 'value': 'x'}]},
+    {'aggregate': {'op': 'median', 'column': 'Balance'}},
+    {'aggregate': {'op': 'sum'}},
+    {'aggregate': 'rows', 'group_by': 'City'},
+    {'filters': ['City = Goa']},
+])
+def test_validate_plan_rejects_plans_that_do_not_fit(table, plan):
+    with pytest.raises(QueryPlanError):
+        validate_plan(plan, table)
+
+
+def test_parse_plan():
+    assert _parse_plan('Here you go: {"aggregate": "count"}') == {'aggregate': 'count'}
+    assert _parse_plan('{"unsupported": true}') is None
+    with pytest.raises(QueryPlanError):
+        _parse_plan('no plan')
+
+
+def test_count_with_filters_skips_blank_rows(table):
+    assert run({}, table)['value'] == 5
+    result = run({'filters': [{'column': 'Status', 'op': 'eq', 'value': 'PAID'}]}, table)
+    assert result['value'] == 2
+    result = run({'filters': [{'column': 'Balance', 'op': 'lt', 'value': 0}]}, table)
+    assert result['value'] == 2
+
+
+def test_eq_matches_formatted_numbers(table):
+    result = run({'filters': [{'column': 'Balance', 'op': 'eq', 'value': '1500'}]}, table)
+    assert result['value'] == 1
+
+
+def test_sum_and_grouped_aggregates(table):
+    assert run({'aggregate': {'op': 'sum', 'column': 'Balance'}}, table)['value'] == 2000
+    result = run({'group_by': 'City', 'aggregate': {'op': 'count'}}, table)
+    assert result['groups'][0] == ('Mumbai', 3.0)
+    assert result['num_groups'] == 3
+    result = run({'group_by': 'Status', 'aggregate': {'op': 'sum', 'column': 'Balance'}}, table)
+    assert result['groups'] == [('Paid', 3500.0), ('Unpaid', -1500.0)]
+
+
+def test_distinct_and_rows(table):
+    result = run({'aggregate': {'op': 'distinct', 'column': 'City'}}, table)
+    assert result['value'] == 3
+    result = run({'aggregate': 'rows', 'columns': ['Brand', 'Balance'], 'order_by': 'Balance', 'top_k': 2}, table)
+    assert result['rows'] == [['Yama Yoga', '2,000'], ['Plum', '₹1,500']]
+    assert result['matched_rows'] == 5
+    assert "(and 3 more)" in format_result(result, table)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from sheet_table import SheetTable, SheetTableBuilder, MAX_FIXED_WIDTH, contains_text
+
+NOTE = 'Ships from the Bhiwandi warehouse; ' * 10
+HEADERS = ['Brand', 'Notes', 'Balance']
+ROWS = [['Plum', f'  {NOTE} ', '₹1,500'], ['FAE ', 'Listed', '-300']]
+
+
+def test_one_long_cell_does_not_widen_its_column():
+    table = SheetTable.from_rows(HEADERS, ROWS)
+    assert len(NOTE) > MAX_FIXED_WIDTH
+    assert table.column('Notes').dtype == object
+    assert table.column('Brand').dtype.kind == 'U'
+
+    assert table.stripped('Notes')[0] == NOTE.strip()
+    assert table.normalized('Notes')[1] == 'listed'
+    assert contains_text(table.normalized('Notes'), 'bhiwandi').tolist() == [True, False]
+    assert contains_text(table.normalized('Brand'), 'fa').tolist() == [False, True]
+    assert np.array_equal(table.numeric('Balance'), [1500.0, -300.0])
+    assert table.row(0) == ROWS[0]
+
+
+def test_revision_covers_object_columns():
+    table = SheetTable.from_rows(HEADERS, ROWS)
+    assert SheetTable.from_rows(HEADERS, ROWS).revision == table.revision
+    changed = [ROWS[0], ['FAE ', 'Delisted', '-300']]
+    assert SheetTable.from_rows(HEADERS, changed).revision != table.revision
+
+
+def test_builder_pages_match_a_single_read():
+    builder = SheetTableBuilder(HEADERS)
+    builder.add_rows(ROWS[1:])
+    builder.add_rows(ROWS[:1])
+    table = builder.build()
+    assert table.column('Notes').dtype == object
+    assert table.rows() == ROWS[1:] + ROWS[:1]
+    assert table.revision == SheetTable.from_rows(HEADERS, ROWS[1:] + ROWS[:1]).revision
@@ -0,0 +1,18 @@
+import pytest
+
+from utils import format_currency
+
+
+@pytest.mark.parametrize('value, expected', [
+    ("150000", "₹1,50,000"),
+    ("₹1,00,00,000", "₹1,00,00,000"),
+    ("1234567.6", "₹12,34,568"),
+    ("999", "₹999"),
+    ("1000", "₹1,000"),
+    ("-25000", "-₹25,000"),
+    ("-0.2", "₹0"),
+    ("5 lakh", "₹5,00,000"),
+    ("TBD", "TBD"),
+])
+def test_format_currency_groups_in_lakhs(value, expected):
+    assert format_currency(value) == expected
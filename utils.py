@@ -1,20 +1,35 @@
 # utils.py
 
 import re
+import uuid
+
+from numeric_parsing import parse_amount
 
 def clean_slack_text(text: str) -> str:
     """Strip Slack’s user‑mention tokens like <@U12345> and trim whitespace."""
     return re.sub(r"<@[\w]+>", "", text).strip()
 
 def format_currency(value: str) -> str:
-    """Format a numeric string as Indian‑style ₹ currency."""
-    try:
-        num = float(value)
-        return f"₹{num:,.0f}".replace(",", ",")
-    except:
+    """Format a numeric string as Indian‑style ₹ currency, e.g. '150000' → '₹1,50,000'."""
+    num = parse_amount(value)
+    if num is None:
         return value
+    digits = f"{abs(num):.0f}"
+    # Last three digits, then groups of two: 1,50,000 / 1,00,00,000
+    grouped = re.sub(r"(\d)(?=(\d\d)+$)", r"\1,", digits[:-3]) + "," + digits[-3:] if len(digits) > 3 else digits
+    sign = "-" if num < 0 and digits != "0" else ""
+    return f"{sign}₹{grouped}"
 
 def generate_docx_filename(brand_name: str) -> str:
     """Turn a brand name into a safe filename, e.g. 'My Brand' → 'my_brand_agreement.docx'."""
     slug = re.sub(r"\W+", "_", brand_name.lower())
     return f"{slug}_agreement.docx"
+
+def new_job_id() -> str:
+    """Short unique id for one generated document (keeps concurrent jobs apart)."""
+    return uuid.uuid4().hex[:8]
+
+def document_filename(brand_name: str, kind: str, extension: str, job_id: str) -> str:
+    """Per-job upload name, e.g. ('My Brand', 'agreement', 'pdf', 'a1b2c3d4') → 'my_brand_agreement_a1b2c3d4.pdf'."""
+    slug = re.sub(r"\W+", "_", brand_name.lower()).strip("_") or "brand"
+    return f"{slug}_{kind}_{job_id}.{extension}"